@@ -86,6 +86,26 @@
         return val.trim() || null;
     };
 
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+    // Consulta el trabajo en segundo plano hasta que termine y retorna su resultado
+    async function esperarTrabajo(jobId, statusEl){
+        for(;;){
+            await sleep(1000);
+            const res = await fetch(`${API_BASE}/jobs/${encodeURIComponent(jobId)}`, { credentials:'include', cache:'no-store' });
+            const job = await res.json().catch(()=>({}));
+            if(!res.ok){ throw new Error(job.detail || job.error || 'No se pudo consultar el procesamiento'); }
+            if(job.status === 'done'){ return job.result || {}; }
+            if(job.status === 'error'){ throw new Error(job.error || 'Error procesando bitácoras'); }
+            const progreso = job.progress || {};
+            if(statusEl){
+                statusEl.textContent = job.status === 'queued'
+                    ? 'En cola...'
+                    : `Procesando... ${progreso.lines_parsed ?? 0} líneas leídas${progreso.records_added != null ? `, ${progreso.records_added} registros nuevos` : ''}`;
+            }
+        }
+    }
+
     async function procesar({ statusTarget, cliente, period, buttons }={}){
         const btnIds = buttons || ['#btn-procesar'];
         setBusyButtons(btnIds, true);
@@ -100,8 +120,9 @@
                 credentials:'include',
                 body: JSON.stringify(payload)
             });
-            const data = await res.json().catch(()=>({}));
+            let data = await res.json().catch(()=>({}));
             if(!res.ok){ throw new Error(data.detail || data.error || 'Error procesando bitácoras'); }
+            if(data.job_id){ data = await esperarTrabajo(data.job_id, statusEl); }
             const newAdded = data.new_records ?? data.generated?.[0]?.new_records_added ?? 0;
             const totalRows = data.total_rows ?? data.generated?.[0]?.total_rows ?? 0;
             const mensaje = data.message || (newAdded > 0 ? `Bitácora actualizada. ${newAdded} nuevo(s). Total: ${totalRows}.` : (totalRows > 0 ? `Sin registros nuevos. Total: ${totalRows}.` : 'No hay nuevos registros'));
@@ -3,6 +3,7 @@
 // =====================================================
 
 const express = require('express');
+const { Readable } = require('stream');
 const router = express.Router();
 const auth = require('./auth');
 
@@ -48,20 +49,57 @@ router.post('/procesar', auth.requireAdmin, async (req, res) => {
         const upstream = await callService('/bitacora/procesar', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ cliente, period })
+            // En segundo plano: el microservicio responde 202 con el id del trabajo y se consulta en /jobs/:id
+            body: JSON.stringify({ cliente, period, background: true })
         });
 
         const payload = await upstream.json().catch(() => ({ error: 'Respuesta no valida del microservicio' }));
         if (!upstream.ok) {
             return res.status(upstream.status).json({ error: payload.detail || payload.error || 'No se pudo procesar la bitacora' });
         }
-        return res.json(payload);
+        return res.status(upstream.status).json(payload);
     } catch (err) {
         console.error('Error en /api/bitacora/procesar:', err && err.message);
         return res.status(502).json({ error: 'Microservicio no disponible' });
     }
 });
 
+router.post('/procesar-todos', auth.requireAdmin, async (req, res) => {
+    try {
+        const { period = null } = req.body || {};
+        if (period && !validatePeriod(period)) {
+            return res.status(400).json({ error: 'Formato de periodo invalido. Use YYYY-MM.' });
+        }
+        const upstream = await callService('/bitacora/procesar-todos', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ period, background: true })
+        });
+        const payload = await upstream.json().catch(() => ({ error: 'Respuesta no valida del microservicio' }));
+        if (!upstream.ok) {
+            return res.status(upstream.status).json({ error: payload.detail || payload.error || 'No se pudieron procesar los clientes' });
+        }
+        return res.status(upstream.status).json(payload);
+    } catch (err) {
+        console.error('Error en /api/bitacora/procesar-todos:', err && err.message);
+        return res.status(502).json({ error: 'Microservicio no disponible' });
+    }
+});
+
+router.get('/jobs/:id', auth.requireAdmin, async (req, res) => {
+    try {
+        const upstream = await callService(`/bitacora/jobs/${encodeURIComponent(req.params.id)}`);
+        const payload = await upstream.json().catch(() => ({ error: 'Respuesta no valida del microservicio' }));
+        if (!upstream.ok) {
+            return res.status(upstream.status).json({ error: payload.detail || payload.error || 'No se encontro el trabajo' });
+        }
+        return res.json(payload);
+    } catch (err) {
+        console.error('Error en /api/bitacora/jobs:', err && err.message);
+        return res.status(502).json({ error: 'Microservicio no disponible' });
+    }
+});
+
 router.get('/metricas', async (req, res) => {
     try {
         const upstream = await callService('/bitacora/metricas');
@@ -82,6 +120,9 @@ router.get('/excel', auth.requireAdmin, async (req, res) => {
         if (Array.isArray(cliente)) cliente = cliente[0];
         cliente = (cliente && String(cliente).trim()) || 'Cliente Principal';
         const query = new URLSearchParams({ cliente });
+        const period = req.query.period;
+        if (period && validatePeriod(String(period))) query.set('period', String(period));
+        if (req.query.stream === 'true' || req.query.stream === '1') query.set('stream', 'true');
         const upstream = await callService(`/bitacora/excel?${query.toString()}`);
         if (!upstream.ok) {
             const payload = await upstream.json().catch(() => ({}));
@@ -92,8 +133,13 @@ router.get('/excel', auth.requireAdmin, async (req, res) => {
         res.setHeader('Content-Type', upstream.headers.get('content-type') || 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet');
         res.setHeader('Content-Disposition', disposition);
 
-        const buffer = Buffer.from(await upstream.arrayBuffer());
-        res.send(buffer);
+        // Reenviar el cuerpo a medida que llega, sin acumular el archivo completo en memoria
+        const body = typeof upstream.body.pipe === 'function' ? upstream.body : Readable.fromWeb(upstream.body);
+        body.on('error', (err) => {
+            console.error('Error en /api/bitacora/excel (stream):', err && err.message);
+            res.destroy(err);
+        });
+        body.pipe(res);
     } catch (err) {
         console.error('Error en /api/bitacora/excel:', err && err.message);
         return res.status(502).json({ error: 'Microservicio no disponible' });
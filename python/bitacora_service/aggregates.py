@@ -0,0 +1,130 @@
+"""
+Agregados materializados de cada Excel de bitácora para GET /bitacora/metricas.
+Se calculan al escribir el Excel y se guardan junto a él (<excel>.metricas.json) con el tamaño/mtime del libro;
+un cache en memoria por ruta + mtime/tamaño evita releer el JSON, y solo se recalcula un archivo que cambió.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+AGGREGATES_SUFFIX = ".metricas.json"
+AGGREGATES_VERSION = 1
+
+
+def aggregates_path_for(output_path) -> Path:
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + AGGREGATES_SUFFIX)
+
+
+def compute_aggregates(df: "pd.DataFrame") -> Dict:
+    """Total de filas, conteo por Estado y por mes de Fecha Solicitud (YYYY-MM)."""
+    import pandas as pd
+
+    estados: Dict[str, int] = {}
+    periodos: Dict[str, int] = {}
+    if "Estado" in df.columns:
+        values = df["Estado"].fillna("").astype(str).str.strip()
+        for value, count in values[values != ""].value_counts(sort=False).items():
+            estados[str(value)] = int(count)
+    if "Fecha Solicitud" in df.columns:
+        fechas = pd.to_datetime(df["Fecha Solicitud"], errors="coerce").dropna()
+        for value, count in fechas.dt.strftime("%Y-%m").value_counts(sort=False).items():
+            periodos[str(value)] = int(count)
+    return {"rows": int(len(df)), "estados": estados, "periodos": periodos}
+
+
+class AggregateAccumulator:
+    """Mismos agregados que compute_aggregates, acumulados fila por fila mientras se escribe un Excel."""
+
+    def __init__(self):
+        self.rows = 0
+        self.estados: Dict[str, int] = {}
+        self.periodos: Dict[str, int] = {}
+
+    def add(self, fecha_solicitud: Optional[datetime], estado: Optional[str]) -> None:
+        self.rows += 1
+        estado = (estado or "").strip()
+        if estado:
+            self.estados[estado] = self.estados.get(estado, 0) + 1
+        if fecha_solicitud is not None:
+            key = f"{fecha_solicitud.year}-{fecha_solicitud.month:02d}"
+            self.periodos[key] = self.periodos.get(key, 0) + 1
+
+    def result(self) -> Dict:
+        return {"rows": self.rows, "estados": self.estados, "periodos": self.periodos}
+
+
+def _fingerprint(path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def save_aggregates(output_path, aggregates: Dict) -> None:
+    """Persiste los agregados de un Excel recién escrito, junto con su tamaño/mtime actual."""
+    fingerprint = _fingerprint(output_path)
+    if fingerprint is None:
+        return
+    payload = {"version": AGGREGATES_VERSION, "size": fingerprint[0], "mtime_ns": fingerprint[1], **aggregates}
+    target = aggregates_path_for(output_path)
+    tmp_path = target.with_name(target.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, target)
+    AGGREGATE_CACHE.put(output_path, fingerprint, aggregates)
+
+
+def load_aggregates(output_path, fingerprint: Tuple[int, int]) -> Optional[Dict]:
+    """Agregados persistidos, solo si corresponden al Excel tal como está en disco."""
+    try:
+        data = json.loads(aggregates_path_for(output_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != AGGREGATES_VERSION or (data.get("size"), data.get("mtime_ns")) != fingerprint:
+        return None
+    return {"rows": int(data.get("rows", 0)), "estados": data.get("estados") or {}, "periodos": data.get("periodos") or {}}
+
+
+class AggregateCache:
+    """Cache en proceso: ruta -> (tamaño, mtime_ns, agregados)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+
+    def put(self, output_path, fingerprint: Tuple[int, int], aggregates: Dict) -> None:
+        with self._lock:
+            self._items[str(output_path)] = (fingerprint, aggregates)
+
+    def get(self, output_path) -> Optional[Dict]:
+        """Agregados del Excel; solo lo relee y recalcula si cambió desde la última vez."""
+        fingerprint = _fingerprint(output_path)
+        if fingerprint is None:
+            return None
+        with self._lock:
+            cached = self._items.get(str(output_path))
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        aggregates = load_aggregates(output_path, fingerprint)
+        if aggregates is None:
+            import pandas as pd
+
+            try:
+                df = pd.read_excel(output_path, engine="openpyxl")
+            except Exception:
+                return None
+            aggregates = compute_aggregates(df)
+            save_aggregates(output_path, aggregates)
+        else:
+            self.put(output_path, fingerprint, aggregates)
+        return aggregates
+
+
+AGGREGATE_CACHE = AggregateCache()
@@ -0,0 +1,133 @@
+"""
+Construcción del DataFrame y de las claves de un año de registros: build_dataframe por filas (dicts + pd.to_datetime)
+y _add_key_column con copia, contra la construcción por columnas y la clave vectorizada de processor.
+
+Uso (desde python/bitacora_service):
+  python benchmarks/bench_dataframe.py [--registros 500000] [--autores 60]
+
+Verifica que ambos caminos produzcan las mismas filas para el almacén (clave + valores) y mide tiempo y memoria
+pico (tracemalloc) de build_dataframe -> claves -> filas, más el tamaño del DataFrame resultante.
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import processor  # noqa: E402
+from chat_records import ChatMessage, LinkedRequest, epoch_seconds  # noqa: E402
+
+TEXTS = ["la bomba no sirve", "favor revisar el aire del aula 3", "hay una fuga en el baño", "cambiar foco pasillo"]
+
+
+def synthetic_linked(count: int, authors: int, seed: int) -> List[LinkedRequest]:
+    rng = random.Random(seed)
+    ts = epoch_seconds(datetime(2024, 1, 1, 8, 0, 0))
+    names = [f"Autor {i}" for i in range(authors)]
+    linked = []
+    for i in range(count):
+        ts += rng.randint(5, 60)
+        request = ChatMessage(ts, rng.choice(names), f"{rng.choice(TEXTS)} #{i}")
+        confirmation = ChatMessage(ts + rng.randint(60, 86400), rng.choice(names), "listo") if rng.random() < 0.7 else None
+        linked.append(LinkedRequest(request, confirmation))
+    return linked
+
+
+def legacy_build_dataframe(requests: List[LinkedRequest]) -> pd.DataFrame:
+    """build_dataframe original: un dict por fila y conversión de fechas después."""
+    rows: List[Dict] = []
+    for item in requests:
+        req = item.request
+        conf = item.confirmation
+        rows.append({
+            "Fecha Solicitud": req.datetime,
+            "Reportado Por": req.author,
+            "Descripcion del Problema": req.message,
+            "Tecnico / Respondio": conf.author if conf else "",
+            "Estado": "Completado" if conf else "Pendiente",
+            "Fecha Cierre": conf.datetime if conf else None,
+        })
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df["Fecha Solicitud"] = pd.to_datetime(df["Fecha Solicitud"])
+        df["Fecha Cierre"] = pd.to_datetime(df["Fecha Cierre"])
+    return df
+
+
+def legacy_record_rows(df: pd.DataFrame) -> List:
+    """_add_key_column (copia + reconversión de fechas) y _record_rows originales, valor por valor."""
+    def fmt(value):
+        return None if value is None or pd.isna(value) else pd.Timestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+    def text(value):
+        return "" if value is None or (not isinstance(value, str) and pd.isna(value)) else str(value)
+
+    keyed = df.copy()
+    keyed["Fecha Solicitud"] = pd.to_datetime(keyed["Fecha Solicitud"])
+    keyed["Fecha Cierre"] = pd.to_datetime(keyed["Fecha Cierre"])
+    keyed["clave"] = (
+        keyed["Fecha Solicitud"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        + "|" + keyed["Reportado Por"].fillna("").astype(str)
+        + "|" + keyed["Descripcion del Problema"].fillna("").astype(str)
+    )
+    columns = [keyed[col] for col in processor.EXCEL_COLUMNS]
+    return [
+        (clave, (fmt(fecha), text(reportado), text(descripcion), text(tecnico), text(estado), fmt(cierre)))
+        for clave, fecha, reportado, descripcion, tecnico, estado, cierre in zip(keyed["clave"], *columns)
+    ]
+
+
+def legacy_pipeline(linked: List[LinkedRequest]) -> List:
+    return legacy_record_rows(legacy_build_dataframe(linked))
+
+
+def columnar_pipeline(linked: List[LinkedRequest]) -> List:
+    return list(processor._record_rows(processor.build_dataframe(linked)))
+
+
+def measure(fn, linked: List[LinkedRequest]):
+    """(resultado, segundos, pico de memoria) de fn(linked)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(linked)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registros", type=int, default=500000)
+    parser.add_argument("--autores", type=int, default=60)
+    args = parser.parse_args()
+
+    check = synthetic_linked(5000, args.autores, seed=1)
+    if legacy_pipeline(check) != columnar_pipeline(check):
+        print("ERROR: las filas por columnas difieren de las originales", file=sys.stderr)
+        sys.exit(1)
+    print("Filas idénticas entre ambos caminos (5.000 registros).")
+
+    linked = synthetic_linked(args.registros, args.autores, seed=args.registros)
+    print(f"{len(linked):,} registros, {args.autores} autores")
+    variants = (
+        ("por filas (original)", legacy_pipeline, legacy_build_dataframe),
+        ("por columnas", columnar_pipeline, processor.build_dataframe),
+    )
+    for label, fn, build in variants:
+        rows, elapsed, peak = measure(fn, linked)
+        del rows
+        size = build(linked).memory_usage(deep=True).sum()
+        print(f"  {label:<22} {elapsed:7.2f} s   pico {peak / 1e6:8.1f} MB   DataFrame {size / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
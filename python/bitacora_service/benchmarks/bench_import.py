@@ -0,0 +1,94 @@
+"""
+Tiempo de importación en frío de los módulos del servicio (python -X importtime en un proceso nuevo por corrida)
+y dependencias pesadas que quedan cargadas.
+
+Uso (desde python/bitacora_service):
+  python benchmarks/bench_import.py [--modulos main,processor] [--repeticiones 5] [--detalle 10]
+
+Verifica primero que importar main y correr parseo + enlace + almacén sobre un export sintético no cargue pandas;
+después informa la mediana del tiempo acumulado de cada módulo y, con --detalle, los N imports más caros.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASE_DIR = BENCH_DIR.parent
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl")
+
+CHECK_SCRIPT = """
+import sys
+from pathlib import Path
+sys.path.insert(0, {bench!r})
+import main, processor
+from synthetic_chat import ChatSpec, build_folder
+loaded_import = [name for name in {heavy!r} if name in sys.modules]
+build_folder(Path({tmp!r}) / "fuente", ChatSpec(lines=2000))
+source, output = Path({tmp!r}) / "fuente", Path({tmp!r}) / "salida"
+messages = processor.iter_folder_messages(processor._source_files(source))
+rows = sum(len(batch) for batch in processor.iter_record_batches(processor.iter_linked_requests(messages)))
+print(",".join(loaded_import) + "|" + str(rows) + "|" + str("pandas" in sys.modules))
+"""
+
+
+def _env(output_dir: str) -> Dict[str, str]:
+    # main abre el almacén de su carpeta de salida al importarse: se apunta a una carpeta temporal
+    return {**os.environ, "BITACORA_OUTPUT_DIR": output_dir, "PYTHONDONTWRITEBYTECODE": "1"}
+
+
+def check(tmp: str) -> None:
+    script = CHECK_SCRIPT.format(bench=str(BENCH_DIR), heavy=HEAVY_MODULES, tmp=tmp)
+    result = subprocess.run([sys.executable, "-c", script], cwd=BASE_DIR, env=_env(tmp), capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        sys.exit(1)
+    loaded, rows, pandas_after = result.stdout.strip().splitlines()[-1].split("|")
+    if "pandas" in loaded.split(",") or pandas_after == "True":
+        print("ERROR: el camino de parseo/enlace cargó pandas", file=sys.stderr)
+        sys.exit(1)
+    print(f"import main sin pandas; parseo + enlace de 2.000 líneas ({rows} solicitudes) sin pandas.")
+    print(f"Cargados tras importar main: {loaded or 'ninguno'} de {', '.join(HEAVY_MODULES)}")
+
+
+def import_times(module: str, tmp: str) -> List[Tuple[str, int, int]]:
+    """(módulo, propio µs, acumulado µs) de cada import en un proceso nuevo."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, env=_env(tmp), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((name, int(self_us), int(cumulative)))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modulos", default="main,processor")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--detalle", type=int, default=0, help="Imports más caros a mostrar por módulo")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check(tmp)
+        for module in (name.strip() for name in args.modulos.split(",") if name.strip()):
+            samples = []
+            last: List[Tuple[str, int, int]] = []
+            for _ in range(max(1, args.repeticiones)):
+                last = import_times(module, tmp)
+                samples.append(next(cum for name, _self, cum in reversed(last) if name == module))
+            print(f"  {module:<12} mediana {statistics.median(samples) / 1000:8.1f} ms   mínimo {min(samples) / 1000:8.1f} ms")
+            for name, _self, cumulative in sorted(last, key=lambda row: row[2], reverse=True)[1:args.detalle + 1]:
+                print(f"      {cumulative / 1000:8.1f} ms  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
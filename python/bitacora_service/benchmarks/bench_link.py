@@ -0,0 +1,93 @@
+"""
+Escalamiento de link_requests_and_confirmations hasta 1M de mensajes.
+
+Uso (desde python/bitacora_service):
+  python benchmarks/bench_link.py [--sizes 10000,100000,1000000] [--legacy-max 20000]
+
+Primero compara contra el enlazado original (recorrido con reversed(requests)) sobre chats aleatorios,
+incluyendo mensajes fuera de orden cronológico, y falla si algún enlace difiere.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import processor  # noqa: E402
+from chat_records import ChatMessage  # noqa: E402
+
+REQUEST_TEXTS = ["la bomba no sirve", "favor revisar el aire", "hay una fuga en el baño", "Pueden revisar esto por favor"]
+CONFIRMATION_TEXTS = ["listo", "ya quedó", "reparado", "ok"]
+
+
+def legacy_link(messages: List[ChatMessage]) -> List[Dict]:
+    """Enlazado original, O(n²) cuando se acumulan confirmaciones."""
+    requests: List[Dict] = []
+    for msg in messages:
+        if processor.is_request(msg):
+            requests.append({"request": msg, "confirmation": None})
+        elif processor.is_confirmation(msg):
+            for req in reversed(requests):
+                if req["confirmation"] is None and req["request"].ts <= msg.ts:
+                    req["confirmation"] = msg
+                    break
+    return requests
+
+
+def synthetic_messages(count: int, confirmation_ratio: float, jitter: float, seed: int) -> List[ChatMessage]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    messages = []
+    for i in range(count):
+        when = start + timedelta(minutes=i)
+        if rng.random() < jitter:
+            when -= timedelta(minutes=rng.randint(1, 600))
+        texts = CONFIRMATION_TEXTS if rng.random() < confirmation_ratio else REQUEST_TEXTS
+        messages.append(ChatMessage.from_datetime(when, f"autor{i % 7}", rng.choice(texts)))
+    return messages
+
+
+def check_equivalence(rounds: int = 200) -> None:
+    for seed in range(rounds):
+        messages = synthetic_messages(400, confirmation_ratio=0.6, jitter=0.2 if seed % 2 else 0.0, seed=seed)
+        expected = [(id(r["request"]), id(r["confirmation"])) for r in legacy_link(messages)]
+        got = [(id(r["request"]), id(r["confirmation"])) for r in processor.link_requests_and_confirmations(messages)]
+        if expected != got:
+            print(f"ERROR: enlaces distintos al original (seed={seed})", file=sys.stderr)
+            sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--legacy-max", type=int, default=20000, help="Tamaño máximo para medir el enlazado original")
+    parser.add_argument("--confirmation-ratio", type=float, default=0.7)
+    args = parser.parse_args()
+
+    check_equivalence()
+    print("Enlaces idénticos al original en 200 chats aleatorios (con y sin desorden).")
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        for jitter in (0.0, 0.01):
+            messages = synthetic_messages(size, args.confirmation_ratio, jitter, seed=size)
+            # Clasificación previa para medir solo el enlazado
+            for msg in messages:
+                processor.classify_message(msg)
+            start = time.perf_counter()
+            processor.link_requests_and_confirmations(messages)
+            elapsed = time.perf_counter() - start
+            line = f"{size:>9} mensajes  desorden={jitter:<5} indice {elapsed:8.3f} s ({size / elapsed:12,.0f} msg/s)"
+            if size <= args.legacy_max:
+                start = time.perf_counter()
+                legacy_link(messages)
+                line += f"  original {time.perf_counter() - start:8.3f} s"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
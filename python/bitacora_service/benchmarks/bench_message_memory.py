@@ -0,0 +1,86 @@
+"""
+Bytes por mensaje de la representación original (dict con datetime y autor por línea) contra ChatMessage
+(__slots__, fecha en segundos epoch y autor internado), más el enlazado con dicts contra LinkedRequest.
+
+Uso (desde python/bitacora_service):
+  python benchmarks/bench_message_memory.py [--mensajes 200000] [--autores 40]
+
+Genera un export sintético, lo parsea con LineParser, verifica que ambas representaciones tengan los mismos
+valores y mide con tracemalloc la memoria retenida por la lista de mensajes y por la lista de solicitudes enlazadas.
+"""
+import argparse
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import processor  # noqa: E402
+from chat_records import ChatMessage  # noqa: E402
+from line_parser import LineParser  # noqa: E402
+
+TEXTS = ["la bomba no sirve", "favor revisar el aire del aula 3", "listo", "ya quedó", "buenos días", "gracias"]
+
+
+def synthetic_text(count: int, authors: int, seed: int) -> str:
+    rng = random.Random(seed)
+    when = datetime(2024, 1, 1, 8, 0, 0)
+    lines = []
+    for i in range(count):
+        when += timedelta(seconds=rng.randint(20, 900))
+        stamp = when.strftime("%d/%m/%y, %I:%M:%S %p")
+        lines.append(f"[{stamp}] ~ Autor {rng.randrange(authors)}: {rng.choice(TEXTS)} #{i}")
+    return "\n".join(lines) + "\n"
+
+
+def as_dicts(messages: List[ChatMessage]) -> List[Dict]:
+    """Representación original: un dict por mensaje con su propio datetime y su propia copia del autor."""
+    return [{"datetime": m.datetime, "author": "".join(m.author), "message": m.message} for m in messages]
+
+
+def retained(build) -> tuple:
+    """(resultado, bytes retenidos) de construir algo a partir de datos ya existentes."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=200000)
+    parser.add_argument("--autores", type=int, default=40)
+    args = parser.parse_args()
+
+    text = synthetic_text(args.mensajes, args.autores, seed=args.mensajes)
+    # El texto de los mensajes es el mismo en ambas representaciones: se mide solo lo que cambia
+    messages, slots_bytes = retained(lambda: LineParser().scan_text(text)[0])
+    dicts, dict_bytes = retained(lambda: as_dicts(messages))
+    if [m.to_dict() for m in messages] != dicts:
+        print("ERROR: las representaciones no tienen los mismos valores", file=sys.stderr)
+        sys.exit(1)
+    message_bytes = sum(sys.getsizeof(m.message) for m in messages)
+    slots_bytes -= message_bytes
+
+    for msg in messages:
+        processor.classify_message(msg)
+    linked, linked_bytes = retained(lambda: processor.link_requests_and_confirmations(messages))
+    _pairs, pair_bytes = retained(lambda: [{"request": item.request, "confirmation": item.confirmation} for item in linked])
+    count = len(messages)
+    requests = max(1, len(linked))
+    print(f"{count:,} mensajes, {args.autores} autores (sin contar el texto de cada mensaje)")
+    print(f"  mensaje  dict: {dict_bytes / count:7.1f} B   ChatMessage:   {slots_bytes / count:7.1f} B   x{dict_bytes / slots_bytes:4.2f}")
+    print(
+        f"  enlace   dict: {pair_bytes / requests:7.1f} B   LinkedRequest: {linked_bytes / requests:7.1f} B   "
+        f"x{pair_bytes / linked_bytes:4.2f} ({len(linked):,} solicitudes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Parseo de una carpeta de exports en serie contra el pool de procesos (BITACORA_PARSE_WORKERS).
+
+Uso (desde python/bitacora_service):
+  python benchmarks/bench_parse_folder.py [--archivos 8] [--repeticiones 3] [--workers 1,2,4]
+
+Arma una carpeta temporal con N copias de los .txt de bitacoras/ (una con líneas desordenadas), verifica que
+cada cantidad de workers produzca exactamente los mismos mensajes, en el mismo orden y con las mismas
+estadísticas por archivo que el orden original (concatenar + sort estable), y mide el tiempo de cada variante.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import processor  # noqa: E402
+from chat_records import ChatMessage  # noqa: E402
+
+
+def build_folder(target: Path, files: int, repeat: int) -> None:
+    lines: List[str] = []
+    for source in sorted((BASE_DIR / "bitacoras").glob("*.txt")):
+        lines.extend(source.read_text(encoding="utf-8").splitlines())
+    rng = random.Random(files)
+    for i in range(files):
+        body = lines * repeat
+        if i == files // 2:
+            # Un export fuera de orden: obliga a que el orden final dependa del sort por archivo y de la mezcla
+            body[:500] = rng.sample(body[:500], min(500, len(body)))
+        (target / f"sitio_{i:02d}.txt").write_text("\n".join(body), encoding="utf-8")
+
+
+def legacy_order(source_dir: Path) -> List[ChatMessage]:
+    """Orden original: concatenación por nombre de archivo y sort estable global."""
+    messages: List[ChatMessage] = []
+    for path in sorted(source_dir.glob("*.txt")):
+        messages.extend(processor._parse_source_file(path, None, None)[0])
+    messages.sort(key=lambda m: m.ts)
+    return messages
+
+
+def signature(messages: List[ChatMessage]) -> List:
+    return [(m.ts, m.author, m.message) for m in messages]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archivos", type=int, default=8)
+    parser.add_argument("--repetir", type=int, default=2, help="Veces que se repite el contenido en cada archivo")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count() or 1}")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        build_folder(folder, args.archivos, args.repetir)
+        expected = signature(legacy_order(folder))
+        print(f"{args.archivos} archivos, {len(expected):,} mensajes, {os.cpu_count()} núcleos")
+
+        baseline = None
+        for workers in sorted({int(w) for w in args.workers.split(",")}):
+            # Primera corrida fuera de la medición: arranca el pool
+            messages, stats = processor.parse_chat_folder_with_stats(folder, workers=workers)
+            if signature(messages) != expected:
+                print(f"ERROR: workers={workers} produjo un orden distinto al original", file=sys.stderr)
+                sys.exit(1)
+            if baseline is None:
+                baseline = stats
+            elif stats != baseline:
+                print(f"ERROR: workers={workers} produjo estadísticas por archivo distintas", file=sys.stderr)
+                sys.exit(1)
+            best = float("inf")
+            for _ in range(args.repeticiones):
+                start = time.perf_counter()
+                processor.parse_chat_folder_with_stats(folder, workers=workers)
+                best = min(best, time.perf_counter() - start)
+            print(f"  workers={workers:<3} {best:8.3f} s ({len(expected) / best:12,.0f} msg/s)")
+
+
+if __name__ == "__main__":
+    main()
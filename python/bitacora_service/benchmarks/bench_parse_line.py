@@ -0,0 +1,100 @@
+"""
+Compara líneas/segundo del parseo original (parse_line línea por línea) contra el motor de line_parser.
+
+Uso (desde python/bitacora_service):
+  python benchmarks/bench_parse_line.py [--file bitacoras/chat_whatsapp.txt] [--repeat 20]
+
+Antes de medir verifica que los tres caminos devuelvan exactamente los mismos mensajes.
+"""
+import argparse
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from line_parser import LineParser  # noqa: E402
+from processor import LINE_REGEX  # noqa: E402
+
+
+def legacy_parse_line(line: str, filter_year_month: Optional[Tuple[int, int]] = None) -> Optional[Dict]:
+    """Copia de processor.parse_line antes del motor, usada como línea base."""
+    def _normalize(s: str) -> str:
+        cleaned = s.replace("\u202f", " ").replace("\u00a0", " ")
+        cleaned = cleaned.replace("\u200e", "").replace("\u200f", "")
+        cleaned = cleaned.replace("\ufeff", "").replace("\u2060", "")
+        cleaned = cleaned.replace("\u202a", "").replace("\u202b", "").replace("\u202c", "").replace("\u202d", "").replace("\u202e", "")
+        return cleaned.strip()
+
+    normalized_line = _normalize(line)
+    match = LINE_REGEX.match(normalized_line)
+    if not match:
+        return None
+    date_str = match.group("date")
+    time_str = match.group("time")
+    ampm = match.group("ampm")
+    try:
+        day, month, year = map(int, date_str.split("/"))
+    except ValueError:
+        return None
+    if year < 100:
+        year += 2000
+    try:
+        hour, minute, second = map(int, time_str.split(":"))
+    except ValueError:
+        return None
+    ampm_normalized = ampm.replace(".", "").replace(" ", "").lower()
+    if ampm_normalized.startswith("p") and hour < 12:
+        hour += 12
+    if ampm_normalized.startswith("a") and hour == 12:
+        hour = 0
+    try:
+        timestamp = datetime(year, month, day, hour, minute, second)
+    except ValueError:
+        return None
+    if filter_year_month:
+        fy, fm = filter_year_month
+        if year != fy or month != fm:
+            return None
+    author = match.group("author").strip()
+    author = author.lstrip("~•- ")
+    author = author.replace("\u202f", " ").replace("\u00a0", " ").strip()
+    return {"datetime": timestamp, "author": author, "message": match.group("message").strip()}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default=str(BASE_DIR / "bitacoras" / "chat_whatsapp.txt"))
+    parser.add_argument("--repeat", type=int, default=20, help="Veces que se replica el archivo en memoria")
+    args = parser.parse_args()
+
+    text = Path(args.file).read_text(encoding="utf-8", errors="ignore") * args.repeat
+    lines = text.splitlines(keepends=True)
+    engine = LineParser()
+
+    legacy, t_legacy = _timed(lambda: [m for m in map(legacy_parse_line, lines) if m])
+    per_line, t_line = _timed(lambda: [m for m in map(engine.parse_line, lines) if m])
+    (buffered, _count), t_buffer = _timed(lambda: engine.scan_text(text))
+
+    if not (legacy == per_line == buffered):
+        print("ERROR: los resultados no coinciden con el parse_line original", file=sys.stderr)
+        sys.exit(1)
+
+    total = len(lines)
+    print(f"{total} líneas, {len(legacy)} mensajes")
+    for label, elapsed in (("parse_line original", t_legacy), ("LineParser.parse_line", t_line), ("LineParser.scan_text", t_buffer)):
+        print(f"  {label:<24} {elapsed:8.3f} s  {total / elapsed:12,.0f} líneas/s  x{t_legacy / elapsed:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
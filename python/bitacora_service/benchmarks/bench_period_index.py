@@ -0,0 +1,77 @@
+"""
+Procesar un solo mes (period=YYYY-MM) de un export de varios años con y sin el índice de meses (month_index).
+
+Uso (desde python/bitacora_service):
+  python benchmarks/bench_period_index.py [--lineas 300000] [--anios 3] [--meses 6] [--repeticiones 3]
+
+Genera un export sintético, lo parsea completo (lo que arma el índice) y verifica que cada mes leído con el
+índice dé exactamente los mismos mensajes que filtrar el parseo completo. Después mide, para los meses elegidos,
+la primera corrida sin índice (parsea todo el archivo y lo arma) y las corridas con el índice vigente.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+import processor  # noqa: E402
+from month_index import index_path_for, month_of_day  # noqa: E402
+from synthetic_chat import ChatSpec, build_folder  # noqa: E402
+
+
+def read(path: Path, filter_year_month: Optional[Tuple[int, int]]) -> Tuple[List[Tuple], float, Dict]:
+    info: Dict = {}
+    start = time.perf_counter()
+    messages = [(msg.ts, msg.author, msg.message) for msg in processor._iter_source(path, None, filter_year_month, info)]
+    return messages, time.perf_counter() - start, info
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lineas", type=int, default=300000)
+    parser.add_argument("--anios", type=int, default=3)
+    parser.add_argument("--meses", type=int, default=6, help="Meses a medir, repartidos en todo el export")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_folder(Path(tmp), ChatSpec(lines=args.lineas, start=datetime(2022, 1, 1, 7), days=365 * args.anios))
+        path = next(Path(tmp).glob("*.txt"))
+        sidecar = index_path_for(path)
+
+        full, full_seconds, _info = read(path, None)
+        by_month: Dict[Tuple[int, int], List[Tuple]] = {}
+        for message in full:
+            by_month.setdefault(month_of_day(message[0] // 86400), []).append(message)
+        for year_month, expected in sorted(by_month.items()):
+            messages, _seconds, info = read(path, year_month)
+            if messages != expected or info["mode"] != "indexed":
+                print(f"ERROR: {year_month[0]}-{year_month[1]:02d} con índice no coincide con el parseo completo", file=sys.stderr)
+                sys.exit(1)
+        print(f"{path.stat().st_size / 1e6:.1f} MB, {len(full):,} mensajes en {len(by_month)} meses: "
+              f"cada mes con índice coincide con el parseo completo.")
+        print(f"Parseo completo (arma el índice): {full_seconds:.3f} s")
+
+        months = sorted(by_month)
+        step = max(1, len(months) // max(1, args.meses))
+        print(f"{'Mes':<9} {'Sin índice':>11} {'Con índice':>11} {'Bytes leídos':>14}")
+        for year_month in months[::step][:args.meses]:
+            sidecar.unlink(missing_ok=True)
+            _messages, first_seconds, _info = read(path, year_month)
+            samples = []
+            for _ in range(max(1, args.repeticiones)):
+                _messages, seconds, info = read(path, year_month)
+                samples.append(seconds)
+            share = info["bytes_parsed"] / max(1, path.stat().st_size)
+            print(f"{year_month[0]}-{year_month[1]:02d}   {first_seconds:9.3f} s {statistics.median(samples):9.3f} s {share:13.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Memoria pico del pipeline con listas (parse_chat_folder_with_stats -> link -> build_dataframe) contra el
+pipeline en streaming (iter_folder_messages -> iter_linked_requests con ventana -> iter_record_batches).
+
+Uso (desde python/bitacora_service):
+  python benchmarks/bench_stream_memory.py [--mensajes 50000,200000,500000] [--ventana-dias 30]
+
+Genera un export sintético de WhatsApp por tamaño y mide con tracemalloc; también verifica que ambos
+pipelines produzcan las mismas filas cuando la ventana no corta ninguna confirmación.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import processor  # noqa: E402
+
+REQUEST_TEXTS = ["la bomba no sirve", "favor revisar el aire del aula 3", "hay una fuga en el baño", "Pueden revisar esto por favor"]
+CONFIRMATION_TEXTS = ["listo", "ya quedó", "reparado", "ok"]
+CHAT_TEXTS = ["buenos días", "gracias", "voy para allá", "en un rato"]
+
+
+def write_chat(path: Path, count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    when = datetime(2024, 1, 1, 8, 0, 0)
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(count):
+            when += timedelta(seconds=rng.randint(20, 900))
+            roll = rng.random()
+            texts = REQUEST_TEXTS if roll < 0.35 else CONFIRMATION_TEXTS if roll < 0.6 else CHAT_TEXTS
+            stamp = when.strftime("%d/%m/%y, %I:%M:%S %p")
+            fh.write(f"[{stamp}] ~ Autor {i % 23}: {rng.choice(texts)} #{i}\n")
+
+
+def list_pipeline(folder: Path):
+    messages, _stats = processor.parse_chat_folder_with_stats(folder, workers=1)
+    df = processor.build_dataframe(processor.link_requests_and_confirmations(messages))
+    return [row for row in processor._record_rows(df)]
+
+
+def stream_pipeline(folder: Path, window, keep: bool):
+    files = sorted(folder.glob("*.txt"))
+    rows = [] if keep else None
+    count = 0
+    linked = processor.iter_linked_requests(processor.iter_folder_messages(files), window)
+    for batch in processor.iter_record_batches(linked):
+        count += len(batch)
+        if keep:
+            rows.extend(batch)
+    return rows if keep else count
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", default="50000,200000,500000")
+    parser.add_argument("--ventana-dias", type=float, default=30)
+    args = parser.parse_args()
+    window = timedelta(days=args.ventana_dias) if args.ventana_dias > 0 else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        check = folder / "chat.txt"
+        write_chat(check, 20000, seed=1)
+        if list_pipeline(folder) != stream_pipeline(folder, window, keep=True):
+            print("ERROR: el pipeline en streaming produjo filas distintas", file=sys.stderr)
+            sys.exit(1)
+        print("Filas idénticas entre ambos pipelines (20.000 mensajes).")
+
+        for count in (int(c) for c in args.mensajes.split(",")):
+            write_chat(check, count, seed=count)
+            size_mb = check.stat().st_size / 1e6
+            rows, list_peak, list_time = measure(lambda: list_pipeline(folder))
+            total, stream_peak, stream_time = measure(lambda: stream_pipeline(folder, window, keep=False))
+            print(
+                f"{count:>9,} mensajes ({size_mb:6.1f} MB, {total:,} registros)  "
+                f"listas: pico {list_peak / 1e6:8.1f} MB {list_time:6.2f} s   "
+                f"streaming: pico {stream_peak / 1e6:8.1f} MB {stream_time:6.2f} s"
+            )
+            del rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Suite de benchmarks del servicio de bitácoras sobre exports sintéticos (synthetic_chat.py).
+
+Uso (desde python/bitacora_service):
+  python benchmarks/run_suite.py [--lineas 10000,100000,1000000] [--etapas parse_line,link,...] [--archivos 1]
+      [--memoria] [--salida benchmarks/results/mi_corrida.json] [--comparar benchmarks/results/anterior.json]
+
+Etapas, en orden (cada una usa el resultado de la anterior): parse_line, parse_folder (parse_chat_folder_with_stats),
+link (link_requests_and_confirmations), build_dataframe, export_excel (export_to_excel) y metricas
+(/bitacora/metricas sin agregados, con el .metricas.json y con el cache en memoria).
+Los resultados se guardan como JSON (commit, entorno, configuración y segundos/ítems por etapa y tamaño) en
+benchmarks/results/; con --comparar se muestra la razón contra otra corrida y el proceso termina con código 1
+si alguna etapa es más lenta que --tolerancia.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+import processor  # noqa: E402
+from aggregates import AGGREGATE_CACHE, aggregates_path_for  # noqa: E402
+from synthetic_chat import ChatSpec, build_folder  # noqa: E402
+
+RESULTS_DIR = BENCH_DIR / "results"
+RESULTS_VERSION = 1
+STAGES = ["parse_line", "parse_folder", "link", "build_dataframe", "export_excel", "metricas"]
+# Filas de datos que admite una hoja de Excel (más la fila de encabezados)
+EXCEL_MAX_ROWS = 1048575
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--", ".")),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parse_workers": processor.PARSE_WORKERS,
+    }
+
+
+class StageTimer:
+    """Mide cada etapa (mejor de N repeticiones) y acumula los resultados de un tamaño."""
+
+    def __init__(self, lines: int, repeat: int, memory: bool):
+        self.lines = lines
+        self.repeat = max(1, repeat)
+        self.memory = memory
+        self.results: List[Dict] = []
+
+    def run(self, stage: str, fn: Callable[[], object], items: Callable[[object], int], record: bool = True, **extra):
+        best = None
+        peak = None
+        result = None
+        # Las etapas que solo preparan datos para las siguientes corren una vez
+        for attempt in range(self.repeat if record else 1):
+            if self.memory and record and attempt == 0:
+                tracemalloc.start()
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            if self.memory and record and attempt == 0:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            best = elapsed if best is None else min(best, elapsed)
+        if record:
+            count = items(result)
+            entry = {"lines": self.lines, "stage": stage, "seconds": round(best, 6), "items": count,
+                     "per_second": round(count / best, 1) if best else None, **extra}
+            if peak is not None:
+                entry["peak_mb"] = round(peak / 1e6, 2)
+            self.results.append(entry)
+            print(f"  {stage:<22} {best:9.3f} s  {count:>12,} ítems  {entry['per_second'] or 0:>14,.0f} /s")
+        return result
+
+
+def _parse_lines(folder: Path) -> int:
+    parsed = 0
+    for path in sorted(folder.glob("*.txt")):
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            for line in fh:
+                if processor.parse_line(line):
+                    parsed += 1
+    return parsed
+
+
+def _metricas(main_module, output_dir: Path, mode: str) -> Dict:
+    if mode != "cache":
+        AGGREGATE_CACHE._items.clear()
+    if mode == "frio":
+        for path in output_dir.glob("*.xlsx"):
+            aggregates_path_for(path).unlink(missing_ok=True)
+    return main_module.metricas()
+
+
+def run_size(lines: int, args, selected: List[str]) -> List[Dict]:
+    last = max(STAGES.index(stage) for stage in selected)
+    timer = StageTimer(lines, args.repeticiones, args.memoria)
+    spec = ChatSpec(lines=lines, days=args.dias, confirmation=args.confirmaciones, seed=args.semilla)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "fuente"
+        output_dir = Path(tmp) / "salida"
+        output_dir.mkdir()
+        stats = build_folder(source, spec, args.archivos)
+        size_mb = sum(item["bytes"] for item in stats) / 1e6
+        print(f"{lines:,} líneas en {len(stats)} archivo(s), {size_mb:.1f} MB")
+
+        if "parse_line" in selected:
+            timer.run("parse_line", lambda: _parse_lines(source), lambda _parsed: lines)
+        if last < STAGES.index("parse_folder"):
+            return timer.results
+        messages, _stats = timer.run(
+            "parse_folder", lambda: processor.parse_chat_folder_with_stats(source, workers=args.workers),
+            lambda result: len(result[0]), record="parse_folder" in selected, workers=args.workers,
+        )
+        if last < STAGES.index("link"):
+            return timer.results
+        linked = timer.run("link", lambda: processor.link_requests_and_confirmations(messages), len, record="link" in selected)
+        del messages
+        if last < STAGES.index("build_dataframe"):
+            return timer.results
+        df = timer.run("build_dataframe", lambda: processor.build_dataframe(linked), len, record="build_dataframe" in selected)
+        del linked
+        if last < STAGES.index("export_excel"):
+            return timer.results
+        if len(df) > EXCEL_MAX_ROWS:
+            print(f"  export_excel / metricas omitidas: {len(df):,} registros no caben en una hoja de Excel")
+            return timer.results
+        workbook = output_dir / "bitacora_sintetico_2024.xlsx"
+
+        def export() -> int:
+            workbook.unlink(missing_ok=True)
+            processor.export_to_excel(df, str(workbook))
+            return len(df)
+
+        timer.run("export_excel", export, lambda n: n, record="export_excel" in selected)
+        if "metricas" not in selected:
+            return timer.results
+        # main abre el almacén de su carpeta de salida al importarse: se apunta a una carpeta temporal
+        os.environ.setdefault("BITACORA_OUTPUT_DIR", tempfile.mkdtemp(prefix="bitacora_suite_"))
+        import main as main_module
+
+        main_module.BITACORA_OUTPUT_DIR = output_dir
+        for mode in ("frio", "sidecar", "cache"):
+            timer.run(f"metricas_{mode}", lambda: _metricas(main_module, output_dir, mode), lambda r: r["total_registros"])
+    return timer.results
+
+
+def compare(current: Dict, previous_path: Path, tolerance: float, minimum: float) -> bool:
+    """
+    Imprime la razón de tiempos contra otra corrida; retorna True si alguna etapa empeoró más que tolerance.
+    Las etapas que tardan menos de minimum segundos en ambas corridas se muestran pero no cuentan (ruido).
+    """
+    previous = json.loads(Path(previous_path).read_text(encoding="utf-8"))
+    before = {(item["lines"], item["stage"]): item for item in previous.get("results", [])}
+    regressed = False
+    print(f"\nComparación contra {previous_path} (commit {str(previous.get('environment', {}).get('commit'))[:10]})")
+    for item in current["results"]:
+        old = before.get((item["lines"], item["stage"]))
+        if not old or not old["seconds"]:
+            continue
+        ratio = item["seconds"] / old["seconds"]
+        flag = "  REGRESIÓN" if ratio > tolerance and max(item["seconds"], old["seconds"]) >= minimum else ""
+        regressed = regressed or bool(flag)
+        print(f"  {item['lines']:>10,} {item['stage']:<22} {old['seconds']:9.3f} s -> {item['seconds']:9.3f} s  x{ratio:5.2f}{flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lineas", default="10000,100000,1000000", help="Tamaños en líneas (hasta 10000000)")
+    parser.add_argument("--etapas", default=",".join(STAGES))
+    parser.add_argument("--archivos", type=int, default=1, help="Exports en los que se reparte cada tamaño")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos de parse_folder")
+    parser.add_argument("--dias", type=float, default=365)
+    parser.add_argument("--confirmaciones", type=float, default=0.35)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=1, help="Se guarda el mejor tiempo de N")
+    parser.add_argument("--memoria", action="store_true", help="Mide el pico de memoria (tracemalloc, más lento)")
+    parser.add_argument("--salida", help="JSON de resultados (por defecto benchmarks/results/<fecha>_<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=1.2, help="Razón de tiempo a partir de la cual es regresión")
+    parser.add_argument("--minimo", type=float, default=0.05, help="Segundos por debajo de los cuales no se marca regresión")
+    args = parser.parse_args()
+
+    selected = [stage.strip() for stage in args.etapas.split(",") if stage.strip()]
+    unknown = [stage for stage in selected if stage not in STAGES]
+    if unknown:
+        parser.error(f"Etapas desconocidas: {', '.join(unknown)} (disponibles: {', '.join(STAGES)})")
+
+    env = environment()
+    report = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": env,
+        "config": {
+            "stages": selected, "files": args.archivos, "workers": args.workers, "repeat": args.repeticiones,
+            "chat": ChatSpec(days=args.dias, confirmation=args.confirmaciones, seed=args.semilla).to_dict(),
+        },
+        "results": [],
+    }
+    for lines in (int(size) for size in args.lineas.split(",")):
+        report["results"].extend(run_size(lines, args, selected))
+
+    if args.salida:
+        target = Path(args.salida)
+    else:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        target = RESULTS_DIR / f"{stamp}_{(env['commit'] or 'sin_commit')[:10]}.json"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\nResultados: {target}")
+
+    if args.comparar and compare(report, Path(args.comparar), args.tolerancia, args.minimo):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Generador determinístico de exports de WhatsApp para los benchmarks del servicio de bitácoras.
+Con la misma configuración y semilla produce exactamente el mismo archivo; se escribe en streaming, así que
+sirve igual para 10k que para 10M líneas.
+
+Uso (desde python/bitacora_service):
+  python benchmarks/synthetic_chat.py salida.txt [--lineas 100000] [--dias 365] [--ampm "a. m.,p.m.,pm"]
+      [--invisibles 0.3] [--multilinea 0.05] [--multimedia 0.08] [--sistema 0.01] [--confirmaciones 0.35]
+
+Configurable: cantidad de líneas, rango de fechas, variantes de AM/PM del locale (cada una se escribe en su forma
+de la mañana, p. ej. "a. m."; la de la tarde se obtiene cambiando a->p), marcas Unicode invisibles (LRM al inicio,
+espacio angosto antes de AM/PM, BOM), mensajes de varias líneas, líneas de multimedia/sistema y la proporción de
+confirmaciones y solicitudes.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence
+
+REQUEST_TEXTS = [
+    "la bomba no sirve", "favor revisar el aire del aula {n}", "hay una fuga en el baño del piso {n}",
+    "Pueden revisar esto por favor", "se quebró la ventana de la oficina {n}", "no funciona la luz del pasillo",
+    "urgente: el sanitario del módulo {n} gotea", "favor pintar la pared de recepción", "cambiar el foco del aula {n}",
+]
+CONFIRMATION_TEXTS = ["listo", "ya quedó", "reparado", "ok", "Listo, ya funciona", "solucionado", "terminado el aula {n}"]
+CHAT_TEXTS = ["buenos días", "gracias", "voy para allá", "en un rato", "👍", "de acuerdo", "mañana temprano paso {n}"]
+CONTINUATION_TEXTS = ["queda en el segundo piso", "es la del fondo", "ya avisé a la administración", "adjunto detalle"]
+MEDIA_TEXTS = ["imagen omitida", "audio omitted", "video omitted", "\u200eimage omitted"]
+SYSTEM_TEXTS = ["se eliminó este mensaje", "this message was deleted"]
+ENCRYPTION_NOTICE = "Los mensajes y las llamadas están cifrados de extremo a extremo."
+
+LRM = "\u200e"
+NARROW_SPACE = "\u202f"
+BOM = "\ufeff"
+
+
+class ChatSpec:
+    """Parámetros de un export sintético; las proporciones son probabilidades por mensaje."""
+
+    def __init__(
+        self,
+        lines: int = 10000,
+        start: datetime = datetime(2024, 1, 1, 7, 0, 0),
+        days: float = 365,
+        authors: int = 25,
+        ampm: Sequence[str] = ("a. m.", "p.m.", "pm"),
+        invisible: float = 0.3,
+        multiline: float = 0.05,
+        media: float = 0.08,
+        system: float = 0.01,
+        confirmation: float = 0.35,
+        request: float = 0.4,
+        four_digit_year: bool = False,
+        group: str = "Mantenimiento Sintético",
+        seed: int = 0,
+    ):
+        self.lines = max(1, int(lines))
+        self.start = start
+        self.days = days
+        self.authors = max(1, int(authors))
+        self.ampm = [variant for variant in ampm if variant.strip()] or ["am"]
+        self.invisible = invisible
+        self.multiline = multiline
+        self.media = media
+        self.system = system
+        self.confirmation = confirmation
+        self.request = request
+        self.four_digit_year = four_digit_year
+        self.group = group
+        self.seed = seed
+
+    def to_dict(self) -> Dict:
+        return {
+            "lines": self.lines, "start": self.start.isoformat(), "days": self.days, "authors": self.authors,
+            "ampm": list(self.ampm), "invisible": self.invisible, "multiline": self.multiline, "media": self.media,
+            "system": self.system, "confirmation": self.confirmation, "request": self.request,
+            "four_digit_year": self.four_digit_year, "group": self.group, "seed": self.seed,
+        }
+
+
+def _afternoon(variant: str) -> str:
+    return variant.replace("a", "p", 1).replace("A", "P", 1)
+
+
+def _stamp(when: datetime, variant: str, spec: ChatSpec, invisible: bool) -> str:
+    date_part = f"{when.day}/{when.month}/{when.year if spec.four_digit_year else when.year % 100:02d}"
+    hour = when.hour % 12 or 12
+    suffix = variant if when.hour < 12 else _afternoon(variant)
+    space = NARROW_SPACE if invisible else " "
+    return f"[{date_part}, {hour}:{when.minute:02d}:{when.second:02d}{space}{suffix}]"
+
+
+def iter_lines(spec: ChatSpec) -> Iterator[str]:
+    """Líneas del export (sin salto final), exactamente spec.lines."""
+    rng = random.Random(spec.seed)
+    names = [f"Técnico {i}" if i % 4 == 0 else f"Usuario {i}" for i in range(spec.authors)]
+    # Paso medio entre mensajes para cubrir el rango de fechas pedido
+    step = max(1.0, spec.days * 86400 / spec.lines)
+    when = spec.start
+    emitted = 1
+    yield f"{BOM}{_stamp(when, spec.ampm[0], spec, False)} {spec.group}: {ENCRYPTION_NOTICE}"
+    while emitted < spec.lines:
+        when += timedelta(seconds=max(1, int(rng.expovariate(1 / step))))
+        variant = spec.ampm[rng.randrange(len(spec.ampm))]
+        invisible = rng.random() < spec.invisible
+        author = names[rng.randrange(len(names))]
+        roll = rng.random()
+        if roll < spec.media:
+            text = rng.choice(MEDIA_TEXTS)
+        elif roll < spec.media + spec.system:
+            text = rng.choice(SYSTEM_TEXTS)
+        else:
+            roll = rng.random()
+            pool = CONFIRMATION_TEXTS if roll < spec.confirmation else REQUEST_TEXTS if roll < spec.confirmation + spec.request else CHAT_TEXTS
+            text = rng.choice(pool).format(n=rng.randint(1, 40))
+        prefix = LRM if invisible else ""
+        # WhatsApp antepone "~" y un NBSP a los contactos que no están guardados
+        marker = "~\u00a0" if rng.random() < 0.5 else ""
+        yield f"{prefix}{_stamp(when, variant, spec, invisible)} {marker}{author}: {text}"
+        emitted += 1
+        while emitted < spec.lines and rng.random() < spec.multiline:
+            yield rng.choice(CONTINUATION_TEXTS)
+            emitted += 1
+
+
+def write_export(path: Path, spec: ChatSpec) -> Dict:
+    """Escribe el export en path; retorna nombre, líneas y bytes."""
+    path = Path(path)
+    lines = 0
+    buffer: List[str] = []
+    with open(path, "w", encoding="utf-8", newline="\n") as fh:
+        for line in iter_lines(spec):
+            buffer.append(line)
+            lines += 1
+            if len(buffer) >= 10000:
+                fh.write("\n".join(buffer) + "\n")
+                buffer = []
+        if buffer:
+            fh.write("\n".join(buffer) + "\n")
+    return {"file": path.name, "lines": lines, "bytes": path.stat().st_size}
+
+
+def build_folder(folder: Path, spec: ChatSpec, files: int = 1) -> List[Dict]:
+    """Reparte spec.lines entre `files` exports (grupos y semillas distintos) dentro de folder."""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    files = max(1, files)
+    stats = []
+    for index in range(files):
+        lines = spec.lines // files + (1 if index < spec.lines % files else 0)
+        values = {**spec.to_dict(), "start": spec.start, "lines": lines, "seed": spec.seed * 1000 + index}
+        part = ChatSpec(**{**values, "group": f"{spec.group} {index + 1}"})
+        stats.append(write_export(folder / f"sintetico_{index + 1:02d}.txt", part))
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("salida")
+    parser.add_argument("--lineas", type=int, default=100000)
+    parser.add_argument("--inicio", default="2024-01-01T07:00:00")
+    parser.add_argument("--dias", type=float, default=365)
+    parser.add_argument("--autores", type=int, default=25)
+    parser.add_argument("--ampm", default="a. m.,p.m.,pm", help="Variantes de la mañana separadas por coma")
+    parser.add_argument("--invisibles", type=float, default=0.3)
+    parser.add_argument("--multilinea", type=float, default=0.05)
+    parser.add_argument("--multimedia", type=float, default=0.08)
+    parser.add_argument("--sistema", type=float, default=0.01)
+    parser.add_argument("--confirmaciones", type=float, default=0.35)
+    parser.add_argument("--solicitudes", type=float, default=0.4)
+    parser.add_argument("--anio-4-digitos", action="store_true")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = ChatSpec(
+        lines=args.lineas, start=datetime.fromisoformat(args.inicio), days=args.dias, authors=args.autores,
+        ampm=args.ampm.split(","), invisible=args.invisibles, multiline=args.multilinea, media=args.multimedia,
+        system=args.sistema, confirmation=args.confirmaciones, request=args.solicitudes,
+        four_digit_year=args.anio_4_digitos, seed=args.semilla,
+    )
+    stats = write_export(Path(args.salida), spec)
+    print(f"{stats['file']}: {stats['lines']:,} líneas, {stats['bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
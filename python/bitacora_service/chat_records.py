@@ -0,0 +1,114 @@
+"""
+Representación compacta de mensajes del chat y solicitudes enlazadas.
+ChatMessage y LinkedRequest usan __slots__ (sin dict por instancia); la fecha se guarda como segundos desde epoch
+(int, hora local del chat sin zona) y el datetime se arma solo cuando se pide. Los autores llegan ya internados
+desde LineParser, así que todos los mensajes de una misma persona comparten el mismo str.
+Ambas clases aceptan el acceso tipo dict (msg["datetime"], item["confirmation"]) del código que las trataba como dicts.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Optional
+
+_EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = _EPOCH.toordinal()
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def epoch_seconds(when: datetime) -> int:
+    return (when.toordinal() - EPOCH_ORDINAL) * 86400 + when.hour * 3600 + when.minute * 60 + when.second
+
+
+def from_epoch(ts: int) -> datetime:
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def format_epoch(ts: int) -> str:
+    return from_epoch(ts).strftime(TIMESTAMP_FORMAT)
+
+
+class ChatMessage:
+    """Mensaje parseado: ts (segundos epoch), author, message y las categorías ya clasificadas (cache)."""
+
+    __slots__ = ("ts", "author", "_message", "categories")
+    _KEYS = ("datetime", "author", "message")
+
+    def __init__(self, ts: int, author: str, message: str):
+        self.ts = ts
+        self.author = author
+        self._message = message
+        self.categories: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def from_datetime(cls, when: datetime, author: str, message: str) -> "ChatMessage":
+        return cls(epoch_seconds(when), author, message)
+
+    @property
+    def datetime(self) -> datetime:
+        return from_epoch(self.ts)
+
+    @property
+    def message(self) -> str:
+        return self._message
+
+    @message.setter
+    def message(self, value: str) -> None:
+        # El texto cambió (p. ej. líneas de continuación): hay que volver a clasificarlo
+        self._message = value
+        self.categories = None
+
+    def __getitem__(self, key: str):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == "datetime":
+            self.ts = epoch_seconds(value)
+        elif key in self._KEYS:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self._KEYS else default
+
+    def to_dict(self) -> Dict:
+        return {"datetime": self.datetime, "author": self.author, "message": self._message}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChatMessage):
+            return (self.ts, self.author, self._message) == (other.ts, other.author, other._message)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ChatMessage({format_epoch(self.ts)!r}, {self.author!r}, {self._message!r})"
+
+
+class LinkedRequest:
+    """Solicitud y la confirmación que la cerró (None si sigue pendiente)."""
+
+    __slots__ = ("request", "confirmation")
+    _KEYS = ("request", "confirmation")
+
+    def __init__(self, request: ChatMessage, confirmation: Optional[ChatMessage] = None):
+        self.request = request
+        self.confirmation = confirmation
+
+    def __getitem__(self, key: str):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self._KEYS else default
+
+    def __repr__(self) -> str:
+        return f"LinkedRequest({self.request!r}, {self.confirmation!r})"
@@ -0,0 +1,84 @@
+"""
+Checkpoints de ingesta incremental por archivo fuente.
+Los exports de WhatsApp solo crecen al final: por cada .txt se guarda tamaño, mtime, hash del prefijo
+ya procesado, offset en bytes y último mensaje parseado, para que la siguiente corrida lea solo la cola.
+Si el prefijo cambió (archivo reemplazado o editado) se vuelve a parsear completo.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CHECKPOINT_VERSION = 1
+
+
+def new_hasher():
+    return hashlib.sha256()
+
+
+def hash_prefix(buffer, length: int):
+    """Hashea los primeros `length` bytes de un buffer (bytes, mmap o memoryview) y devuelve el hasher para seguir con la cola."""
+    hasher = new_hasher()
+    hasher.update(buffer[:length])
+    return hasher
+
+
+class CheckpointStore:
+    """
+    Checkpoints de un cliente, agrupados por alcance ("todo" o un periodo YYYY-MM).
+    Los cambios quedan pendientes hasta commit(), que se llama solo cuando el Excel ya se escribió.
+    """
+
+    def __init__(self, path: Path, scope: str, output_dir: Optional[Path] = None):
+        self.path = Path(path)
+        self.scope = scope or "todo"
+        self._data = self._load()
+        scope_data = self._data["scopes"].get(self.scope) or {}
+        # Si alguno de los Excel alimentados por estos checkpoints ya no existe, hay que reprocesar todo
+        outputs = scope_data.get("outputs") or []
+        if output_dir is not None and any(not (Path(output_dir) / name).exists() for name in outputs):
+            scope_data = {}
+        self._files: Dict[str, Dict] = dict(scope_data.get("files") or {})
+        self._outputs: List[str] = list(scope_data.get("outputs") or []) if scope_data else []
+        self._pending: Dict[str, Dict] = {}
+
+    def _load(self) -> Dict:
+        if not self.path.exists():
+            return {"version": CHECKPOINT_VERSION, "scopes": {}}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8") or "{}")
+            if data.get("version") != CHECKPOINT_VERSION or not isinstance(data.get("scopes"), dict):
+                raise ValueError("invalid format")
+            return data
+        except Exception:
+            return {"version": CHECKPOINT_VERSION, "scopes": {}}
+
+    def get(self, name: str) -> Optional[Dict]:
+        return self._files.get(name)
+
+    def latest_message(self) -> Optional[datetime]:
+        """Fecha del último mensaje parseado en las corridas anteriores (el más reciente entre los archivos)."""
+        stamps = [
+            datetime.fromisoformat(entry["last_message"]["datetime"])
+            for entry in self._files.values()
+            if (entry.get("last_message") or {}).get("datetime")
+        ]
+        return max(stamps, default=None)
+
+    def stage(self, name: str, entry: Dict) -> None:
+        self._pending[name] = entry
+
+    def mark_output(self, filename: str) -> None:
+        if filename and filename not in self._outputs:
+            self._outputs.append(filename)
+
+    def commit(self) -> None:
+        self._files.update(self._pending)
+        self._pending = {}
+        self._data["scopes"][self.scope] = {"files": self._files, "outputs": self._outputs}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(self._data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
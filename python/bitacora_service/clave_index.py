@@ -0,0 +1,205 @@
+"""
+Índice persistente de claves de registro (Fecha Solicitud | Reportado Por | Descripcion) para export_to_excel.
+Cada clave se guarda como un hash de 64 bits en un arreglo ordenado, en un archivo .claves junto al Excel,
+de modo que los registros nuevos se verifican sin leer el libro existente.
+
+Uso (desde python/bitacora_service):
+  python clave_index.py verificar output/bitacora_UACA_2026.xlsx
+  python clave_index.py reconstruir output/bitacora_UACA_2026.xlsx
+  python clave_index.py memoria --claves 1000000
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import tracemalloc
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+INDEX_SUFFIX = ".claves"
+_MAGIC = b"CLV1"
+# cantidad de hashes, filas del Excel, tamaño y mtime_ns del Excel cuando se escribió el índice
+_HEADER = struct.Struct("<4sQQQq")
+
+
+def hash_clave(clave: str) -> int:
+    """Hash de ancho fijo (64 bits) de una clave de registro."""
+    return int.from_bytes(hashlib.blake2b(clave.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def index_path_for(output_path) -> Path:
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + INDEX_SUFFIX)
+
+
+class ClaveIndex:
+    """Arreglo ordenado de hashes de clave (8 bytes por registro) con búsqueda binaria."""
+
+    def __init__(self, path: Path, hashes: Optional[array] = None, rows: int = 0, source_size: int = -1, source_mtime_ns: int = -1):
+        self.path = Path(path)
+        self.hashes = hashes if hashes is not None else array("Q")
+        self.rows = rows
+        self.source_size = source_size
+        self.source_mtime_ns = source_mtime_ns
+
+    @classmethod
+    def load(cls, path: Path) -> "ClaveIndex":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        try:
+            with open(path, "rb") as fh:
+                magic, count, rows, size, mtime_ns = _HEADER.unpack(fh.read(_HEADER.size))
+                if magic != _MAGIC:
+                    raise ValueError("invalid format")
+                hashes = array("Q")
+                hashes.fromfile(fh, count)
+            if sys.byteorder != "little":
+                hashes.byteswap()
+            return cls(path, hashes, rows, size, mtime_ns)
+        except Exception as exc:
+            print(f"Índice de claves inválido ({path.name}: {exc}); se reconstruirá.")
+            return cls(path)
+
+    @classmethod
+    def for_output(cls, output_path) -> "ClaveIndex":
+        return cls.load(index_path_for(output_path))
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __contains__(self, key_hash: int) -> bool:
+        hashes = self.hashes
+        pos = bisect_left(hashes, key_hash)
+        return pos < len(hashes) and hashes[pos] == key_hash
+
+    def is_current(self, output_path) -> bool:
+        """True si el índice se escribió para el Excel tal como está ahora en disco."""
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return False
+        return stat.st_size == self.source_size and stat.st_mtime_ns == self.source_mtime_ns
+
+    def add(self, key_hashes: Iterable[int], rows: int) -> None:
+        """
+        Agrega hashes (sin duplicados) y suma las filas escritas en el Excel. Vectorizado con numpy: los nuevos se
+        ordenan, se ubican con searchsorted y se insertan en una sola copia del arreglo, sin recorrerlo en Python.
+        """
+        import numpy as np
+
+        fresh = np.unique(np.fromiter(key_hashes, dtype=np.uint64))
+        if len(fresh):
+            existing = np.frombuffer(self.hashes, dtype=np.uint64) if len(self.hashes) else np.empty(0, np.uint64)
+            positions = np.searchsorted(existing, fresh)
+            found = positions < len(existing)
+            found[found] = existing[positions[found]] == fresh[found]
+            if not found.all():
+                merged = np.insert(existing, positions[~found], fresh[~found])
+                self.hashes = array("Q")
+                self.hashes.frombytes(merged.tobytes())
+        self.rows += rows
+
+    def save(self, output_path) -> None:
+        stat = os.stat(output_path)
+        self.source_size, self.source_mtime_ns = stat.st_size, stat.st_mtime_ns
+        hashes = self.hashes
+        if sys.byteorder != "little":
+            hashes = array("Q", hashes)
+            hashes.byteswap()
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            fh.write(_HEADER.pack(_MAGIC, len(hashes), self.rows, self.source_size, self.source_mtime_ns))
+            hashes.tofile(fh)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def from_claves(cls, path: Path, claves: Iterable[str], rows: int) -> "ClaveIndex":
+        index = cls(path)
+        index.add((hash_clave(c) for c in claves), rows)
+        return index
+
+
+def rebuild_from_workbook(output_path) -> ClaveIndex:
+    """Reconstruye el índice leyendo el Excel (único momento en que hace falta cargar el libro)."""
+    import processor
+
+    existing_df = processor.read_existing_workbook(str(output_path))
+    claves = processor._key_column(existing_df).dropna().tolist()
+    index = ClaveIndex.from_claves(index_path_for(output_path), claves, len(existing_df))
+    index.save(output_path)
+    return index
+
+
+def verify(output_path) -> List[str]:
+    """Compara el índice guardado con las claves reales del Excel. Retorna la lista de problemas encontrados."""
+    import processor
+
+    problems: List[str] = []
+    index = ClaveIndex.for_output(output_path)
+    if not index.path.exists():
+        return [f"No existe {index.path.name}"]
+    if not index.is_current(output_path):
+        problems.append("El Excel cambió después de escribir el índice (tamaño/mtime distintos)")
+    existing_df = processor.read_existing_workbook(str(output_path))
+    expected = set(hash_clave(c) for c in processor._key_column(existing_df).dropna())
+    stored = set(index.hashes)
+    if expected - stored:
+        problems.append(f"{len(expected - stored)} claves del Excel no están en el índice")
+    if stored - expected:
+        problems.append(f"{len(stored - expected)} hashes del índice no corresponden a filas del Excel")
+    if index.rows != len(existing_df):
+        problems.append(f"Filas registradas {index.rows}, filas en el Excel {len(existing_df)}")
+    return problems
+
+
+def memory_report(count: int) -> None:
+    """Memoria de `count` claves: set de strings (dedupe anterior) contra el arreglo de hashes."""
+    sample = [f"2026-02-{(i % 28) + 1:02d} 09:{i % 60:02d}:{(i // 60) % 60:02d}|Autor {i % 40}|Descripcion del problema numero {i}" for i in range(count)]
+
+    tracemalloc.start()
+    as_set = set(sample)
+    set_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del as_set
+
+    index = ClaveIndex.from_claves(Path("memoria" + INDEX_SUFFIX), sample, count)
+    array_bytes = index.hashes.itemsize * len(index.hashes)
+
+    strings_bytes = sum(sys.getsizeof(s) for s in sample)
+    print(f"{count:,} claves")
+    print(f"  set de claves (sin contar los strings): {set_bytes / 1e6:10.1f} MB")
+    print(f"  strings de clave:                     {strings_bytes / 1e6:10.1f} MB")
+    print(f"  índice de hashes de 64 bits:          {array_bytes / 1e6:10.1f} MB (en disco: {(array_bytes + _HEADER.size) / 1e6:.1f} MB)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Índice de claves de las bitácoras exportadas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    for name in ("verificar", "reconstruir"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("excel", nargs="+")
+    mem = sub.add_parser("memoria")
+    mem.add_argument("--claves", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if args.comando == "memoria":
+        memory_report(args.claves)
+        return
+    failed = False
+    for excel in args.excel:
+        if args.comando == "reconstruir":
+            index = rebuild_from_workbook(excel)
+            print(f"{excel}: {len(index)} claves, {index.rows} filas")
+            continue
+        problems = verify(excel)
+        failed = failed or bool(problems)
+        print(f"{excel}: {'OK' if not problems else '; '.join(problems)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
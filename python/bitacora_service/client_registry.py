@@ -0,0 +1,222 @@
+"""
+Registro de clientes (output/clientes.json) en memoria.
+Se carga una vez y se consulta con un índice por nombre y alias sin distinguir mayúsculas; el archivo se relee
+solo si cambió su mtime/tamaño (edición externa u otro proceso) y se escribe completo a un temporal que
+reemplaza al original, bajo un lock del proceso y un lock de archivo (clientes.json.lock) entre procesos, para que
+dos altas simultáneas no se pisen.
+
+Cada entrada es un nombre o un objeto con metadatos:
+  ["Cliente Principal", {"nombre": "UACA", "alias": ["Universidad"], "archivos": ["uaca_*.txt"], "grupos": ["Mantenimiento UACA"]}]
+archivos (patrones glob) y grupos (texto del nombre del grupo) se suman al enrutamiento de enrutamiento.json.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from routing import SourceRouting
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CLIENTS_FILE_NAME = "clientes.json"
+# Cada cuánto se mira el mtime del archivo como máximo (segundos)
+RELOAD_CHECK_INTERVAL = 1.0
+METADATA_LISTS = ("alias", "archivos", "grupos")
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Lock exclusivo entre procesos sobre path (se crea vacío si no existe)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _clean_list(values) -> List[str]:
+    if isinstance(values, str):
+        values = [values]
+    if not isinstance(values, (list, tuple)):
+        return []
+    cleaned: List[str] = []
+    for value in values:
+        text = str(value).strip()
+        if text and text not in cleaned:
+            cleaned.append(text)
+    return cleaned
+
+
+def _normalize(item) -> Optional[Dict]:
+    """Entrada del archivo como dict {nombre, alias, archivos, grupos, ...}; None si no tiene nombre."""
+    if not isinstance(item, dict):
+        item = {"nombre": item}
+    nombre = str(item.get("nombre") or "").strip()
+    if not nombre:
+        return None
+    entry = {"nombre": nombre, **{key: _clean_list(item.get(key)) for key in METADATA_LISTS}}
+    # Otros campos que haya agregado alguien a mano se conservan al reescribir el archivo
+    entry.update((key, value) for key, value in item.items() if key not in entry)
+    return entry
+
+
+def _serialize(entry: Dict):
+    """Solo el nombre si no tiene metadatos (mismo formato que la lista original)."""
+    extra = {key: value for key, value in entry.items() if key != "nombre" and value not in ([], None, "")}
+    if not extra:
+        return entry["nombre"]
+    return {"nombre": entry["nombre"], **extra}
+
+
+class ClientRegistry:
+    def __init__(self, path: Path, default: Optional[str] = None):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.default = (default or "").strip() or None
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        # nombre o alias en minúsculas -> clave (nombre en minúsculas) de la entrada
+        self._index: Dict[str, str] = {}
+        self._fingerprint: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        with self._lock, _file_lock(self.lock_path):
+            if not self._reload():
+                # Sin archivo: se crea con el cliente por defecto (única escritura que no viene de un alta)
+                self._save()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload(self, force: bool = False) -> bool:
+        """Relee el archivo si cambió su mtime/tamaño (o siempre, con force). Retorna False si no existe."""
+        self._checked_at = time.monotonic()
+        fingerprint = self._stat()
+        if fingerprint is None:
+            self._set_entries([])
+            self._fingerprint = None
+            return False
+        if fingerprint == self._fingerprint and not force:
+            return True
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8") or "[]")
+            if not isinstance(data, list):
+                raise ValueError("invalid format")
+            entries = [entry for entry in (_normalize(item) for item in data) if entry]
+        except Exception as exc:
+            print(f"Registro de clientes inválido ({self.path.name}: {exc}); se usa solo el cliente por defecto.")
+            entries = []
+        self._set_entries(entries)
+        self._fingerprint = fingerprint
+        return True
+
+    def _set_entries(self, entries: Iterable[Dict]) -> None:
+        self._entries = {}
+        self._index = {}
+        for entry in entries:
+            self._insert(entry)
+        # El cliente por defecto siempre está (en memoria; se persiste con la próxima escritura)
+        if self.default and self.default.lower() not in self._index:
+            self._insert(_normalize(self.default))
+
+    def _insert(self, entry: Dict) -> bool:
+        key = entry["nombre"].lower()
+        if key in self._entries:
+            return False
+        self._entries[key] = entry
+        self._index[key] = key
+        for alias in entry["alias"]:
+            self._index.setdefault(alias.lower(), key)
+        return True
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._checked_at >= RELOAD_CHECK_INTERVAL:
+                self._reload()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = [_serialize(entry) for entry in self._entries.values()]
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        self._fingerprint = self._stat()
+        self._checked_at = time.monotonic()
+
+    def names(self) -> List[str]:
+        self._refresh()
+        with self._lock:
+            return [entry["nombre"] for entry in self._entries.values()]
+
+    def entries(self) -> List[Dict]:
+        self._refresh()
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        """Nombre registrado para un nombre o alias (sin distinguir mayúsculas); None si no está."""
+        if not name or not name.strip():
+            return None
+        self._refresh()
+        with self._lock:
+            key = self._index.get(name.strip().lower())
+            return self._entries[key]["nombre"] if key else None
+
+    def __contains__(self, name: str) -> bool:
+        return self.resolve(name) is not None
+
+    def add(self, nombre: str, alias: Iterable[str] = (), archivos: Iterable[str] = (), grupos: Iterable[str] = ()) -> Tuple[bool, Dict]:
+        """
+        Agrega un cliente. Retorna (creado, entrada); si el nombre o un alias ya existía no cambia nada.
+        ValueError si alguno de los alias ya es el nombre o alias de otro cliente.
+        """
+        entry = _normalize({"nombre": nombre, "alias": list(alias), "archivos": list(archivos), "grupos": list(grupos)})
+        if entry is None:
+            raise ValueError("El nombre de cliente es obligatorio")
+        with self._lock, _file_lock(self.lock_path):
+            # Se relee siempre antes de escribir (otro proceso pudo reescribirlo con el mismo tamaño y mtime)
+            self._reload(force=True)
+            existing = self._index.get(entry["nombre"].lower())
+            if existing:
+                return False, dict(self._entries[existing])
+            taken = [alias for alias in entry["alias"] if alias.lower() in self._index]
+            if taken:
+                raise ValueError(f"Alias ya usado por otro cliente: {', '.join(taken)}")
+            self._insert(entry)
+            self._save()
+            return True, dict(entry)
+
+    def routing(self, base: Optional[SourceRouting] = None) -> Optional[SourceRouting]:
+        """base (enrutamiento.json) más los archivos/grupos de cada cliente, que tienen prioridad. None si no hay ninguno."""
+        self._refresh()
+        with self._lock:
+            archivos = {pattern: entry["nombre"] for entry in self._entries.values() for pattern in entry["archivos"]}
+            grupos = {fragment: entry["nombre"] for entry in self._entries.values() for fragment in entry["grupos"]}
+        if not archivos and not grupos:
+            return base
+        if base is None:
+            return SourceRouting(archivos, grupos)
+        # Los patrones se prueban en orden: primero los de los clientes
+        archivos.update((pattern, cliente) for pattern, cliente in base.archivos.items() if pattern not in archivos)
+        grupos.update((fragment, cliente) for fragment, cliente in base.grupos.items() if fragment.lower() not in {g.lower() for g in grupos})
+        return SourceRouting(archivos, grupos, base.por_defecto)
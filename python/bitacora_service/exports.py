@@ -0,0 +1,238 @@
+"""
+Exportaciones de un cliente/año desde el almacén en varios formatos (xlsx, csv, ndjson, parquet).
+Cada exportación tiene un ETag derivado de la versión de los datos (exportaciones.version del almacén), así que
+un If-None-Match con la etiqueta vigente se responde 304 sin generar nada. Las generadas se guardan en
+output/.exportaciones/ con la etiqueta en el nombre y valen hasta que cambian los datos.
+CSV y NDJSON se generan fila por fila mientras se envían (al terminar quedan en el cache); Parquet necesita
+pyarrow (dependencia opcional) y se escribe por grupos de filas antes de enviarse.
+"""
+import csv
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from record_store import RECORD_FIELDS, RecordStore
+from xlsx_stream import STREAM_CHUNK_SIZE, XLSX_MEDIA_TYPE
+
+EXPORT_CACHE_DIR_NAME = ".exportaciones"
+STORE_ID_META_KEY = "store_id"
+# Subir si cambia el contenido de algún formato: invalida ETags y cache
+EXPORT_FORMAT_VERSION = 1
+PARQUET_ROW_GROUP_SIZE = 50000
+
+MEDIA_TYPES = {
+    "xlsx": XLSX_MEDIA_TYPE,
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+_FORMAT_ALIASES = {"excel": "xlsx", "jsonl": "ndjson", "json": "ndjson"}
+_ACCEPT_TYPES = {
+    XLSX_MEDIA_TYPE: "xlsx",
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    # Comodines: el Excel sigue siendo la respuesta por defecto
+    "*/*": "xlsx",
+    "application/*": "xlsx",
+    "text/*": "csv",
+}
+
+_STORE_ID_LOCK = threading.Lock()
+
+
+class ExportUnavailable(RuntimeError):
+    """El formato existe pero falta su dependencia opcional."""
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """
+    Formato de la respuesta: ?format= manda; si no, el tipo de Accept con mayor q (a igual q, el primero);
+    sin ninguno de los dos, xlsx. None si no se pidió ningún formato soportado.
+    """
+    if requested:
+        fmt = requested.strip().lower().lstrip(".")
+        fmt = _FORMAT_ALIASES.get(fmt, fmt)
+        return fmt if fmt in MEDIA_TYPES else None
+    if not accept or not accept.strip():
+        return "xlsx"
+    candidates: List[Tuple[float, int, str]] = []
+    for position, part in enumerate(accept.split(",")):
+        media, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.lower().startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        fmt = _ACCEPT_TYPES.get(media.lower())
+        if fmt and quality > 0:
+            candidates.append((-quality, position, fmt))
+    return min(candidates)[2] if candidates else None
+
+
+def store_id(store: RecordStore) -> str:
+    """Identificador del almacén: si se recrea la base, las versiones vuelven a empezar y las etiquetas no chocan."""
+    with _STORE_ID_LOCK:
+        value = store.get_meta(STORE_ID_META_KEY)
+        if not value:
+            value = uuid.uuid4().hex
+            store.set_meta(STORE_ID_META_KEY, value)
+        return value
+
+
+def export_etag(store: RecordStore, state: Dict, fmt: str) -> str:
+    """ETag (fuerte) de la exportación de un cliente/año en un formato: cambia solo si cambia la versión de los datos."""
+    raw = f"{store_id(store)}:{state['cliente'].lower()}:{state['anio']}:{state['version']}:{fmt}:{EXPORT_FORMAT_VERSION}"
+    return f'"{hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match con comparación débil: "*" o alguna de las etiquetas de la lista."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(tag) == _opaque(etag) for tag in if_none_match.split(","))
+
+
+def _text_chunks(lines: Iterator[str]) -> Iterator[bytes]:
+    """Agrupa líneas en bloques de ~STREAM_CHUNK_SIZE bytes."""
+    buffer: List[str] = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def iter_csv(store: RecordStore, cliente: str, year: int, columns: List[str]) -> Iterator[bytes]:
+    """CSV con encabezado columns (los del Excel) y las filas del almacén en orden cronológico."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def lines() -> Iterator[str]:
+        for row in [columns], store.iter_rows(cliente, year):
+            for values in row:
+                writer.writerow(values)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+    return _text_chunks(lines())
+
+
+def iter_ndjson(store: RecordStore, cliente: str, year: int) -> Iterator[bytes]:
+    """Un objeto JSON por línea con los campos del almacén (RECORD_FIELDS); fechas "YYYY-MM-DD HH:MM:SS" o null."""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    return _text_chunks(dumps(dict(zip(RECORD_FIELDS, row))) + "\n" for row in store.iter_rows(cliente, year))
+
+
+def write_parquet(store: RecordStore, cliente: str, year: int, target: Path) -> int:
+    """Parquet con los campos del almacén (fechas como timestamp), escrito por grupos de filas. Retorna las filas."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ExportUnavailable("La exportación Parquet requiere pyarrow (pip install pyarrow)") from exc
+
+    dates = {"fecha_solicitud", "fecha_cierre"}
+    schema = pa.schema([(field, pa.timestamp("s") if field in dates else pa.string()) for field in RECORD_FIELDS])
+    rows = 0
+
+    def write_batch(batch: List[Tuple]) -> None:
+        arrays = []
+        for field, values in zip(RECORD_FIELDS, zip(*batch)):
+            array = pa.array(values, type=pa.string())
+            arrays.append(pc.strptime(array, format="%Y-%m-%d %H:%M:%S", unit="s") if field in dates else array)
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    with pq.ParquetWriter(str(target), schema) as writer:
+        batch: List[Tuple] = []
+        for row in store.iter_rows(cliente, year):
+            batch.append(row)
+            if len(batch) >= PARQUET_ROW_GROUP_SIZE:
+                write_batch(batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            write_batch(batch)
+            rows += len(batch)
+    return rows
+
+
+class ExportCache:
+    """Exportaciones generadas, una por cliente/año/formato con la etiqueta en el nombre; la anterior se borra."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path_for(self, cliente: str, year: int, fmt: str, etag: str) -> Path:
+        tag = _opaque(etag).strip('"')[:16]
+        return self.root / f"bitacora_{cliente}_{year}.{tag}.{fmt}"
+
+    def get(self, cliente: str, year: int, fmt: str, etag: str) -> Optional[Path]:
+        path = self.path_for(cliente, year, fmt, etag)
+        return path if path.exists() else None
+
+    def _tmp_path(self, target: Path) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        return target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def _publish(self, tmp_path: Path, target: Path) -> None:
+        os.replace(tmp_path, target)
+        # Solo queda la versión vigente de ese cliente/año/formato
+        prefix, suffix = target.name.split(".", 1)[0], target.suffix
+        for old in self.root.glob(f"{prefix}.*{suffix}"):
+            if old != target and not old.name.startswith("."):
+                old.unlink(missing_ok=True)
+
+    def stream_into(self, target: Path, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Entrega los bloques y los va guardando; si la respuesta se corta no queda nada en el cache."""
+        tmp_path = self._tmp_path(target)
+        completed = False
+        try:
+            with open(tmp_path, "wb") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+                    yield chunk
+            completed = True
+            self._publish(tmp_path, target)
+        finally:
+            if not completed:
+                tmp_path.unlink(missing_ok=True)
+
+    def write(self, target: Path, writer: Callable[[Path], object]) -> Path:
+        """Genera la exportación con writer(ruta_temporal) y la publica."""
+        tmp_path = self._tmp_path(target)
+        try:
+            writer(tmp_path)
+            self._publish(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return target
@@ -0,0 +1,297 @@
+"""
+Instrumentación por etapas del procesamiento y métricas en formato de texto de Prometheus (GET /metrics).
+StageRecorder mide las etapas de una corrida (tiempo de reloj, filas, bytes, cuánto creció la memoria residente
+durante la etapa y el pico de memoria del proceso al terminarla, que es de toda la vida del proceso y no de la etapa);
+finish() las entrega para la respuesta y las suma una vez al registro global METRICS (histograma de duración y
+contadores de filas/bytes por etapa, de donde sale el throughput con rate()).
+Con BITACORA_TRACE_MEMORY=1 se mide además el pico de memoria de Python de cada etapa con tracemalloc (más lento).
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_MEMORY = os.getenv("BITACORA_TRACE_MEMORY", "0").strip().lower() in ("1", "true", "yes")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Familias de métricas: nombre -> (tipo, ayuda)
+FAMILIES = {
+    "bitacora_stage_duration_seconds": ("histogram", "Duración de cada etapa del procesamiento por corrida"),
+    "bitacora_stage_rows_total": ("counter", "Filas procesadas por etapa"),
+    "bitacora_stage_bytes_total": ("counter", "Bytes procesados por etapa"),
+    "bitacora_http_request_duration_seconds": ("histogram", "Latencia de las rutas HTTP del servicio"),
+    "bitacora_http_requests_total": ("counter", "Solicitudes HTTP por ruta, método y código"),
+    "bitacora_process_peak_rss_bytes": ("gauge", "Pico de memoria residente del proceso"),
+}
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de memoria residente del proceso hasta ahora (ru_maxrss o PeakWorkingSetSize); None si no se puede leer."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa KiB, macOS bytes
+        return int(peak if sys.platform == "darwin" else peak * 1024)
+    if sys.platform == "win32":
+        return _windows_peak_working_set()
+    return None
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Memoria residente actual del proceso (/proc/self/statm o WorkingSetSize); None si no se puede leer."""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "rb") as fh:
+                return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == "win32":
+        counters = _windows_memory_counters()
+        return int(counters.WorkingSetSize) if counters is not None else None
+    return None
+
+
+def _windows_peak_working_set() -> Optional[int]:
+    counters = _windows_memory_counters()
+    return int(counters.PeakWorkingSetSize) if counters is not None else None
+
+
+def _windows_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class _MemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = _MemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return counters
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / 1e6, 2) if value is not None else None
+
+
+class StageRecorder:
+    """
+    Etapas de una corrida, en el orden de order y después en orden de aparición; la misma etapa registrada
+    varias veces (p. ej. una por lote) se acumula. No es thread-safe: cada corrida (o cada cliente de procesar_todos) usa el suyo.
+    """
+
+    def __init__(self, order: Sequence[str] = (), registry: Optional["MetricsRegistry"] = None):
+        self._registry = registry or METRICS
+        # Las etapas de order se listan primero y en ese orden, aunque se registren después
+        self._order = {name: index for index, name in enumerate(order)}
+        self._stages: Dict[str, Dict] = {}
+
+    def add(
+        self, name: str, seconds: float, rows: int = 0, bytes: int = 0, peak_traced: Optional[int] = None,
+        rss_delta: Optional[int] = None,
+    ) -> None:
+        """
+        Suma una medición a la etapa. rss_delta es cuánto cambió la memoria residente durante ella (se acumula entre
+        las veces que se registra); process_peak_rss es el pico del proceso hasta ahora, no el de la etapa.
+        """
+        entry = self._stages.get(name)
+        if entry is None:
+            entry = self._stages[name] = {
+                "stage": name, "seconds": 0.0, "rows": 0, "bytes": 0, "rss_delta": None, "process_peak_rss": None,
+                "peak_traced": None,
+            }
+        entry["seconds"] += max(0.0, seconds)
+        entry["rows"] += rows
+        entry["bytes"] += bytes
+        if rss_delta is not None:
+            entry["rss_delta"] = (entry["rss_delta"] or 0) + rss_delta
+        entry["process_peak_rss"] = peak_rss_bytes()
+        if peak_traced is not None:
+            entry["peak_traced"] = max(entry["peak_traced"] or 0, peak_traced)
+
+    def move(self, source: str, target: str, seconds: float, rows: int = 0, bytes: int = 0) -> None:
+        """Pasa tiempo medido dentro de una etapa a otra (p. ej. la lectura incluida en el tiempo de parseo)."""
+        entry = self._stages.get(source)
+        if entry is not None:
+            seconds = min(seconds, entry["seconds"])
+            entry["seconds"] -= seconds
+        self.add(target, seconds, rows, bytes)
+        if entry is not None:
+            # El pico de memoria que corresponde es el de cuando se midió, no el de ahora
+            self._stages[target]["process_peak_rss"] = entry["process_peak_rss"]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, int]]:
+        """Mide el bloque; el llamador suma filas/bytes en el dict que recibe."""
+        counts = {"rows": 0, "bytes": 0}
+        traced = _start_tracing()
+        rss_start = current_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if traced else None
+            rss_end = current_rss_bytes() if rss_start is not None else None
+            rss_delta = rss_end - rss_start if rss_end is not None else None
+            self.add(name, elapsed, counts["rows"], counts["bytes"], peak, rss_delta)
+
+    def results(self) -> List[Dict]:
+        results = []
+        ranked = sorted(self._stages.values(), key=lambda entry: self._order.get(entry["stage"], len(self._order)))
+        for entry in ranked:
+            item = {
+                "stage": entry["stage"], "seconds": round(entry["seconds"], 6), "rows": entry["rows"],
+                "bytes": entry["bytes"], "rss_delta_mb": _mb(entry["rss_delta"]),
+                "process_peak_rss_mb": _mb(entry["process_peak_rss"]),
+            }
+            if entry["peak_traced"] is not None:
+                item["peak_traced_mb"] = _mb(entry["peak_traced"])
+            results.append(item)
+        return results
+
+    def finish(self) -> List[Dict]:
+        """Registra cada etapa una vez en METRICS y retorna el detalle para la respuesta."""
+        for entry in self._stages.values():
+            self._registry.observe_stage(entry["stage"], entry["seconds"], entry["rows"], entry["bytes"])
+        return self.results()
+
+
+def _start_tracing() -> bool:
+    if not TRACE_MEMORY:
+        return False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    return True
+
+
+def timed_iter(iterable: Iterable, totals: Dict) -> Iterator:
+    """
+    Itera sumando en totals["seconds"] el tiempo pasado dentro de next() (incluye las capas internas del pipeline)
+    y en totals["rows"] los ítems entregados; los totales están al día en todo momento.
+    """
+    clock = time.perf_counter
+    iterator = iter(iterable)
+    totals.setdefault("seconds", 0.0)
+    totals.setdefault("rows", 0)
+    while True:
+        start = clock()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            totals["seconds"] += clock() - start
+            return
+        totals["seconds"] += clock() - start
+        totals["rows"] += 1
+        yield item
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Dict[str, int]]:
+    """Una sola etapa fuera de una corrida (p. ej. un handler): se registra en METRICS al salir."""
+    recorder = StageRecorder()
+    try:
+        with recorder.stage(name) as counts:
+            yield counts
+    finally:
+        recorder.finish()
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Histogramas y contadores en memoria del proceso, expuestos en formato de texto 0.0.4."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # (nombre, etiquetas) -> [conteos por bucket..., suma, cantidad]
+        self._histograms: Dict[Tuple[str, Tuple], List[float]] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0.0] * (len(self._buckets) + 2)
+            for index, bound in enumerate(self._buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe_stage(self, stage: str, seconds: float, rows: int = 0, bytes: int = 0) -> None:
+        self.observe("bitacora_stage_duration_seconds", seconds, stage=stage)
+        self.inc("bitacora_stage_rows_total", rows, stage=stage)
+        self.inc("bitacora_stage_bytes_total", bytes, stage=stage)
+
+    def observe_request(self, handler: str, method: str, status: int, seconds: float) -> None:
+        self.observe("bitacora_http_request_duration_seconds", seconds, handler=handler, method=method)
+        self.inc("bitacora_http_requests_total", 1, handler=handler, method=method, status=str(status))
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+            counters = dict(self._counters)
+        lines: List[str] = []
+        by_family: Dict[str, List[str]] = {}
+        for (name, labels), values in sorted(histograms.items()):
+            out = by_family.setdefault(name, [])
+            for bound, count in zip(self._buckets + (float("inf"),), values[:-2] + [values[-1]]):
+                out.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {_format_value(count)}")
+            out.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            out.append(f"{name}_count{_format_labels(labels)} {_format_value(values[-1])}")
+        for (name, labels), value in sorted(counters.items()):
+            by_family.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        peak = peak_rss_bytes()
+        if peak is not None:
+            by_family["bitacora_process_peak_rss_bytes"] = [f"bitacora_process_peak_rss_bytes {peak}"]
+        for name in sorted(by_family):
+            kind, help_text = FAMILIES.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(by_family[name])
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,141 @@
+"""
+Cola de trabajos en proceso para /bitacora/procesar y /bitacora/procesar-todos.
+Cada cliente tiene su propia fila: sus trabajos corren de a uno (no se intercalan escrituras sobre el mismo
+almacén/Excel) mientras que clientes distintos avanzan en paralelo hasta BITACORA_JOB_WORKERS hilos.
+Un envío idéntico (mismo cliente y periodo) a uno que todavía está en cola se une a ese trabajo.
+"""
+import threading
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+# Trabajos terminados que se conservan para consultar su estado
+MAX_FINISHED_JOBS = 200
+
+ProgressCallback = Callable[[Dict], None]
+JobRunner = Callable[[str, Optional[str], ProgressCallback], Dict]
+
+
+class Job:
+    def __init__(self, cliente: str, period: Optional[str], lock_key: str, runner: JobRunner):
+        self.id = uuid.uuid4().hex
+        self.cliente = cliente
+        self.period = period
+        self.lock_key = lock_key
+        self.runner = runner
+        self.status = QUEUED
+        self.submitted_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.progress: Dict = {"stage": QUEUED}
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.exception: Optional[BaseException] = None
+        self.submissions = 1
+        self._done = threading.Event()
+
+    def update(self, values: Dict) -> None:
+        self.progress = {**self.progress, **values}
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def snapshot(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "cliente": self.cliente,
+            "period": self.period,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "submissions": self.submissions,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, runner: JobRunner, workers: int = 2):
+        self._runner = runner
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bitacora-job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: Dict[str, Deque[Job]] = {}
+        self._client_locks: Dict[str, threading.Lock] = {}
+
+    def client_lock(self, lock_key: str) -> threading.Lock:
+        """Lock de escritura del cliente; lo toman los trabajos y cualquier otro escritor del mismo Excel."""
+        with self._lock:
+            return self._client_locks.setdefault(lock_key, threading.Lock())
+
+    def submit(self, cliente: str, period: Optional[str], lock_key: str, runner: Optional[JobRunner] = None) -> Tuple[Job, bool]:
+        """
+        Encola un trabajo (runner por defecto o uno propio, p. ej. el proceso de todos los clientes);
+        retorna (trabajo, coalesced) donde coalesced indica que se unió a uno en cola.
+        """
+        runner = runner or self._runner
+        with self._lock:
+            pending = self._pending.get(lock_key)
+            for job in pending or ():
+                if job.status == QUEUED and job.period == period and job.runner is runner:
+                    job.submissions += 1
+                    return job, True
+            job = Job(cliente, period, lock_key, runner)
+            self._jobs[job.id] = job
+            self._prune()
+            if pending is None:
+                # Nadie está drenando la fila de este cliente: se agenda un drenado
+                self._pending[lock_key] = deque([job])
+                self._executor.submit(self._drain, lock_key)
+            else:
+                pending.append(job)
+        return job, False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def recent(self, limit: int = 50) -> List[Job]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def _drain(self, lock_key: str) -> None:
+        while True:
+            with self._lock:
+                pending = self._pending[lock_key]
+                if not pending:
+                    del self._pending[lock_key]
+                    return
+                job = pending[0]
+                job.status = RUNNING
+                job.started_at = datetime.utcnow()
+                job.update({"stage": RUNNING})
+            try:
+                with self.client_lock(lock_key):
+                    job.result = job.runner(job.cliente, job.period, job.update)
+                job.status = DONE
+                job.update({"stage": DONE})
+            except Exception as exc:
+                print(f"Trabajo {job.id} ({job.cliente}) falló: {exc}")
+                job.status = ERROR
+                job.error = str(exc)
+                job.exception = exc
+            finally:
+                job.finished_at = datetime.utcnow()
+                with self._lock:
+                    pending.popleft()
+                job._done.set()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (DONE, ERROR)]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
@@ -0,0 +1,72 @@
+"""
+Matcher multi-patrón (Aho-Corasick) para las listas de palabras clave del processor.
+Se construye una sola vez con todas las categorías y clasifica un texto en una única pasada:
+el costo depende del largo del mensaje, no de cuántas palabras clave haya en las listas.
+"""
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List
+
+
+class KeywordMatcher:
+    """
+    Autómata Aho-Corasick compilado a una tabla de transiciones completa (sin seguir enlaces de falla al buscar).
+    classify(texto) devuelve el conjunto de categorías con al menos una coincidencia como subcadena,
+    igual que `any(kw in texto.lower() for kw in lista)` para cada lista.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self.categories: List[str] = list(categories)
+        goto: List[Dict[str, int]] = [{}]
+        output: List[int] = [0]
+
+        for bit, name in enumerate(self.categories):
+            for keyword in categories[name]:
+                if not keyword:
+                    continue
+                state = 0
+                for ch in keyword:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[state][ch] = nxt
+                        goto.append({})
+                        output.append(0)
+                    state = nxt
+                output[state] |= 1 << bit
+
+        # BFS: enlaces de falla y transiciones completas (delta[s][c]) heredadas del estado de falla
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        # Los hijos directos de la raíz fallan a la raíz (fail ya vale 0)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            output[state] |= output[fail[state]]
+            transitions = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                transitions[ch] = nxt
+                queue.append(nxt)
+            delta[state] = transitions
+
+        self._delta = delta
+        self._output = output
+        self._names: Dict[int, FrozenSet[str]] = {}
+
+    def _mask_names(self, mask: int) -> FrozenSet[str]:
+        names = self._names.get(mask)
+        if names is None:
+            names = frozenset(name for bit, name in enumerate(self.categories) if mask & (1 << bit))
+            self._names[mask] = names
+        return names
+
+    def classify(self, text: str) -> FrozenSet[str]:
+        delta = self._delta
+        output = self._output
+        state = 0
+        mask = 0
+        for ch in text.lower():
+            state = delta[state].get(ch, 0)
+            mask |= output[state]
+        return self._mask_names(mask)
@@ -0,0 +1,200 @@
+"""
+Motor de parseo de líneas de exports de WhatsApp.
+Reemplaza el camino caliente de processor.parse_line con el mismo resultado:
+- los caracteres invisibles se limpian en una sola pasada sobre el buffer completo,
+- las líneas que no pueden iniciar un mensaje se descartan antes de ejecutar el regex,
+- las fechas y horas repetidas se memorizan y la fecha sale directo como segundos epoch (ChatMessage.ts),
+- los autores se internan en una tabla de símbolos: cada nombre distinto se limpia y se guarda una sola vez,
+- un archivo completo (o su cola) se escanea de una vez sobre el buffer, sin iterar línea por línea.
+"""
+import mmap
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from chat_records import EPOCH_ORDINAL, ChatMessage
+
+# Misma limpieza que el _normalize original: NBSP/espacio angosto -> espacio, marcas de dirección y BOM -> nada.
+# Las eliminaciones van en un solo regex; str.translate con tabla dict es varias veces más lento sobre texto con emojis.
+_INVISIBLE_RE = re.compile("[\u200e\u200f\ufeff\u2060\u202a-\u202e]")
+
+
+def normalize_invisible(text: str) -> str:
+    return _INVISIBLE_RE.sub("", text.replace("\u202f", " ").replace("\u00a0", " "))
+
+
+# Con la línea ya limpia y sin espacios al inicio, el mensaje tiene que empezar con "["
+_LINE_PATTERN = re.compile(
+    r"\[\s*"
+    r"(?P<date>\d{1,2}/\d{1,2}/\d{2,4}),\s*"
+    r"(?P<time>\d{1,2}:\d{2}:\d{2})\s*"
+    r"(?P<ampm>[ap]\.?(?:\s)?m\.?|am|pm|a\s?m|p\s?m)"
+    r"\]\s+"
+    r"(?P<author>[^:]+):"
+    r"\s*(?P<message>.*)$",
+    re.IGNORECASE,
+)
+
+# Variante para buffers completos: los espacios no pueden cruzar saltos de línea
+_WS = r"[^\S\n]"
+_BUFFER_PATTERN = re.compile(
+    rf"^{_WS}*\[{_WS}*"
+    rf"(?P<date>\d{{1,2}}/\d{{1,2}}/\d{{2,4}}),{_WS}*"
+    rf"(?P<time>\d{{1,2}}:\d{{2}}:\d{{2}}){_WS}*"
+    rf"(?P<ampm>[ap]\.?{_WS}?m\.?|am|pm|a{_WS}?m|p{_WS}?m)"
+    rf"\]{_WS}+"
+    rf"(?P<author>[^:\n]+):"
+    rf"{_WS}*(?P<message>.*)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+_AUTHOR_PREFIX_CHARS = "~•- "
+
+# Tamaño de bloque de iter_buffer (se corta en el siguiente salto de línea)
+BLOCK_SIZE = 1 << 20
+
+
+class LineParser:
+    """
+    Parser de líneas con caches de fecha/hora y tabla de símbolos de autores. Una instancia puede reutilizarse
+    entre archivos y corridas; los caches crecen con las fechas y los nombres distintos, no con los mensajes.
+    """
+
+    def __init__(self):
+        # fecha -> (año, mes, segundos epoch del inicio del día)
+        self._dates: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self._hours: Dict[Tuple[str, str], Optional[int]] = {}
+        # autor tal como viene en la línea -> nombre limpio internado
+        self._authors: Dict[str, str] = {}
+        self._symbols: Dict[str, str] = {}
+
+    def _date_parts(self, date_str: str) -> Optional[Tuple[int, int, int]]:
+        day, month, year = map(int, date_str.split("/"))
+        if year < 100:
+            year += 2000
+        try:
+            parts = (year, month, (date(year, month, day).toordinal() - EPOCH_ORDINAL) * 86400)
+        except ValueError:
+            parts = None
+        self._dates[date_str] = parts
+        return parts
+
+    def _author(self, raw: str) -> str:
+        name = raw.strip().lstrip(_AUTHOR_PREFIX_CHARS).strip()
+        name = self._symbols.setdefault(name, name)
+        self._authors[raw] = name
+        return name
+
+    def _hour(self, hour_str: str, ampm: str) -> Optional[int]:
+        hour = int(hour_str)
+        ampm_normalized = ampm.replace(".", "").replace(" ", "").lower()
+        if ampm_normalized.startswith("p") and hour < 12:
+            hour += 12
+        if ampm_normalized.startswith("a") and hour == 12:
+            hour = 0
+        result = hour if hour < 24 else None
+        self._hours[(hour_str, ampm)] = result
+        return result
+
+    def _iter_parsed(self, groups, filter_year_month: Optional[Tuple[int, int]]):
+        """Convierte tuplas (fecha, hora, am/pm, autor, mensaje) del regex en mensajes."""
+        dates = self._dates
+        hours = self._hours
+        authors = self._authors
+        for date_str, time_str, ampm, author, message in groups:
+            date_parts = dates.get(date_str, False)
+            if date_parts is False:
+                date_parts = self._date_parts(date_str)
+            if date_parts is None:
+                continue
+            # La hora viene como h:mm:ss o hh:mm:ss; solo la hora depende de AM/PM
+            hour_str = time_str[:-6]
+            hour = hours.get((hour_str, ampm), False)
+            if hour is False:
+                hour = self._hour(hour_str, ampm)
+            minute = int(time_str[-5:-3])
+            second = int(time_str[-2:])
+            if hour is None or minute > 59 or second > 59:
+                continue
+            if filter_year_month and (date_parts[0], date_parts[1]) != filter_year_month:
+                continue
+            name = authors.get(author)
+            if name is None:
+                name = self._author(author)
+            yield ChatMessage(date_parts[2] + hour * 3600 + minute * 60 + second, name, message.strip())
+
+    def parse_line(self, line: str, filter_year_month: Optional[Tuple[int, int]] = None) -> Optional[ChatMessage]:
+        """Equivalente a processor.parse_line para una sola línea."""
+        if "[" not in line:
+            return None
+        normalized = normalize_invisible(line).strip()
+        if not normalized.startswith("["):
+            return None
+        match = _LINE_PATTERN.match(normalized)
+        if not match:
+            return None
+        for parsed in self._iter_parsed((match.groups(),), filter_year_month):
+            return parsed
+        return None
+
+    def scan_text(self, text: str, filter_year_month: Optional[Tuple[int, int]] = None) -> Tuple[List[ChatMessage], int]:
+        """
+        Escanea un buffer completo. Retorna los mensajes parseados en orden y la cantidad de líneas,
+        contadas igual que al iterar el archivo en modo texto.
+        """
+        if not text:
+            return [], 0
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        line_count = text.count("\n") + (0 if text.endswith("\n") else 1)
+        groups = _BUFFER_PATTERN.findall(normalize_invisible(text))
+        return list(self._iter_parsed(groups, filter_year_month)), line_count
+
+    def iter_buffer(
+        self,
+        buffer,
+        start: int = 0,
+        filter_year_month: Optional[Tuple[int, int]] = None,
+        counts: Optional[Dict[str, int]] = None,
+        block_size: int = BLOCK_SIZE,
+        stop: Optional[int] = None,
+        blocks: Optional[List[Tuple[int, int, Set[int]]]] = None,
+    ) -> Iterator[ChatMessage]:
+        """
+        Igual que scan_text pero sobre bytes (o un mmap) desde `start` hasta `stop` (un inicio de línea; por defecto
+        el final), en bloques de ~block_size cortados en saltos de línea: la memoria no depende del tamaño del archivo.
+        Las líneas se acumulan en counts["lines"]; blocks recibe (inicio, fin, días epoch de sus mensajes) de cada
+        bloque, para el índice de meses.
+        """
+        end_of_buffer = len(buffer) if stop is None else stop
+        while start < end_of_buffer:
+            cut = buffer.find(b"\n", min(start + block_size, end_of_buffer) - 1, end_of_buffer)
+            end = end_of_buffer if cut < 0 else cut + 1
+            messages, line_count = self.scan_text(str(buffer[start:end], "utf-8", "ignore"), filter_year_month)
+            if counts is not None:
+                counts["lines"] = counts.get("lines", 0) + line_count
+            if blocks is not None:
+                blocks.append((start, end, {msg.ts // 86400 for msg in messages}))
+            yield from messages
+            start = end
+
+    def scan_file(self, path: Path, offset: int = 0, filter_year_month: Optional[Tuple[int, int]] = None) -> Tuple[List[ChatMessage], int]:
+        """Escanea un archivo desde `offset` mapeándolo en memoria."""
+        return self.scan_text(read_text_mmap(path, offset), filter_year_month)
+
+
+def read_text_mmap(path: Path, offset: int = 0) -> str:
+    """Decodifica un archivo desde `offset` usando mmap (sin copiar los bytes a un buffer intermedio)."""
+    with open(path, "rb") as fh:
+        try:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Archivo vacío: mmap no admite longitud cero
+            return ""
+        with mapped:
+            view = memoryview(mapped)
+            try:
+                return str(view[offset:], "utf-8", "ignore")
+            finally:
+                view.release()
@@ -1,68 +1,78 @@
 """
 Microservicio FastAPI que delega toda la lógica de bitácoras al processor (bitacorasmym original).
 """
-import json
+import mimetypes
 import os
 import re
-from datetime import datetime
+import time
+import zipfile
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
-import pandas as pd
-from fastapi import Body, FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
+import exports
+import instrumentation
 import processor
+import uploads
+import zip_sources
+from aggregates import AGGREGATE_CACHE
+from client_registry import CLIENTS_FILE_NAME, ClientRegistry
+from jobs import JobQueue
+from record_store import RECORD_DB_NAME, RECORD_FIELDS, RecordStore, decode_cursor, encode_cursor, search_query
+from routing import ROUTING_FILE_NAME, SourceRouting
+from xlsx_stream import XLSX_MEDIA_TYPE
 
 BASE_DIR = Path(__file__).resolve().parent
 BITACORA_SOURCE_DIR = BASE_DIR / "bitacoras"
-BITACORA_OUTPUT_DIR = BASE_DIR / "output"
+# Carpeta de Excel, almacén y estado; configurable para correr aislado (p. ej. benchmarks/run_suite.py)
+BITACORA_OUTPUT_DIR = Path(os.getenv("BITACORA_OUTPUT_DIR") or BASE_DIR / "output")
 BITACORA_DEFAULT_CLIENTE = os.getenv("BITACORA_DEFAULT_CLIENTE", "Cliente Principal")
-CLIENTS_FILE = BITACORA_OUTPUT_DIR / "clientes.json"
+CLIENTS_FILE = BITACORA_OUTPUT_DIR / CLIENTS_FILE_NAME
 
 BITACORA_SOURCE_DIR.mkdir(parents=True, exist_ok=True)
 BITACORA_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+RECORD_STORE = RecordStore(BITACORA_OUTPUT_DIR / RECORD_DB_NAME)
+CLIENT_REGISTRY = ClientRegistry(CLIENTS_FILE, default=BITACORA_DEFAULT_CLIENTE)
+EXPORT_CACHE = exports.ExportCache(BITACORA_OUTPUT_DIR / exports.EXPORT_CACHE_DIR_NAME)
+# Tamaño máximo de un export subido por POST /bitacora/subir (MB; 0 = sin límite)
+UPLOAD_MAX_BYTES = int(float(os.getenv("BITACORA_UPLOAD_MAX_MB", "512") or 0) * 1024 * 1024)
+# Bytes de una subida que se juntan antes de cada escritura a disco (en el pool de hilos)
+UPLOAD_WRITE_BYTES = 1 << 20
+
 
 def load_clients() -> List[str]:
-    if not CLIENTS_FILE.exists():
-        save_clients([BITACORA_DEFAULT_CLIENTE])
-        return [BITACORA_DEFAULT_CLIENTE]
-    try:
-        data = json.loads(CLIENTS_FILE.read_text(encoding="utf-8") or "[]")
-        if not isinstance(data, list):
-            raise ValueError("invalid format")
-        clean = [str(item).strip() for item in data if str(item).strip()]
-    except Exception:
-        clean = [BITACORA_DEFAULT_CLIENTE]
-    if BITACORA_DEFAULT_CLIENTE not in clean:
-        clean.append(BITACORA_DEFAULT_CLIENTE)
-        save_clients(clean)
-    return clean
-
-
-def save_clients(items: List[str]) -> None:
-    unique = []
-    seen = set()
-    for item in items:
-        key = item.lower()
-        if key in seen:
-            continue
-        seen.add(key)
-        unique.append(item)
-    CLIENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    CLIENTS_FILE.write_text(json.dumps(unique, ensure_ascii=False, indent=2), encoding="utf-8")
+    return CLIENT_REGISTRY.names()
+
+
+def resolve_cliente(nombre: Optional[str]) -> str:
+    """Nombre registrado del cliente (acepta alias, sin distinguir mayúsculas); un nombre desconocido se usa tal cual."""
+    target = (nombre or BITACORA_DEFAULT_CLIENTE).strip() or BITACORA_DEFAULT_CLIENTE
+    return CLIENT_REGISTRY.resolve(target) or target
+
+
+def current_routing() -> Optional[SourceRouting]:
+    """enrutamiento.json más los archivos/grupos declarados en el registro de clientes."""
+    return CLIENT_REGISTRY.routing(SourceRouting.load(BITACORA_OUTPUT_DIR / ROUTING_FILE_NAME))
 
 
 class ProcessRequest(BaseModel):
     cliente: Optional[str] = None
     period: Optional[str] = None
+    background: bool = False
 
 
 class ClientCreate(BaseModel):
     nombre: str
+    alias: List[str] = []
+    archivos: List[str] = []
+    grupos: List[str] = []
 
 
 class MetricResponse(BaseModel):
@@ -77,35 +87,7 @@ def slugify(value: str) -> str:
     return cleaned.strip("_") or "sin_cliente"
 
 
-app = FastAPI(title="Bitacoras Mantenimiento", version="1.0.0")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"]
-)
-
-
-@app.get("/health")
-def health():
-    return {"status": "ok", "source": str(BITACORA_SOURCE_DIR), "output": str(BITACORA_OUTPUT_DIR)}
-
-
-@app.post("/bitacora/procesar")
-def procesar(req: ProcessRequest | None = Body(default=None)):
-    target_cliente = ((req.cliente if req else None) or BITACORA_DEFAULT_CLIENTE).strip() or BITACORA_DEFAULT_CLIENTE
-    period = (req.period if req else None) or None
-    try:
-        result = processor.procesar_bitacora(
-            cliente=target_cliente,
-            period=period,
-            source_dir=BITACORA_SOURCE_DIR,
-            output_dir=BITACORA_OUTPUT_DIR,
-        )
-    except FileNotFoundError as exc:
-        raise HTTPException(status_code=404, detail=str(exc))
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
-
+def _process_response(target_cliente: str, result: Dict) -> Dict:
     new_added = result.get("new_records_added", result.get("rows", 0))
     total = result.get("total_rows", 0)
 
@@ -115,24 +97,30 @@ def procesar(req: ProcessRequest | None = Body(default=None)):
             "status": "ok",
             "message": "No hay nuevos registros para procesar" if total == 0 else f"Excel actualizado. {total} registros totales (sin registros nuevos este mes).",
             "generated": [],
+            "path": str(result["path"]) if result.get("path") else None,
+            "filename": result.get("filename"),
             "lines_read": result.get("lines_read", 0),
             "lines_valid": result.get("lines_valid", 0),
             "file_stats": result.get("file_stats", []),
+            "bytes_skipped": result.get("bytes_skipped", 0),
+            "bytes_parsed": result.get("bytes_parsed", 0),
+            "stages": result.get("stages", []),
             "new_records": 0,
             "total_rows": total,
         }
 
     return {
         "success": True,
+        # Un Excel por partición (año de las solicitudes) que tocó la corrida
         "generated": [{
             "cliente": target_cliente,
-            "periodo": result.get("year"),
-            "rows": result.get("rows", 0),
-            "new_records_added": new_added,
-            "total_rows": total,
-            "path": str(result.get("path")),
-            "filename": result.get("filename"),
-        }],
+            "periodo": export["year"],
+            "rows": export["rows"],
+            "new_records_added": export["new_records_added"],
+            "total_rows": export["total_rows"],
+            "path": str(export["path"]),
+            "filename": export["filename"],
+        } for export in result.get("exports", [result])],
         "metrics": {},
         "processed_at": datetime.utcnow().isoformat(),
         "request_id": None,
@@ -140,14 +128,277 @@ def procesar(req: ProcessRequest | None = Body(default=None)):
         "lines_read": result.get("lines_read", 0),
         "lines_valid": result.get("lines_valid", 0),
         "file_stats": result.get("file_stats", []),
+        "bytes_skipped": result.get("bytes_skipped", 0),
+        "bytes_parsed": result.get("bytes_parsed", 0),
+        "stages": result.get("stages", []),
         "new_records": new_added,
         "total_rows": total,
         "status": "ok",
     }
 
 
+def run_procesar(target_cliente: str, period: Optional[str], progress) -> Dict:
+    result = processor.procesar_bitacora(
+        cliente=target_cliente,
+        period=period,
+        source_dir=BITACORA_SOURCE_DIR,
+        output_dir=BITACORA_OUTPUT_DIR,
+        record_store=RECORD_STORE,
+        progress=progress,
+        routing=current_routing(),
+    )
+    return _process_response(target_cliente, result)
+
+
+def run_procesar_todos(_etiqueta: str, period: Optional[str], progress) -> Dict:
+    summary = processor.procesar_todos(
+        clientes=load_clients(),
+        period=period,
+        source_dir=BITACORA_SOURCE_DIR,
+        output_dir=BITACORA_OUTPUT_DIR,
+        record_store=RECORD_STORE,
+        progress=progress,
+        routing=current_routing(),
+        client_lock=lambda cliente: JOB_QUEUE.client_lock(client_lock_key(cliente)),
+    )
+    clientes = {
+        cliente: ({"success": False, "status": "error", "error": result["error"]} if result.get("error") else _process_response(cliente, result))
+        for cliente, result in summary["clientes"].items()
+    }
+    return {
+        "success": all(item["success"] for item in clientes.values()),
+        "status": "ok",
+        "clientes": clientes,
+        "routing": summary["routing"],
+        "file_stats": summary["file_stats"],
+        "bytes_skipped": summary["bytes_skipped"],
+        "bytes_parsed": summary["bytes_parsed"],
+        "stages": summary["stages"],
+        "new_records": sum(item.get("new_records", 0) for item in clientes.values()),
+        "processed_at": datetime.utcnow().isoformat(),
+    }
+
+
+JOB_QUEUE = JobQueue(run_procesar, workers=int(os.getenv("BITACORA_JOB_WORKERS", "2") or 2))
+
+
+# Fila propia para el proceso de todos los clientes (dentro toma el lock de cada cliente)
+ALL_CLIENTS_LOCK_KEY = "*"
+
+
+def client_lock_key(cliente: str) -> str:
+    """Clave del lock por cliente: la misma normalización que usan el almacén y los checkpoints."""
+    return slugify(cliente).lower()
+
+
+app = FastAPI(title="Bitacoras Mantenimiento", version="1.0.0")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"]
+)
+
+
+@app.middleware("http")
+async def medir_latencia(request: Request, call_next):
+    """Latencia y código de cada solicitud por ruta (la plantilla, p. ej. /bitacora/jobs/{job_id}) para /metrics."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        handler = getattr(route, "path", None) or "sin_ruta"
+        instrumentation.METRICS.observe_request(handler, request.method, status, time.perf_counter() - start)
+
+
+@app.get("/metrics")
+def metrics():
+    """Histogramas de duración por etapa y por ruta, y contadores de filas/bytes, en formato de texto de Prometheus."""
+    return PlainTextResponse(instrumentation.METRICS.render(), media_type=instrumentation.CONTENT_TYPE)
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "source": str(BITACORA_SOURCE_DIR), "output": str(BITACORA_OUTPUT_DIR)}
+
+
+@app.post("/bitacora/procesar")
+def procesar(req: ProcessRequest | None = Body(default=None)):
+    """
+    Encola el procesamiento del cliente. Con background=true responde 202 de inmediato con el id del trabajo
+    (consultar GET /bitacora/jobs/{id}); si no, espera a que termine y responde con el resultado.
+    """
+    target_cliente = resolve_cliente(req.cliente if req else None)
+    period = (req.period if req else None) or None
+    job, coalesced = JOB_QUEUE.submit(target_cliente, period, client_lock_key(target_cliente))
+    if req and req.background:
+        return JSONResponse(status_code=202, content={"success": True, "coalesced": coalesced, **job.snapshot()})
+
+    job.wait()
+    if job.exception is not None:
+        status_code = 404 if isinstance(job.exception, FileNotFoundError) else 500
+        raise HTTPException(status_code=status_code, detail=job.error)
+    return job.result
+
+
+@app.post("/bitacora/procesar-todos")
+def procesar_todos(req: ProcessRequest | None = Body(default=None)):
+    """
+    Procesa todos los clientes registrados con un único parseo de la carpeta fuente (enrutamiento en
+    output/enrutamiento.json). Mismo contrato que /bitacora/procesar: background=true responde 202 con el trabajo.
+    """
+    period = (req.period if req else None) or None
+    job, coalesced = JOB_QUEUE.submit("*", period, ALL_CLIENTS_LOCK_KEY, runner=run_procesar_todos)
+    if req and req.background:
+        return JSONResponse(status_code=202, content={"success": True, "coalesced": coalesced, **job.snapshot()})
+
+    job.wait()
+    if job.exception is not None:
+        status_code = 404 if isinstance(job.exception, FileNotFoundError) else 500
+        raise HTTPException(status_code=status_code, detail=job.error)
+    return job.result
+
+
+@app.post("/bitacora/subir")
+async def subir(
+    request: Request,
+    nombre: Optional[str] = None,
+    cliente: Optional[str] = None,
+    procesar: bool = True,
+    background: bool = False,
+    reemplazar: bool = False,
+):
+    """
+    Sube un export de WhatsApp: el cuerpo es el .txt (o el .zip "con multimedia") tal cual, sin multipart
+    (p. ej. curl --data-binary @chat.txt), y se escribe a disco por bloques a medida que llega. Un re-export de un grupo que ya está en la carpeta fuente
+    solo agrega al archivo existente las líneas nuevas, y los exports que quedan contenidos en otro se retiran
+    (ver uploads.py). Si repite un export existente pero con líneas cambiadas responde 409, salvo con reemplazar=true.
+    Con procesar=true encola el procesamiento del cliente como /bitacora/procesar.
+    """
+    target_cliente = resolve_cliente(cliente)
+    part = await run_in_threadpool(uploads.upload_path, BITACORA_SOURCE_DIR)
+    try:
+        size = await _receive_upload(request, part)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="El cuerpo de la solicitud está vacío")
+
+        def ingest() -> Dict:
+            with JOB_QUEUE.client_lock(client_lock_key(target_cliente)), instrumentation.stage("subida") as stage:
+                result = uploads.ingest_upload(part, BITACORA_SOURCE_DIR, nombre, replace=reemplazar)
+                stage["bytes"] = size
+                return result
+
+        try:
+            result = await run_in_threadpool(ingest)
+        except uploads.ExportConflict as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        await run_in_threadpool(part.unlink, missing_ok=True)
+
+    response: Dict = {"success": True, "cliente": target_cliente, **result}
+    if not procesar or result["accion"] == "duplicado":
+        return response
+    job, coalesced = JOB_QUEUE.submit(target_cliente, None, client_lock_key(target_cliente))
+    if background:
+        return JSONResponse(status_code=202, content={**response, "coalesced": coalesced, "job": job.snapshot()})
+    await run_in_threadpool(job.wait)
+    if job.exception is not None:
+        raise HTTPException(status_code=500, detail=job.error)
+    return {**response, "procesamiento": job.result}
+
+
+async def _receive_upload(request: Request, part: Path) -> int:
+    """
+    Escribe el cuerpo de la solicitud en part a medida que llega. Las escrituras van al pool de hilos juntando
+    bloques de hasta UPLOAD_WRITE_BYTES, para no frenar el event loop con el disco. Retorna los bytes recibidos.
+    """
+    fh = await run_in_threadpool(open, part, "wb")
+    size = 0
+    try:
+        pending: List[bytes] = []
+        pending_size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if UPLOAD_MAX_BYTES and size > UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"El archivo supera {UPLOAD_MAX_BYTES // (1024 * 1024)} MB")
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= UPLOAD_WRITE_BYTES:
+                await run_in_threadpool(fh.writelines, pending)
+                pending, pending_size = [], 0
+        if pending:
+            await run_in_threadpool(fh.writelines, pending)
+    finally:
+        await run_in_threadpool(fh.close)
+    return size
+
+
+def _archive_source(fuente: str) -> Path:
+    path = BITACORA_SOURCE_DIR / Path(fuente).name
+    if not zip_sources.is_archive(path) or not path.is_file():
+        raise HTTPException(status_code=404, detail=f"No existe la fuente .zip {fuente}")
+    return path
+
+
+@app.get("/bitacora/adjuntos")
+def listar_adjuntos(fuente: Optional[str] = None):
+    """
+    Adjuntos mencionados en el chat de cada .zip de la carpeta fuente (o solo de `fuente`): archivo, fecha, autor,
+    si está dentro del .zip y su tamaño. El índice se arma al procesar o, si no está vigente, leyendo solo el chat.
+    """
+    if fuente:
+        paths = [_archive_source(fuente)]
+    else:
+        paths = sorted(path for path in BITACORA_SOURCE_DIR.glob(f"*{zip_sources.ZIP_SUFFIX}") if zip_sources.has_chat(path))
+    fuentes = []
+    for path in paths:
+        try:
+            fuentes.append(zip_sources.media_index(path))
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"{path.name} no es un .zip válido")
+    return {"fuentes": fuentes}
+
+
+@app.get("/bitacora/adjuntos/{fuente}/{archivo}")
+def descargar_adjunto(fuente: str, archivo: str):
+    """Un adjunto de un .zip, descomprimido por bloques al enviarlo (no se extrae nada a disco)."""
+    path = _archive_source(fuente)
+    try:
+        info = zip_sources.media_info(path, archivo)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"{archivo} no está en {path.name}")
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"{path.name} no es un .zip válido")
+    return StreamingResponse(
+        zip_sources.iter_media(path, archivo),
+        media_type=mimetypes.guess_type(archivo)[0] or "application/octet-stream",
+        headers={"Content-Length": str(info.file_size), "Cache-Control": "private, max-age=86400"},
+    )
+
+
+@app.get("/bitacora/jobs")
+def listar_jobs(limit: int = 50):
+    return {"jobs": [job.snapshot() for job in JOB_QUEUE.recent(max(1, min(limit, 200)))]}
+
+
+@app.get("/bitacora/jobs/{job_id}")
+def estado_job(job_id: str):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job.snapshot()
+
+
 @app.get("/bitacora/metricas")
 def metricas():
+    """Suma los agregados materializados de cada Excel; solo se recalculan los archivos que cambiaron."""
     total = 0
     clientes: Dict[str, int] = {}
     estados: Dict[str, int] = {}
@@ -156,44 +407,31 @@ def metricas():
     if not BITACORA_OUTPUT_DIR.exists():
         return {"total_registros": 0, "clientes": {}, "estados": {}, "periodos": {}}
 
-    for xlsx_path in BITACORA_OUTPUT_DIR.glob("bitacora_*.xlsx"):
-        try:
-            df = pd.read_excel(xlsx_path, engine="openpyxl")
-        except Exception:
-            continue
-        if df.empty:
-            continue
-        rows = len(df)
-        total += rows
-        try:
-            name_part = xlsx_path.stem.split("bitacora_", 1)[1]
-            cliente_part = name_part.rsplit("_", 1)[0]
-        except Exception:
-            cliente_part = "SIN_CLIENTE"
-        clientes[cliente_part] = clientes.get(cliente_part, 0) + rows
-        estados_col = df.get("Estado")
-        if estados_col is not None:
-            for val in estados_col.fillna("").astype(str):
-                v = str(val).strip()
-                if v:
-                    estados[v] = estados.get(v, 0) + 1
-        if "Fecha Solicitud" in df.columns:
-            for val in pd.to_datetime(df["Fecha Solicitud"], errors="coerce"):
-                if pd.isna(val):
-                    continue
-                try:
-                    key = f"{int(val.year)}-{int(val.month):02d}"
-                    periodos[key] = periodos.get(key, 0) + 1
-                except (ValueError, TypeError):
-                    pass
+    with instrumentation.stage("metricas") as stage:
+        for xlsx_path in BITACORA_OUTPUT_DIR.glob("bitacora_*.xlsx"):
+            aggregates = AGGREGATE_CACHE.get(xlsx_path)
+            if not aggregates or not aggregates["rows"]:
+                continue
+            rows = aggregates["rows"]
+            total += rows
+            try:
+                name_part = xlsx_path.stem.split("bitacora_", 1)[1]
+                cliente_part = name_part.rsplit("_", 1)[0]
+            except Exception:
+                cliente_part = "SIN_CLIENTE"
+            clientes[cliente_part] = clientes.get(cliente_part, 0) + rows
+            for key, count in aggregates["estados"].items():
+                estados[key] = estados.get(key, 0) + count
+            for key, count in aggregates["periodos"].items():
+                periodos[key] = periodos.get(key, 0) + count
+        stage["rows"] = total
 
     return {"total_registros": total, "clientes": clientes, "estados": estados, "periodos": periodos}
 
 
 @app.get("/bitacora/clientes")
 def listar_clientes():
-    clientes = load_clients()
-    return {"clientes": clientes, "default": BITACORA_DEFAULT_CLIENTE}
+    return {"clientes": load_clients(), "default": BITACORA_DEFAULT_CLIENTE, "detalle": CLIENT_REGISTRY.entries()}
 
 
 @app.post("/bitacora/clientes")
@@ -202,34 +440,263 @@ def crear_cliente(body: ClientCreate):
     if not nombre:
         raise HTTPException(status_code=400, detail="El nombre de cliente es obligatorio")
 
+    try:
+        created, entry = CLIENT_REGISTRY.add(nombre, alias=body.alias, archivos=body.archivos, grupos=body.grupos)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     clientes = load_clients()
-    nombres_lc = [c.lower() for c in clientes]
-    if nombre.lower() in nombres_lc:
-        return {"success": False, "message": "El cliente ya existe", "clientes": clientes, "created": False}
+    if not created:
+        return {"success": False, "message": "El cliente ya existe", "clientes": clientes, "cliente": entry, "created": False}
+    return {"success": True, "message": "Cliente creado correctamente", "clientes": sorted(clientes, key=str.lower), "cliente": entry, "created": True}
+
+
+def _date_bound(value: Optional[str], end: bool = False) -> Optional[str]:
+    """
+    'YYYY-MM-DD' o fecha/hora ISO -> 'YYYY-MM-DD HH:MM:SS' como se guarda en el almacén.
+    Con end el límite es exclusivo: hasta=2024-03-31 incluye todo ese día.
+    """
+    if not value or not value.strip():
+        return None
+    text = value.strip()
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Fecha inválida: {value} (use YYYY-MM-DD o YYYY-MM-DDTHH:MM:SS)")
+    if end:
+        parsed += timedelta(days=1) if len(text) <= 10 else timedelta(seconds=1)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _period_bounds(period: str) -> Tuple[str, str]:
+    """
+    'YYYY' o 'YYYY-MM' -> [inicio, fin) sobre fecha_solicitud (índice por cliente y fecha), para que un mes también
+    filtre dentro de la partición anual.
+    """
+    text = period.strip()
+    try:
+        if len(text) == 4:
+            start = datetime(int(text), 1, 1)
+            end = start.replace(year=start.year + 1)
+        else:
+            start = datetime.strptime(text, "%Y-%m")
+            end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Periodo inválido: {period} (use YYYY o YYYY-MM)")
+    return start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@app.get("/bitacora/registros")
+def listar_registros(
+    cliente: Optional[str] = None,
+    period: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    estado: Optional[List[str]] = Query(None),
+    reportado_por: Optional[List[str]] = Query(None),
+    tecnico: Optional[List[str]] = Query(None),
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    order: str = "asc",
+):
+    """
+    Registros de un cliente desde el almacén, de a una página por vez (todos los años salvo que se pida period).
+    estado, reportado_por y tecnico se repiten para varios valores y no distinguen mayúsculas; fields elige campos
+    (separados por coma). La respuesta trae "siguiente": el cursor de la próxima página, o null en la última.
+    """
+    target_cliente = resolve_cliente(cliente)
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order debe ser asc o desc")
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(RECORD_FIELDS)
+    desde_bound, hasta_bound = _date_bound(desde), _date_bound(hasta, end=True)
+    if period:
+        period_start, period_end = _period_bounds(period)
+        desde_bound = max(filter(None, (desde_bound, period_start)))
+        hasta_bound = min(filter(None, (hasta_bound, period_end)))
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    try:
+        processor.import_existing_workbooks(RECORD_STORE, BITACORA_OUTPUT_DIR)
+    except Exception as exc:
+        print(f"No se pudieron importar los Excel existentes: {exc}")
+    try:
+        registros, next_key = RECORD_STORE.query_records(
+            slugify(target_cliente),
+            fields=selected,
+            desde=desde_bound,
+            hasta=hasta_bound,
+            filters={"estado": estado, "reportado_por": reportado_por, "tecnico": tecnico},
+            after=after,
+            limit=max(1, min(limit, 1000)),
+            descending=order == "desc",
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        "cliente": target_cliente,
+        "registros": registros,
+        "count": len(registros),
+        "siguiente": encode_cursor(next_key) if next_key else None,
+    }
+
+
+@app.get("/bitacora/buscar")
+def buscar(
+    q: str,
+    cliente: Optional[str] = None,
+    period: Optional[str] = None,
+    campo: Optional[str] = None,
+    todas: bool = False,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """
+    Búsqueda de texto en descripción, reportado por y técnico, sin distinguir acentos ni mayúsculas.
+    q admite palabras (alguna; con todas=true, todas), "frases" y prefijos*; sin cliente busca en todos.
+    Resultados por relevancia con fragmento resaltado; "siguiente" es el offset de la próxima página o null.
+    """
+    try:
+        match = search_query(q, all_terms=todas, column=campo)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if match is None:
+        raise HTTPException(status_code=400, detail="La búsqueda no tiene términos")
+    desde, hasta = _period_bounds(period) if period else (None, None)
+    if not RECORD_STORE.search_enabled:
+        raise HTTPException(status_code=503, detail="Búsqueda no disponible: la instalación de SQLite no incluye FTS5")
+
+    try:
+        processor.import_existing_workbooks(RECORD_STORE, BITACORA_OUTPUT_DIR)
+    except Exception as exc:
+        print(f"No se pudieron importar los Excel existentes: {exc}")
+    limit = max(1, min(limit, 200))
+    offset = max(0, offset)
+    with instrumentation.stage("buscar") as stage:
+        resultados, more = RECORD_STORE.search(
+            match,
+            cliente=slugify(resolve_cliente(cliente)) if cliente else None,
+            desde=desde,
+            hasta=hasta,
+            limit=limit,
+            offset=offset,
+        )
+        stage["rows"] = len(resultados)
+    return {
+        "q": q,
+        "resultados": resultados,
+        "count": len(resultados),
+        "siguiente": offset + limit if more else None,
+    }
+
+
+def _measured_stream(chunks: Iterator[bytes], stage_name: str = "excel_stream") -> Iterator[bytes]:
+    """Bloques de una exportación en streaming, registrando la etapa stage_name (hasta que sale el último bloque)."""
+    with instrumentation.stage(stage_name) as stage:
+        for chunk in chunks:
+            stage["bytes"] += len(chunk)
+            yield chunk
+
+
+def _export_response(state: Dict, target_year: int, fmt: str, headers: Dict[str, str]):
+    """csv/ndjson/parquet desde el cache de exportaciones o generados desde el almacén."""
+    media_type = exports.MEDIA_TYPES[fmt]
+    headers = {**headers, "Content-Disposition": f'attachment; filename="bitacora_{state["cliente"]}_{target_year}.{fmt}"'}
+    target = EXPORT_CACHE.path_for(state["cliente"], target_year, fmt, headers["ETag"])
+    if target.exists():
+        return FileResponse(path=target, media_type=media_type, headers=headers)
 
-    clientes.append(nombre)
-    save_clients(clientes)
-    return {"success": True, "message": "Cliente creado correctamente", "clientes": sorted(clientes, key=str.lower), "created": True}
+    if fmt == "parquet":
+        try:
+            with instrumentation.stage("export_parquet") as stage:
+                EXPORT_CACHE.write(target, lambda path: stage.update(rows=exports.write_parquet(RECORD_STORE, state["cliente"], target_year, path)))
+                stage["bytes"] = target.stat().st_size
+        except exports.ExportUnavailable as exc:
+            raise HTTPException(status_code=406, detail=str(exc))
+        return FileResponse(path=target, media_type=media_type, headers=headers)
+
+    if fmt == "csv":
+        chunks = exports.iter_csv(RECORD_STORE, state["cliente"], target_year, processor.EXCEL_COLUMNS)
+    else:
+        chunks = exports.iter_ndjson(RECORD_STORE, state["cliente"], target_year)
+    # Fila por fila mientras se envía; al terminar queda en el cache para la próxima descarga
+    return StreamingResponse(_measured_stream(EXPORT_CACHE.stream_into(target, chunks), f"export_{fmt}"), media_type=media_type, headers=headers)
 
 
 @app.get("/bitacora/excel")
-def descargar(cliente: Optional[str] = None, period: Optional[str] = None):
-    target_cliente = (cliente or BITACORA_DEFAULT_CLIENTE).strip() or BITACORA_DEFAULT_CLIENTE
+def descargar(
+    request: Request,
+    cliente: Optional[str] = None,
+    period: Optional[str] = None,
+    stream: bool = False,
+    formato: Optional[str] = Query(None, alias="format"),
+):
+    """
+    Exportación de un cliente/año: xlsx (por defecto), csv, ndjson o parquet, según ?format= o el header Accept.
+    Lleva ETag por versión de los datos; con If-None-Match vigente responde 304.
+    """
+    fmt = exports.negotiate_format(formato, request.headers.get("accept"))
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Formato no soportado. Disponibles: {', '.join(exports.MEDIA_TYPES)}")
+    if fmt == "parquet" and not exports.parquet_available():
+        raise HTTPException(status_code=406, detail="La exportación Parquet requiere pyarrow (pip install pyarrow)")
+
+    target_cliente = resolve_cliente(cliente)
     safe_cliente = slugify(target_cliente).lower()
     try:
         target_year = int(period.split("-")[0]) if period else datetime.utcnow().year
     except Exception:
         target_year = datetime.utcnow().year
 
-    chosen_path = BITACORA_OUTPUT_DIR / f"bitacora_{safe_cliente}_{target_year}.xlsx"
+    state = None
+    try:
+        processor.import_existing_workbooks(RECORD_STORE, BITACORA_OUTPUT_DIR)
+        state = RECORD_STORE.export_state(slugify(target_cliente), target_year)
+    except Exception as exc:
+        print(f"No se pudo consultar el almacén: {exc}")
+    headers: Dict[str, str] = {}
+    if state is not None:
+        headers = {"ETag": exports.export_etag(RECORD_STORE, state, fmt), "Cache-Control": "no-cache"}
+        if exports.etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    if fmt != "xlsx" or stream:
+        if state is None:
+            raise HTTPException(status_code=404, detail="No hay registros para ese cliente y periodo. Procese la bitácora primero.")
+        if fmt != "xlsx":
+            return _export_response(state, target_year, fmt, headers)
+        # Exportación recién generada desde el almacén, enviada en bloques sin escribir en output/
+        filename = f"bitacora_{state['cliente']}_{target_year}.xlsx"
+        return StreamingResponse(
+            _measured_stream(processor.iter_excel_export(RECORD_STORE, state["cliente"], target_year)),
+            media_type=XLSX_MEDIA_TYPE,
+            headers={**headers, "Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    # El Excel es una exportación del almacén: se regenera aquí si quedó desactualizado o no existe
+    chosen_path = None
+    if state is not None:
+        try:
+            with JOB_QUEUE.client_lock(client_lock_key(target_cliente)), instrumentation.stage("excel_export") as stage:
+                chosen_path = processor.ensure_excel_export(RECORD_STORE, slugify(target_cliente), target_year, BITACORA_OUTPUT_DIR)
+                stage["bytes"] = chosen_path.stat().st_size if chosen_path else 0
+        except Exception as exc:
+            print(f"No se pudo regenerar el Excel desde el almacén: {exc}")
+    if chosen_path is None:
+        # Excel anterior al almacén: sin versión no hay ETag
+        chosen_path = BITACORA_OUTPUT_DIR / f"bitacora_{safe_cliente}_{target_year}.xlsx"
+        headers = {}
 
     if not chosen_path.exists():
         raise HTTPException(status_code=404, detail="Archivo no encontrado. Procese la bitácora primero.")
 
     return FileResponse(
         path=chosen_path,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        media_type=XLSX_MEDIA_TYPE,
         filename=chosen_path.name,
+        headers=headers,
     )
 
 
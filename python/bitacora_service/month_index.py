@@ -0,0 +1,126 @@
+"""
+Índice de meses de un export de WhatsApp: para cada año-mes, los rangos de bytes del .txt que tienen mensajes de
+ese mes. Se guarda junto al archivo fuente (chat.txt.meses) y se arma en cualquier parseo completo; una corrida con
+period=YYYY-MM que lo encuentra vigente parsea solo esos rangos (más la cola agregada después del índice).
+Vale mientras el hash de los primeros `offset` bytes del archivo sea el guardado: como los exports solo crecen al
+final, un archivo con mensajes nuevos conserva el índice de su prefijo y solo hay que sumar la cola.
+
+Uso (desde python/bitacora_service):
+  python month_index.py ver bitacoras/chat_whatsapp.txt
+"""
+import argparse
+import json
+import os
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from chat_records import EPOCH_ORDINAL
+
+INDEX_SUFFIX = ".meses"
+INDEX_VERSION = 1
+# Granularidad de los rangos: bloques de iter_buffer de este tamaño (cortados en saltos de línea)
+INDEX_BLOCK_SIZE = 256 * 1024
+
+
+def index_path_for(source_path) -> Path:
+    source_path = Path(source_path)
+    return source_path.with_name(source_path.name + INDEX_SUFFIX)
+
+
+@lru_cache(maxsize=4096)
+def month_of_day(day: int) -> Tuple[int, int]:
+    """Día epoch (ChatMessage.ts // 86400) -> (año, mes)."""
+    value = date.fromordinal(EPOCH_ORDINAL + day)
+    return value.year, value.month
+
+
+def _month_key(year_month: Tuple[int, int]) -> str:
+    return f"{year_month[0]}-{year_month[1]:02d}"
+
+
+class MonthIndex:
+    """Rangos [inicio, fin) por mes ("YYYY-MM") de los primeros `offset` bytes de un archivo fuente."""
+
+    def __init__(self, path: Path, offset: int = 0, prefix_hash: Optional[str] = None, months: Optional[Dict[str, List[List[int]]]] = None):
+        self.path = Path(path)
+        self.offset = offset
+        self.prefix_hash = prefix_hash
+        self.months: Dict[str, List[List[int]]] = months or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "MonthIndex":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") != INDEX_VERSION or not isinstance(data.get("meses"), dict):
+                raise ValueError("invalid format")
+            return cls(path, int(data["offset"]), str(data["prefix_hash"]), data["meses"])
+        except Exception as exc:
+            print(f"Índice de meses inválido ({path.name}: {exc}); se reconstruirá.")
+            return cls(path)
+
+    @classmethod
+    def for_source(cls, source_path) -> "MonthIndex":
+        return cls.load(index_path_for(source_path))
+
+    def ranges(self, year_month: Tuple[int, int], start: int = 0) -> List[Tuple[int, int]]:
+        """Rangos del mes dentro de [start, offset), en orden de archivo."""
+        return [
+            (max(begin, start), end)
+            for begin, end in self.months.get(_month_key(year_month), [])
+            if end > start
+        ]
+
+    def add_blocks(self, blocks: Iterable[Tuple[int, int, Set[int]]], limit: int) -> None:
+        """
+        Suma bloques (inicio, fin, días epoch de sus mensajes) escaneados en orden; lo que pase de `limit`
+        (una última línea sin salto, que se relee la próxima vez) queda fuera.
+        """
+        for begin, end, days in blocks:
+            end = min(end, limit)
+            if begin >= end:
+                continue
+            for year_month in {month_of_day(day) for day in days}:
+                ranges = self.months.setdefault(_month_key(year_month), [])
+                if ranges and ranges[-1][1] == begin:
+                    ranges[-1][1] = end
+                else:
+                    ranges.append([begin, end])
+
+    def save(self, offset: int, prefix_hash: str) -> None:
+        """Escribe el índice (temporal + reemplazo); si la carpeta no admite escritura solo se avisa."""
+        self.offset = offset
+        self.prefix_hash = prefix_hash
+        payload = {"version": INDEX_VERSION, "offset": offset, "prefix_hash": prefix_hash, "meses": dict(sorted(self.months.items()))}
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            print(f"No se pudo guardar el índice de meses {self.path.name}: {exc}")
+            tmp_path.unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("accion", choices=["ver"])
+    parser.add_argument("fuente", type=Path)
+    args = parser.parse_args()
+
+    index = MonthIndex.for_source(args.fuente)
+    if index.prefix_hash is None:
+        print(f"{args.fuente.name}: sin índice de meses (se arma en el próximo parseo completo)")
+        return
+    size = args.fuente.stat().st_size
+    print(f"{args.fuente.name}: {index.offset:,} de {size:,} bytes indexados, {len(index.months)} meses")
+    for key, ranges in sorted(index.months.items()):
+        total = sum(end - begin for begin, end in ranges)
+        print(f"  {key}: {len(ranges)} rango(s), {total:,} bytes ({total / max(size, 1):.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,50 @@
 Procesador basado en bitacorasmym.py.
 Soporta actualización incremental: omite registros ya existentes en el Excel y solo agrega los nuevos.
 El archivo se guarda por cliente y año (ej: bitacora_cliente_2026.xlsx); enero y febrero se acumulan en el mismo archivo.
+pandas y numpy se importan solo en las funciones de DataFrames: parseo, enlace y almacén no los necesitan.
 """
+import argparse
+import atexit
+import contextlib
+import heapq
+import itertools
+import mmap
+import multiprocessing
 import os
 import re
-from datetime import datetime
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-
-import pandas as pd
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from aggregates import AggregateAccumulator, compute_aggregates, save_aggregates
+from clave_index import ClaveIndex, hash_clave, index_path_for, rebuild_from_workbook as rebuild_clave_index
+from chat_records import TIMESTAMP_FORMAT, ChatMessage, LinkedRequest, format_epoch
+from checkpoints import CheckpointStore, hash_prefix, new_hasher
+from client_registry import CLIENTS_FILE_NAME, ClientRegistry
+from instrumentation import StageRecorder, timed_iter
+from keyword_matcher import KeywordMatcher
+from line_parser import BLOCK_SIZE, LineParser
+from month_index import INDEX_BLOCK_SIZE, MonthIndex, month_of_day
+from record_store import RECORD_DB_NAME, RecordStore, parse_workbook_name, record_year
+from request_index import OpenRequestIndex
+from routing import ROUTING_FILE_NAME, SourceRouting
+from xlsx_stream import iter_xlsx_bytes, write_xlsx_rows
+from zip_sources import MediaIndex, chat_member, has_chat, is_archive, iter_chat_blocks, media_index_path_for
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 # Marcadores de contenido multimedia/sistema que se ignoran como texto útil
 IMAGE_MARKERS = ["imagen omitida", "image omitted"]
-MEDIA_MARKERS = ["audio omitted", "video omitted"]
+# Los adjuntos de un export "con multimedia" (.zip) se ignoran igual que los omitidos del export sin multimedia
+MEDIA_MARKERS = ["audio omitted", "video omitted", "<attached:", "<adjunto:", "(file attached)", "(archivo adjunto)"]
 SYSTEM_MARKERS = [
     "messages and calls are end-to-end encrypted",
     "mensajes y llamadas están cifrados de extremo a extremo",
@@ -52,10 +84,24 @@ CONFIRMATION_KEYWORDS = [
     "atendido", "atendida", "realizado", "realizada", "la medida", "medida tomada", "ok", "ok.", "okay",
 ]
 
+# Un solo autómata con todas las listas: cada mensaje se clasifica en una pasada (ver classify_message)
+KEYWORD_MATCHER = KeywordMatcher({
+    "imagen": IMAGE_MARKERS,
+    "multimedia": MEDIA_MARKERS,
+    "sistema": SYSTEM_MARKERS,
+    "solicitud": REQUEST_KEYWORDS,
+    "confirmacion": CONFIRMATION_KEYWORDS,
+})
+IGNORED_CATEGORIES = frozenset({"imagen", "multimedia", "sistema"})
+
 REPORTER_NAME = "Randall"
 OUTPUT_FILE = "bitacora_mantenimiento_2026.xlsx"
+EXCEL_COLUMNS = [
+    "Fecha Solicitud", "Reportado Por", "Descripcion del Problema", "Tecnico / Respondio", "Estado", "Fecha Cierre",
+]
+XLSX_IMPORT_META_KEY = "importacion_xlsx"
 
-# Regex original
+# Regex original (el motor de line_parser usa una versión equivalente precompilada para líneas ya limpias)
 LINE_REGEX = re.compile(
     r"""
     ^[\u200e\u200f\u202a-\u202e\ufeff\s]*\[\s*
@@ -70,83 +116,49 @@ LINE_REGEX = re.compile(
     re.VERBOSE | re.IGNORECASE
 )
 
-
-def parse_line(line: str, filter_year_month: Optional[Tuple[int, int]] = None) -> Optional[Dict]:
+LINE_PARSER = LineParser()
+
+# Procesos para parsear los .txt en paralelo (uno por archivo); 0 o 1 = en serie, "auto" = un proceso por núcleo
+_workers_env = os.getenv("BITACORA_PARSE_WORKERS", "1").strip().lower()
+PARSE_WORKERS = (os.cpu_count() or 1) if _workers_env == "auto" else max(1, int(_workers_env or 1))
+# Ventana de confirmación del pipeline en streaming (opcional): una solicitud sin confirmar más antigua que esto
+# (respecto del último mensaje leído) se guarda como Pendiente, libera memoria y ya no se cierra aunque llegue un
+# "listo" después. 0 (por defecto) = sin ventana: enlace idéntico al de listas, pero la memoria NO queda acotada:
+# desde la primera solicitud que nunca se confirma, todas las siguientes quedan retenidas hasta el final de la corrida.
+_window_days = float(os.getenv("BITACORA_CONFIRMATION_WINDOW_DAYS", "0") or 0)
+CONFIRMATION_WINDOW: Optional[timedelta] = timedelta(days=_window_days) if _window_days > 0 else None
+# Desorden máximo que el pipeline en streaming corrige dentro de cada export (los reales tienen minutos u horas).
+# Un mensaje que llega más tarde que esto se enlaza en el orden del archivo (y se avisa); 0 = ordenar cada archivo
+# completo, como parse_chat_folder, con todo el archivo en memoria.
+_reorder_hours = float(os.getenv("BITACORA_REORDER_WINDOW_HOURS", "24") or 0)
+REORDER_WINDOW: Optional[timedelta] = timedelta(hours=_reorder_hours) if _reorder_hours > 0 else None
+# Filas por lote al insertar en el almacén desde el pipeline en streaming
+RECORD_BATCH_SIZE = 5000
+# Etapas de una corrida en el orden en que se informan (instrumentation.StageRecorder)
+PIPELINE_STAGES = ("read", "parse", "link", "import_xlsx", "store", "excel_write")
+EXPORT_STAGES = ("key", "clave_index", "excel_read", "merge", "excel_write", "aggregates", "index_write")
+_PARSE_POOL: Optional[Tuple[int, ProcessPoolExecutor]] = None
+_PARSE_POOL_LOCK = threading.Lock()
+
+
+def parse_line(line: str, filter_year_month: Optional[Tuple[int, int]] = None) -> Optional[ChatMessage]:
     """Parsea una línea del chat. Si filter_year_month=(año, mes), solo devuelve mensajes de ese periodo."""
-    def _normalize(s: str) -> str:
-        # Limpia caracteres invisibles que suelen traer los txt exportados de WhatsApp
-        cleaned = s.replace("\u202f", " ").replace("\u00a0", " ")
-        cleaned = cleaned.replace("\u200e", "").replace("\u200f", "")
-        cleaned = cleaned.replace("\ufeff", "").replace("\u2060", "")
-        cleaned = cleaned.replace("\u202a", "").replace("\u202b", "").replace("\u202c", "").replace("\u202d", "").replace("\u202e", "")
-        return cleaned.strip()
-
-    normalized_line = _normalize(line)
-    match = LINE_REGEX.match(normalized_line)
-    if not match:
-        return None
-    date_str = match.group("date")
-    time_str = match.group("time")
-    ampm = match.group("ampm")
-
-    try:
-        day, month, year = map(int, date_str.split("/"))
-    except ValueError:
-        return None
-
-    if year < 100:
-        year += 2000
-
-    try:
-        hour, minute, second = map(int, time_str.split(":"))
-    except ValueError:
-        return None
-
-    ampm_normalized = ampm.replace(".", "").replace(" ", "").lower()
-    if ampm_normalized.startswith("p") and hour < 12:
-        hour += 12
-    if ampm_normalized.startswith("a") and hour == 12:
-        hour = 0
-
-    try:
-        timestamp = datetime(year, month, day, hour, minute, second)
-    except ValueError:
-        return None
-
-    if filter_year_month:
-        fy, fm = filter_year_month
-        if year != fy or month != fm:
-            return None
-
-    author = match.group("author").strip()
-    author = author.lstrip("~•- ")
-    author = author.replace("\u202f", " ").replace("\u00a0", " ").strip()
-
-    return {
-        "datetime": timestamp,
-        "author": author,
-        "message": match.group("message").strip(),
-    }
+    return LINE_PARSER.parse_line(line, filter_year_month)
 
 
-def parse_chat(file_path: str, filter_year_month: Optional[Tuple[int, int]] = None) -> List[Dict]:
-    messages: List[Dict] = []
+def parse_chat(file_path: str, filter_year_month: Optional[Tuple[int, int]] = None) -> List[ChatMessage]:
+    messages: List[ChatMessage] = []
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"No se encontró el archivo: {file_path}")
 
-    current: Optional[Dict] = None
+    current: Optional[ChatMessage] = None
     malformed_lines: List[str] = []
 
     with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
         for raw_line in f:
             parsed = parse_line(raw_line, filter_year_month)
             if parsed:
-                msg_lower = parsed["message"].lower()
-                if any(marker in msg_lower for marker in IMAGE_MARKERS):
-                    continue
-                if any(marker in msg_lower for marker in MEDIA_MARKERS):
-                    continue
-                if any(marker in msg_lower for marker in SYSTEM_MARKERS):
+                if classify_message(parsed) & IGNORED_CATEGORIES:
                     continue
                 if current:
                     messages.append(current)
@@ -154,7 +166,7 @@ def parse_chat(file_path: str, filter_year_month: Optional[Tuple[int, int]] = No
             else:
                 cleaned = raw_line.strip()
                 if current and cleaned:
-                    current["message"] += " " + cleaned
+                    current.message += " " + cleaned
                 elif cleaned:
                     malformed_lines.append(cleaned)
 
@@ -167,48 +179,448 @@ def parse_chat(file_path: str, filter_year_month: Optional[Tuple[int, int]] = No
     return messages
 
 
-def parse_chat_folder_with_stats(source_dir: Path, filter_year_month: Optional[Tuple[int, int]] = None) -> Tuple[List[Dict], List[Dict]]:
-    """Lee y concatena todos los .txt del directorio de bitácoras, retornando mensajes y estadísticas por archivo."""
-    txt_files = sorted(p for p in Path(source_dir).glob("*.txt") if p.is_file())
-    if not txt_files:
-        raise FileNotFoundError(f"No se encontraron archivos .txt en {source_dir}")
-
-    all_messages: List[Dict] = []
-    stats: List[Dict] = []
+def _iter_source(
+    path: Path,
+    checkpoint: Optional[Dict],
+    filter_year_month: Optional[Tuple[int, int]],
+    info: Dict,
+) -> Iterator[ChatMessage]:
+    """
+    Mensajes útiles (sin multimedia/sistema) de un .txt, leídos por bloques sobre el archivo mapeado en memoria.
+    Si el checkpoint sigue siendo válido (mismo hash del prefijo) solo se lee la cola agregada desde la última
+    corrida. Con filter_year_month y un índice de meses vigente (month_index) solo se parsean los rangos de ese mes;
+    un parseo desde el inicio arma el índice y uno que continúa donde termina el índice lo extiende.
+    Al agotarse el generador, info tiene mode, bytes_skipped, bytes_parsed, lines, parsed y el checkpoint nuevo;
+    read_seconds es lo que tardó la lectura (mapear el archivo y hashear prefijo y cola, que trae las páginas a memoria).
+    """
+    read_start = time.perf_counter()
+    stat = path.stat()
+    if checkpoint and stat.st_size == checkpoint.get("size") and stat.st_mtime_ns == checkpoint.get("mtime_ns"):
+        info.update({"mode": "unchanged", "bytes_skipped": stat.st_size, "bytes_parsed": 0, "lines": 0, "parsed": 0, "checkpoint": dict(checkpoint)})
+        return
+    if is_archive(path):
+        yield from _iter_archive_source(path, stat, checkpoint, filter_year_month, info, read_start)
+        return
 
-    for path in txt_files:
-        parsed_msgs: List[Dict] = []
-        line_count = 0
+    start = 0
+    hasher = None
+    mode = "full"
+    with open(path, "rb") as fh:
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else None
         try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                for raw in f:
-                    line_count += 1
-                    parsed = parse_line(raw, filter_year_month)
-                    if parsed:
-                        msg_lower = parsed["message"].lower()
-                        if any(marker in msg_lower for marker in IMAGE_MARKERS):
-                            continue
-                        if any(marker in msg_lower for marker in MEDIA_MARKERS):
-                            continue
-                        if any(marker in msg_lower for marker in SYSTEM_MARKERS):
-                            continue
-                        parsed_msgs.append(parsed)
-        except Exception as exc:
-            print(f"No se pudo leer {path.name}: {exc}")
-            stats.append({"file": path.name, "lines": line_count, "parsed": len(parsed_msgs), "error": str(exc)})
+            view = memoryview(mapped) if mapped is not None else memoryview(b"")
+            if checkpoint:
+                offset = int(checkpoint.get("offset") or 0)
+                if 0 < offset <= len(view):
+                    candidate = hash_prefix(view, offset)
+                    if candidate.hexdigest() == checkpoint.get("prefix_hash"):
+                        start, hasher, mode = offset, candidate, "incremental"
+            if hasher is None:
+                hasher = new_hasher()
+            # El checkpoint avanza solo hasta la última línea completa; una línea final sin salto se relee la próxima vez
+            cut = max(start, mapped.rfind(b"\n", start) + 1) if mapped is not None else 0
+            # El índice de meses se valida con el mismo hash, tomando una copia al pasar por su offset
+            month_index = MonthIndex.for_source(path)
+            indexed_until = None
+            if month_index.prefix_hash and start <= month_index.offset <= cut:
+                hasher.update(view[start:month_index.offset])
+                if hasher.copy().hexdigest() == month_index.prefix_hash:
+                    indexed_until = month_index.offset
+                hasher.update(view[month_index.offset:cut])
+            else:
+                hasher.update(view[start:cut])
+            size = len(view)
+            view.release()
+            info["read_seconds"] = time.perf_counter() - read_start
+
+            # (inicio, fin, se suma al índice): lo que se indexa se escanea sin filtro y el periodo se filtra después
+            if indexed_until is None:
+                if start > 0:
+                    month_index = None
+                else:
+                    month_index = MonthIndex(month_index.path)
+                regions = [(start, size, month_index is not None)]
+            elif filter_year_month:
+                regions = [(begin, end, False) for begin, end in month_index.ranges(filter_year_month, start)]
+                regions.append((indexed_until, size, True))
+                if start == 0:
+                    mode = "indexed"
+            else:
+                regions = [(start, indexed_until, False), (indexed_until, size, True)]
+            update_index = month_index is not None and (indexed_until is None or indexed_until < cut)
+
+            counts = {"lines": 0}
+            parsed = 0
+            last = None
+            for msg in _iter_regions(mapped if mapped is not None else b"", regions, filter_year_month, counts, month_index, cut):
+                if classify_message(msg) & IGNORED_CATEGORIES:
+                    continue
+                parsed += 1
+                last = msg
+                yield msg
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+    if update_index:
+        month_index.save(cut, hasher.hexdigest())
+    bytes_parsed = sum(end - begin for begin, end, _index in regions if end > begin)
+    last_message = (checkpoint or {}).get("last_message") if mode == "incremental" else None
+    if last is not None:
+        last_message = {"datetime": last.datetime.isoformat(), "author": last.author}
+    info.update({
+        "mode": mode, "bytes_skipped": size - bytes_parsed, "bytes_parsed": bytes_parsed, "lines": counts["lines"], "parsed": parsed,
+        "checkpoint": {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "offset": cut,
+            "prefix_hash": hasher.hexdigest(),
+            "last_message": last_message,
+        },
+    })
+
+
+def _iter_archive_source(
+    path: Path,
+    stat: os.stat_result,
+    checkpoint: Optional[Dict],
+    filter_year_month: Optional[Tuple[int, int]],
+    info: Dict,
+    read_start: float,
+) -> Iterator[ChatMessage]:
+    """
+    _iter_source para un .zip: el chat se descomprime por bloques sin leer los adjuntos. Si el chat tiene el mismo
+    CRC que en el checkpoint no se lee; si no, el prefijo ya procesado se descomprime y hashea sin parsearlo y,
+    si coincide, solo se parsea la cola (el .zip no se puede mapear, así que no hay índice de meses). Un parseo
+    completo sin periodo arma además el índice de adjuntos (zip_sources.MediaIndex).
+    """
+    with zipfile.ZipFile(path) as archive:
+        member = chat_member(archive)
+        if member is None:
+            raise ValueError("el .zip no tiene un chat de WhatsApp (_chat.txt)")
+        size = member.file_size
+        if checkpoint and checkpoint.get("crc") == member.CRC and checkpoint.get("chat_size") == size:
+            info.update({
+                "mode": "unchanged", "bytes_skipped": size, "bytes_parsed": 0, "lines": 0, "parsed": 0,
+                "checkpoint": {**checkpoint, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+            })
+            return
+
+        start = 0
+        hasher = new_hasher()
+        mode = "full"
+        stream = archive.open(member)
+        try:
+            offset = int((checkpoint or {}).get("offset") or 0)
+            if 0 < offset <= size:
+                remaining = offset
+                while remaining:
+                    chunk = stream.read(min(BLOCK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    remaining -= len(chunk)
+                if not remaining and hasher.hexdigest() == checkpoint.get("prefix_hash"):
+                    start, mode = offset, "incremental"
+                else:
+                    stream.close()
+                    stream = archive.open(member)
+                    hasher = new_hasher()
+            info["read_seconds"] = time.perf_counter() - read_start
+
+            media_index = MediaIndex(media_index_path_for(path)) if start == 0 and filter_year_month is None else None
+            cut = start
+            lines = 0
+            parsed = 0
+            last = None
+            for block in iter_chat_blocks(stream, BLOCK_SIZE):
+                # El checkpoint avanza solo hasta la última línea completa; una línea final sin salto se relee la próxima vez
+                if block.endswith(b"\n"):
+                    hasher.update(block)
+                    cut += len(block)
+                messages, line_count = LINE_PARSER.scan_text(str(block, "utf-8", "ignore"), filter_year_month)
+                lines += line_count
+                if media_index is not None:
+                    media_index.add(messages)
+                for msg in messages:
+                    if classify_message(msg) & IGNORED_CATEGORIES:
+                        continue
+                    parsed += 1
+                    last = msg
+                    yield msg
+        finally:
+            stream.close()
+
+    if media_index is not None:
+        media_index.save(member)
+    last_message = (checkpoint or {}).get("last_message") if mode == "incremental" else None
+    if last is not None:
+        last_message = {"datetime": last.datetime.isoformat(), "author": last.author}
+    info.update({
+        "mode": mode, "bytes_skipped": start, "bytes_parsed": size - start, "lines": lines, "parsed": parsed,
+        "checkpoint": {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "offset": cut,
+            "prefix_hash": hasher.hexdigest(),
+            "last_message": last_message,
+            "crc": member.CRC if cut == size else None,
+            "chat_size": size,
+        },
+    })
+
+
+def _iter_regions(
+    buffer,
+    regions: List[Tuple[int, int, bool]],
+    filter_year_month: Optional[Tuple[int, int]],
+    counts: Dict[str, int],
+    month_index: Optional[MonthIndex],
+    limit: int,
+) -> Iterator[ChatMessage]:
+    """Mensajes de los rangos (inicio, fin, indexar) en orden; los que se indexan suman sus bloques a month_index."""
+    for begin, end, index in regions:
+        if begin >= end:
+            continue
+        if not index:
+            yield from LINE_PARSER.iter_buffer(buffer, begin, filter_year_month, counts, stop=end)
             continue
+        blocks: List[Tuple[int, int, Set[int]]] = []
+        for msg in LINE_PARSER.iter_buffer(buffer, begin, None, counts, INDEX_BLOCK_SIZE, end, blocks):
+            if filter_year_month is None or month_of_day(msg.ts // 86400) == filter_year_month:
+                yield msg
+        month_index.add_blocks(blocks, limit)
 
-        if not parsed_msgs:
-            print(f"Advertencia: {path.name} no generó mensajes parseados (líneas leídas: {line_count}). Revise el formato.")
 
-        all_messages.extend(parsed_msgs)
-        stats.append({"file": path.name, "lines": line_count, "parsed": len(parsed_msgs), "error": None})
+def _file_stat(path: Path, info: Dict, error: Optional[str] = None) -> Dict:
+    return {
+        "file": path.name, "lines": info.get("lines", 0), "parsed": info.get("parsed", 0), "error": error,
+        "mode": info.get("mode", "full"),
+        "bytes_skipped": 0 if error else info.get("bytes_skipped", 0),
+        "bytes_parsed": 0 if error else info.get("bytes_parsed", 0),
+        "read_seconds": round(info.get("read_seconds", 0.0), 6),
+    }
+
 
-    all_messages.sort(key=lambda m: m["datetime"])
-    return all_messages, stats
+def _parse_source_file(
+    path: Path,
+    filter_year_month: Optional[Tuple[int, int]],
+    checkpoint: Optional[Dict],
+) -> Tuple[List[ChatMessage], Dict, Optional[Dict]]:
+    """
+    Parsea un .txt (completo o solo la cola nueva según el checkpoint) y descarta multimedia/sistema.
+    Retorna los mensajes en orden cronológico, las estadísticas del archivo y el checkpoint nuevo.
+    Es una función de módulo para poder ejecutarse en los procesos del pool.
+    """
+    info: Dict = {}
+    try:
+        parsed_msgs = list(_iter_source(path, checkpoint, filter_year_month, info))
+    except Exception as exc:
+        print(f"No se pudo leer {path.name}: {exc}")
+        return [], _file_stat(path, info, str(exc)), None
 
+    if not parsed_msgs and info["mode"] == "full":
+        print(f"Advertencia: {path.name} no generó mensajes parseados (líneas leídas: {info['lines']}). Revise el formato.")
 
-def parse_chat_folder(source_dir: Path, filter_year_month: Optional[Tuple[int, int]] = None) -> List[Dict]:
+    # Un export ya viene en orden cronológico: el sort estable es lineal y deja el archivo listo para la mezcla
+    parsed_msgs.sort(key=_message_ts)
+    return parsed_msgs, _file_stat(path, info), info["checkpoint"]
+
+
+def _reorder_stream(messages: Iterable[ChatMessage], window: Optional[timedelta], info: Dict) -> Iterator[ChatMessage]:
+    """
+    Ordena por fecha un export casi cronológico (WhatsApp lo escribe en orden de recepción) con memoria acotada:
+    retiene los mensajes de la última `window` y entrega el más antiguo cuando ya ningún mensaje posterior puede
+    ser anterior a él. Si todos los desórdenes del archivo son menores que window, el resultado es el mismo del
+    sort estable; los mensajes que llegan más tarde que eso salen detrás de los ya entregados (quedan en el orden
+    del archivo) y se cuentan en info["out_of_order"]. Sin window es el sort estable del archivo completo.
+    """
+    if window is None:
+        yield from sorted(messages, key=_message_ts)
+        info["out_of_order"] = 0
+        return
+    window_seconds = int(window.total_seconds())
+    heap: List[Tuple[int, int, ChatMessage]] = []
+    latest: Optional[int] = None
+    last_emitted: Optional[int] = None
+    late = 0
+    for seq, msg in enumerate(messages):
+        when = msg.ts
+        if last_emitted is not None and when < last_emitted:
+            late += 1
+        heapq.heappush(heap, (when, seq, msg))
+        if latest is None or when > latest:
+            latest = when
+        limit = latest - window_seconds
+        while heap[0][0] < limit:
+            last_emitted, _seq, ready = heapq.heappop(heap)
+            yield ready
+    while heap:
+        yield heapq.heappop(heap)[2]
+    info["out_of_order"] = late
+
+
+def _iter_source_guarded(path: Path, checkpoint: Optional[Dict], filter_year_month: Optional[Tuple[int, int]], info: Dict) -> Iterator[ChatMessage]:
+    """_iter_source que ante un error de lectura lo registra en info["error"] y corta solo ese archivo."""
+    try:
+        yield from _iter_source(path, checkpoint, filter_year_month, info)
+    except Exception as exc:
+        print(f"No se pudo leer {path.name}: {exc}")
+        info["error"] = str(exc)
+
+
+def iter_folder_messages(
+    txt_files: List[Path],
+    filter_year_month: Optional[Tuple[int, int]] = None,
+    checkpoint_store: Optional[CheckpointStore] = None,
+    file_stats: Optional[List[Dict]] = None,
+) -> Iterator[ChatMessage]:
+    """
+    Mensajes de varios .txt en streaming: cada archivo se lee por bloques, se reordena con una ventana acotada
+    (REORDER_WINDOW) y se mezclan por fecha con heapq.merge, sin materializar ningún archivo. Con desórdenes menores
+    que la ventana (o sin ventana) el orden es el mismo de parse_chat_folder_with_stats. Al agotarse, file_stats recibe las
+    estadísticas por archivo y los checkpoints nuevos quedan pendientes en checkpoint_store.
+    """
+    sources = []
+    for path in txt_files:
+        info: Dict = {}
+        checkpoint = checkpoint_store.get(path.name) if checkpoint_store else None
+        stream = _iter_source_guarded(path, checkpoint, filter_year_month, info)
+        sources.append((path, info, _reorder_stream(stream, REORDER_WINDOW, info)))
+    yield from heapq.merge(*(stream for _path, _info, stream in sources), key=_message_ts)
+
+    for path, info, _stream in sources:
+        error = info.get("error")
+        if info.get("out_of_order"):
+            print(
+                f"Advertencia: {path.name} tiene {info['out_of_order']} mensaje(s) con más de {REORDER_WINDOW} de"
+                " desorden; se enlazan en el orden del archivo (BITACORA_REORDER_WINDOW_HOURS=0 ordena el archivo completo)."
+            )
+        if not error and not info.get("parsed") and info.get("mode") == "full":
+            print(f"Advertencia: {path.name} no generó mensajes parseados (líneas leídas: {info.get('lines', 0)}). Revise el formato.")
+        if file_stats is not None:
+            file_stats.append(_file_stat(path, info, error))
+        if checkpoint_store is not None and not error:
+            checkpoint_store.stage(path.name, info["checkpoint"])
+
+
+def _message_ts(msg: ChatMessage) -> int:
+    return msg.ts
+
+
+def _parse_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de procesos reutilizado entre corridas (se recrea si cambia la cantidad de workers)."""
+    global _PARSE_POOL
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is None or _PARSE_POOL[0] != workers:
+            if _PARSE_POOL is not None:
+                _PARSE_POOL[1].shutdown(wait=False)
+            # spawn: el servidor tiene hilos y un fork podría heredar locks tomados
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _PARSE_POOL = (workers, pool)
+        return _PARSE_POOL[1]
+
+
+def _reset_parse_pool() -> None:
+    global _PARSE_POOL
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is not None:
+            _PARSE_POOL[1].shutdown(wait=False, cancel_futures=True)
+            _PARSE_POOL = None
+
+
+atexit.register(_reset_parse_pool)
+
+
+def _source_files(source_dir: Path) -> List[Path]:
+    """Los .txt de la carpeta y los .zip que tienen un chat (export "con multimedia"), por nombre."""
+    txt_files = sorted(
+        p for p in Path(source_dir).iterdir()
+        if p.is_file() and (p.name.endswith(".txt") or (is_archive(p) and has_chat(p)))
+    )
+    if not txt_files:
+        raise FileNotFoundError(f"No se encontraron archivos .txt ni .zip con un chat en {source_dir}")
+    return txt_files
+
+
+def _parse_files(
+    txt_files: List[Path],
+    filter_year_month: Optional[Tuple[int, int]],
+    checkpoints: List[Optional[Dict]],
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[Dict], None]] = None,
+) -> List[Tuple[List[ChatMessage], Dict, Optional[Dict]]]:
+    """Resultados de _parse_source_file por archivo, en el orden de txt_files (en serie o en el pool)."""
+    workers = PARSE_WORKERS if workers is None else workers
+    jobs = (txt_files, [filter_year_month] * len(txt_files), checkpoints)
+    results: List[Tuple[List[ChatMessage], Dict, Optional[Dict]]] = []
+
+    def collect(iterator) -> None:
+        for result in iterator:
+            results.append(result)
+            if progress:
+                progress({
+                    "files_done": len(results), "files_total": len(txt_files),
+                    "lines_parsed": sum(r[1]["lines"] for r in results),
+                })
+
+    if workers > 1 and len(txt_files) > 1:
+        try:
+            collect(_parse_pool(min(workers, len(txt_files))).map(_parse_source_file, *jobs))
+        except BrokenProcessPool as exc:
+            # p. ej. un script sin `if __name__ == "__main__"`: los procesos nuevos no pueden importarlo
+            print(f"Advertencia: el pool de parseo falló ({exc}); se parsea en serie.")
+            _reset_parse_pool()
+            results.clear()
+            collect(map(_parse_source_file, *jobs))
+    else:
+        collect(map(_parse_source_file, *jobs))
+    return results
+
+
+def _merge_results(
+    txt_files: List[Path],
+    results: List[Tuple[List[ChatMessage], Dict, Optional[Dict]]],
+    checkpoint_store: Optional[CheckpointStore],
+) -> Tuple[Iterator[ChatMessage], List[Dict]]:
+    """Mezcla k-way por fecha de los mensajes de cada archivo y deja sus checkpoints pendientes en el store."""
+    per_file: List[List[ChatMessage]] = []
+    stats: List[Dict] = []
+    for path, (parsed_msgs, stat, new_checkpoint) in zip(txt_files, results):
+        stats.append(stat)
+        if stat["error"] is not None:
+            continue
+        if checkpoint_store is not None:
+            checkpoint_store.stage(path.name, new_checkpoint)
+        per_file.append(parsed_msgs)
+    return heapq.merge(*per_file, key=_message_ts), stats
+
+
+def parse_chat_folder_with_stats(
+    source_dir: Path,
+    filter_year_month: Optional[Tuple[int, int]] = None,
+    checkpoint_store: Optional[CheckpointStore] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[Dict], None]] = None,
+    files: Optional[List[Path]] = None,
+) -> Tuple[List[ChatMessage], List[Dict]]:
+    """
+    Lee todos los .txt del directorio de bitácoras y los .zip con un chat (o solo `files`), retornando mensajes y
+    estadísticas por archivo; cada .zip es una fuente más, con su propio checkpoint.
+    Con workers > 1 (por defecto BITACORA_PARSE_WORKERS) cada archivo se parsea en un proceso del pool.
+    Los mensajes se combinan con una mezcla k-way por fecha; a igual fecha se respeta el orden de archivo
+    y de línea, igual que el sort estable sobre la concatenación.
+    Con checkpoint_store solo se parsea lo agregado desde la última corrida; los checkpoints nuevos quedan
+    pendientes en el store hasta que el llamador haga commit(). progress recibe el avance por archivo.
+    """
+    txt_files = files if files is not None else _source_files(source_dir)
+    checkpoints = [checkpoint_store.get(path.name) if checkpoint_store else None for path in txt_files]
+    results = _parse_files(txt_files, filter_year_month, checkpoints, workers, progress)
+    messages, stats = _merge_results(txt_files, results, checkpoint_store)
+    return list(messages), stats
+
+
+def parse_chat_folder(source_dir: Path, filter_year_month: Optional[Tuple[int, int]] = None) -> List[ChatMessage]:
     messages, _stats = parse_chat_folder_with_stats(source_dir, filter_year_month)
     return messages
 
@@ -218,8 +630,20 @@ def contains_keyword(text: str, keywords: List[str]) -> bool:
     return any(kw in normalized for kw in keywords)
 
 
-def is_request(msg: Dict) -> bool:
-    if not msg.get("message", "").strip():
+def classify_message(msg: ChatMessage) -> FrozenSet[str]:
+    """
+    Categorías de palabras clave presentes en el mensaje (imagen, multimedia, sistema, solicitud, confirmacion).
+    El resultado se guarda en el propio mensaje; si el texto cambia (p. ej. parse_chat agrega líneas de
+    continuación) ChatMessage descarta el cache y se vuelve a clasificar.
+    """
+    categories = msg.categories
+    if categories is None:
+        categories = msg.categories = KEYWORD_MATCHER.classify(msg.message)
+    return categories
+
+
+def is_request(msg: ChatMessage) -> bool:
+    if not msg.message.strip():
         return False
     if is_confirmation(msg):
         return False
@@ -227,106 +651,386 @@ def is_request(msg: Dict) -> bool:
     return True
 
 
-def is_confirmation(msg: Dict) -> bool:
-    return contains_keyword(msg["message"], CONFIRMATION_KEYWORDS)
+def is_confirmation(msg: ChatMessage) -> bool:
+    return "confirmacion" in classify_message(msg)
 
 
-def link_requests_and_confirmations(messages: List[Dict]) -> List[Dict]:
-    requests: List[Dict] = []
+def iter_linked_requests(
+    messages: Iterable[ChatMessage],
+    window: Optional[timedelta] = None,
+    stored_open: Sequence[ChatMessage] = (),
+) -> Iterator[LinkedRequest]:
+    """
+    Enlace en streaming: entrega LinkedRequest (request, confirmation) en el orden de las solicitudes, apenas
+    cada una ya no puede cambiar (tiene confirmación, o es la más antigua pendiente y quedó fuera de la ventana).
+    Sin window el resultado es idéntico al original, pero una solicitud abierta retiene a las siguientes hasta el final.
+    Con window, una solicitud sin confirmar más antigua que (fecha más reciente vista - window) se entrega como
+    Pendiente y ya no se cierra: la memoria queda acotada a las solicitudes dentro de la ventana.
+    stored_open son solicitudes de corridas anteriores que siguen pendientes en el almacén: quedan abiertas antes
+    que messages, solo se entregan si alguna confirmación las cierra y una solicitud de messages con la misma fecha,
+    autor y texto (archivo reparseado) no se vuelve a abrir.
+    """
+    window_seconds = int(window.total_seconds()) if window is not None else None
+    open_requests = OpenRequestIndex()
+    pending: List[LinkedRequest] = []
+    stored_keys: Set[Tuple[int, str, str]] = set()
+    for msg in stored_open:
+        open_requests.push(msg.ts)
+        pending.append(LinkedRequest(msg))
+        stored_keys.add((msg.ts, msg.author, msg.message))
+    # Los primeros `stored` slots son de stored_open; sin confirmación ya están guardados tal cual
+    stored = len(pending)
+    head = 0
+    # Slot de pending[0]
+    first_slot = 0
+    latest: Optional[int] = None
     for msg in messages:
+        when = msg.ts
         if is_request(msg):
-            requests.append({"request": msg, "confirmation": None})
+            key = (when, msg.author, msg.message)
+            if stored_keys and key in stored_keys:
+                stored_keys.discard(key)
+            else:
+                open_requests.push(when)
+                pending.append(LinkedRequest(msg))
         elif is_confirmation(msg):
-            for req in reversed(requests):
-                if req["confirmation"] is None and req["request"]["datetime"] <= msg["datetime"]:
-                    req["confirmation"] = msg
+            slot = open_requests.close_latest_before(when)
+            if slot is not None:
+                pending[slot - first_slot].confirmation = msg
+        if window_seconds is not None and (latest is None or when > latest):
+            latest = when
+        limit = latest - window_seconds if latest is not None else None
+
+        emitted = head
+        while head < len(pending):
+            item = pending[head]
+            if item.confirmation is None:
+                if limit is None or item.request.ts >= limit:
                     break
-    return requests
-
-
-def build_dataframe(requests: List[Dict]) -> pd.DataFrame:
-    rows = []
-    for item in requests:
-        req = item["request"]
-        conf = item.get("confirmation")
-        rows.append({
-            "Fecha Solicitud": req["datetime"],
-            "Reportado Por": req["author"],
-            "Descripcion del Problema": req["message"],
-            "Tecnico / Respondio": conf["author"] if conf else "",
-            "Estado": "Completado" if conf else "Pendiente",
-            "Fecha Cierre": conf["datetime"] if conf else None,
-        })
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        df["Fecha Solicitud"] = pd.to_datetime(df["Fecha Solicitud"])
-        df["Fecha Cierre"] = pd.to_datetime(df["Fecha Cierre"])
-    return df
-
-
-def _add_key_column(df: pd.DataFrame) -> pd.DataFrame:
+                open_requests.discard(first_slot + head)
+            head += 1
+            if item.confirmation is not None or first_slot + head > stored:
+                yield item
+        if head != emitted:
+            open_requests.forget_before(first_slot + head)
+            # Se libera el prefijo ya entregado cuando es al menos la mitad de la lista
+            if 2 * head >= len(pending):
+                del pending[:head]
+                first_slot += head
+                head = 0
+    for index in range(head, len(pending)):
+        item = pending[index]
+        if item.confirmation is not None or first_slot + index >= stored:
+            yield item
+
+
+def link_requests_and_confirmations(messages: List[ChatMessage]) -> List[LinkedRequest]:
+    """
+    Enlaza cada confirmación con la solicitud abierta más reciente cuya fecha sea <= la de la confirmación.
+    Las solicitudes abiertas se indexan (OpenRequestIndex) para no recorrer la lista completa por confirmación.
+    """
+    return list(iter_linked_requests(messages))
+
+
+def _epoch_column(values: "np.ndarray") -> "np.ndarray":
+    """Segundos epoch (int64, _NAT_EPOCH = sin fecha) a datetime64[us], la misma resolución que pd.to_datetime."""
+    return values.astype("datetime64[s]").astype("datetime64[us]")
+
+
+# Mínimo de int64: datetime64 lo interpreta como NaT
+_NAT_EPOCH = -(1 << 63)
+# Estado como categórica: código 0 = Pendiente, 1 = Completado
+_ESTADO_CATEGORIES = ["Pendiente", "Completado"]
+
+
+def build_dataframe(requests: Sequence[LinkedRequest]) -> "pd.DataFrame":
+    """
+    DataFrame de las solicitudes enlazadas, armado por columnas: las fechas pasan de ChatMessage.ts a datetime64
+    sin objetos datetime intermedios, y Estado y los autores (pocos valores repetidos) quedan como categóricas.
+    """
+    import numpy as np
+    import pandas as pd
+
+    count = len(requests)
+    if not count:
+        return pd.DataFrame()
+    reqs = [item.request for item in requests]
+    confs = [item.confirmation for item in requests]
+    closed = np.fromiter((conf is not None for conf in confs), dtype=np.int8, count=count)
+    return pd.DataFrame({
+        "Fecha Solicitud": _epoch_column(np.fromiter((req.ts for req in reqs), dtype=np.int64, count=count)),
+        "Reportado Por": pd.Categorical([req.author for req in reqs]),
+        "Descripcion del Problema": [req.message for req in reqs],
+        "Tecnico / Respondio": pd.Categorical([conf.author if conf is not None else "" for conf in confs]),
+        "Estado": pd.Categorical.from_codes(closed, _ESTADO_CATEGORIES),
+        "Fecha Cierre": _epoch_column(np.fromiter(
+            (conf.ts if conf is not None else _NAT_EPOCH for conf in confs), dtype=np.int64, count=count,
+        )),
+    })
+
+
+def _as_datetime(values: "pd.Series", errors: str = "raise") -> "pd.Series":
+    """pd.to_datetime solo si la columna todavía no es datetime64 (las de build_dataframe y read_excel ya lo son)."""
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, errors=errors)
+
+
+def _text_array(values: "pd.Series") -> "np.ndarray":
+    """Columna como array de str ("" para vacíos); en las categóricas se convierten solo las categorías."""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        labels = np.append(values.cat.categories.astype(str).to_numpy(dtype=object), "")
+        # El código -1 (vacío) toma la última etiqueta
+        return labels[values.cat.codes.to_numpy()]
+    return values.fillna("").astype(str).to_numpy(dtype=object)
+
+
+def _timestamp_array(values: "pd.Series", missing: Optional[str] = None) -> "np.ndarray":
+    """Fechas como "YYYY-MM-DD HH:MM:SS" (missing para NaT), formateadas de una vez con numpy."""
+    import numpy as np
+
+    stamps = _as_datetime(values).to_numpy(dtype="datetime64[s]")
+    text = np.char.replace(np.datetime_as_string(stamps, unit="s"), "T", " ").astype(object)
+    text[np.isnat(stamps)] = missing
+    return text
+
+
+def _key_column(df: "pd.DataFrame") -> "pd.Series":
+    """
+    Clave única de cada fila (Fecha Solicitud|Reportado Por|Descripcion), NaN si no tiene fecha.
+    Se calcula sobre arrays de las columnas, sin copiar el DataFrame ni agregarle columnas.
+    """
+    import numpy as np
+    import pandas as pd
+
     if df.empty:
-        df["clave"] = []
-        return df
-
-    df_copy = df.copy()
-    df_copy["Fecha Solicitud"] = pd.to_datetime(df_copy["Fecha Solicitud"])
-    df_copy["Fecha Cierre"] = pd.to_datetime(df_copy["Fecha Cierre"])
-    df_copy["clave"] = (
-        df_copy["Fecha Solicitud"].dt.strftime("%Y-%m-%d %H:%M:%S")
-        + "|" + df_copy["Reportado Por"].fillna("").astype(str)
-        + "|" + df_copy["Descripcion del Problema"].fillna("").astype(str)
-    )
-    return df_copy
+        return pd.Series([], index=df.index, dtype=object)
+    fechas = _timestamp_array(df["Fecha Solicitud"], missing="")
+    claves = fechas + "|" + _text_array(df["Reportado Por"]) + "|" + _text_array(df["Descripcion del Problema"])
+    claves[fechas == ""] = np.nan
+    return pd.Series(claves, index=df.index, dtype=object)
+
+
+def read_existing_workbook(output_path: str) -> "pd.DataFrame":
+    import pandas as pd
+
+    try:
+        return pd.read_excel(output_path, engine="openpyxl")
+    except Exception as exc:
+        print(f"No se pudo leer el Excel existente ({exc}); se regenerará completo.")
+        return pd.DataFrame(columns=EXCEL_COLUMNS)
+
+
+def _write_dataframe_xlsx(df: "pd.DataFrame", output_path: str) -> None:
+    """Escribe un DataFrame con el escritor write-only (NaT/NaN como celdas vacías)."""
+    values = df.astype(object).where(df.notna(), None)
+    write_xlsx_rows(output_path, [str(c) for c in df.columns], values.itertuples(index=False, name=None))
 
 
-def export_to_excel(df: pd.DataFrame, output_path: str) -> Dict:
+def export_to_excel(df: "pd.DataFrame", output_path: str, recorder: Optional[StageRecorder] = None) -> Dict:
     """
-    Guarda el Excel. Si el archivo ya existe, lee los registros existentes, omite duplicados
-    (por clave única: Fecha Solicitud + Reportado Por + Descripcion) y solo agrega los nuevos.
+    Guarda el Excel. Si el archivo ya existe, omite duplicados (por clave única: Fecha Solicitud + Reportado Por
+    + Descripcion) y solo agrega los nuevos. Los duplicados se detectan con el índice de hashes guardado junto
+    al Excel (clave_index), así que el libro existente solo se lee cuando hay registros nuevos que agregar.
     Ordena el resultado por Fecha Solicitud para ver enero, febrero, etc. en orden cronológico.
-    Retorna: { new_records_added, total_rows, was_updated }
+    Solo lo usa el camino DataFrame (CLI y libros sueltos): procesar_bitacora guarda en el almacén SQLite y
+    exporta con ensure_excel_export, sin índice de claves.
+    Retorna: { new_records_added, total_rows, was_updated }, más stages si no se pasó recorder.
     """
-    new_df = _add_key_column(df)
+    own = recorder is None
+    recorder = recorder or StageRecorder(EXPORT_STAGES)
+    result = _export_to_excel(df, output_path, recorder)
+    if own:
+        result["stages"] = recorder.finish()
+    return result
 
-    if os.path.exists(output_path):
-        try:
-            existing_df = pd.read_excel(output_path, engine="openpyxl")
-        except Exception as exc:
-            print(f"No se pudo leer el Excel existente ({exc}); se regenerará completo.")
-            existing_df = pd.DataFrame(columns=df.columns if not df.empty else [])
-        if existing_df.empty:
-            existing_df = pd.DataFrame(columns=new_df.columns)
-        existing_df = _add_key_column(existing_df)
 
-        existing_keys = set(existing_df["clave"].dropna().tolist())
-        filtered_new = new_df[~new_df["clave"].isin(existing_keys)]
-        new_records_added = len(filtered_new)
+def _export_to_excel(df: "pd.DataFrame", output_path: str, recorder: StageRecorder) -> Dict:
+    import pandas as pd
+
+    with recorder.stage("key") as stage:
+        # Una fila sin Fecha Solicitud no tiene clave (NaN): no entra al índice y siempre se agrega
+        new_hashes = [hash_clave(c) if isinstance(c, str) else None for c in _key_column(df)]
+        stage["rows"] = len(new_hashes)
+
+    if os.path.exists(output_path):
+        with recorder.stage("clave_index") as stage:
+            index = ClaveIndex.for_output(output_path)
+            if not index.is_current(output_path):
+                index = rebuild_clave_index(output_path)
+            is_new = [h is None or h not in index for h in new_hashes]
+            filtered_new = df[is_new]
+            new_records_added = len(filtered_new)
+            stage["rows"] = len(new_hashes)
 
         if new_records_added == 0:
             # No hay registros nuevos; mantener el archivo como está
-            total_rows = len(existing_df)
-            return {"new_records_added": 0, "total_rows": total_rows, "was_updated": False}
-
-        merged = pd.concat([existing_df, filtered_new], ignore_index=True)
-        merged = merged.drop(columns=["clave"], errors="ignore")
-        merged["Fecha Solicitud"] = pd.to_datetime(merged["Fecha Solicitud"])
-        merged["Fecha Cierre"] = pd.to_datetime(merged["Fecha Cierre"], errors="coerce")
-        merged = merged.sort_values("Fecha Solicitud").reset_index(drop=True)
-        merged.to_excel(output_path, index=False, engine="openpyxl")
+            return {"new_records_added": 0, "total_rows": index.rows, "was_updated": False}
+
+        with recorder.stage("excel_read") as stage:
+            existing_df = read_existing_workbook(output_path)
+            stage["rows"] = len(existing_df)
+            stage["bytes"] = os.path.getsize(output_path)
+        with recorder.stage("merge") as stage:
+            if existing_df.empty:
+                existing_df = pd.DataFrame(columns=df.columns)
+            merged = pd.concat([existing_df, filtered_new], ignore_index=True)
+            merged["Fecha Solicitud"] = _as_datetime(merged["Fecha Solicitud"])
+            merged["Fecha Cierre"] = _as_datetime(merged["Fecha Cierre"], errors="coerce")
+            merged = merged.sort_values("Fecha Solicitud").reset_index(drop=True)
+            stage["rows"] = len(merged)
+        _write_export(merged, output_path, recorder)
         total_rows = len(merged)
+        with recorder.stage("index_write") as stage:
+            index.add((h for h, keep in zip(new_hashes, is_new) if keep and h is not None), new_records_added)
+            index.save(output_path)
+            stage["rows"] = new_records_added
         print(f"Archivo actualizado: {output_path} — {new_records_added} registros nuevos, {total_rows} total")
         return {"new_records_added": new_records_added, "total_rows": total_rows, "was_updated": True}
     else:
-        merged = new_df.drop(columns=["clave"], errors="ignore")
+        merged = df
         if not merged.empty:
-            merged = merged.sort_values("Fecha Solicitud").reset_index(drop=True)
-        merged.to_excel(output_path, index=False, engine="openpyxl")
+            with recorder.stage("merge") as stage:
+                merged = merged.sort_values("Fecha Solicitud").reset_index(drop=True)
+                stage["rows"] = len(merged)
+        _write_export(merged, output_path, recorder)
         total_rows = len(merged)
+        with recorder.stage("index_write") as stage:
+            index = ClaveIndex(index_path_for(output_path))
+            index.add((h for h in new_hashes if h is not None), total_rows)
+            index.save(output_path)
+            stage["rows"] = total_rows
         print(f"Archivo generado: {output_path} — {total_rows} registros")
         return {"new_records_added": total_rows, "total_rows": total_rows, "was_updated": True}
 
 
+def _write_export(merged: "pd.DataFrame", output_path: str, recorder: StageRecorder) -> None:
+    with recorder.stage("excel_write") as stage:
+        _write_dataframe_xlsx(merged, output_path)
+        stage["rows"] = len(merged)
+        stage["bytes"] = os.path.getsize(output_path)
+    with recorder.stage("aggregates") as stage:
+        save_aggregates(output_path, compute_aggregates(merged))
+        stage["rows"] = len(merged)
+
+
+def _record_rows(df: "pd.DataFrame") -> Iterator[Tuple[str, Sequence]]:
+    """Filas (clave, valores) listas para RecordStore.insert_records, con la misma clave que export_to_excel."""
+    if df.empty:
+        return
+    columns = (
+        _timestamp_array(df["Fecha Solicitud"]), _text_array(df["Reportado Por"]),
+        _text_array(df["Descripcion del Problema"]), _text_array(df["Tecnico / Respondio"]),
+        _text_array(df["Estado"]), _timestamp_array(df["Fecha Cierre"]),
+    )
+    yield from zip(_key_column(df), zip(*columns))
+
+
+def _linked_record_row(item: LinkedRequest) -> Tuple[str, Sequence]:
+    """Fila (clave, valores) de una solicitud enlazada; misma clave y valores que _record_rows(build_dataframe(...))."""
+    req = item.request
+    conf = item.confirmation
+    fecha = format_epoch(req.ts)
+    return f"{fecha}|{req.author}|{req.message}", (
+        fecha, req.author, req.message,
+        conf.author if conf else "", "Completado" if conf else "Pendiente",
+        format_epoch(conf.ts) if conf else None,
+    )
+
+
+def iter_record_batches(linked: Iterable[LinkedRequest], batch_size: int = RECORD_BATCH_SIZE) -> Iterator[List[Tuple[str, Sequence]]]:
+    """Agrupa las solicitudes enlazadas en lotes de filas para RecordStore.insert_records."""
+    batch: List[Tuple[str, Sequence]] = []
+    for item in linked:
+        batch.append(_linked_record_row(item))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _excel_rows_from_store(store: RecordStore, cliente: str, year: int, accumulator: AggregateAccumulator) -> Iterator[Tuple]:
+    for fecha, reportado, descripcion, tecnico, estado, cierre in store.iter_rows(cliente, year):
+        fecha_dt = datetime.fromisoformat(fecha)
+        accumulator.add(fecha_dt, estado)
+        yield fecha_dt, reportado, descripcion, tecnico, estado, datetime.fromisoformat(cierre) if cierre else None
+
+
+def iter_excel_export(store: RecordStore, cliente: str, year: int) -> Iterator[bytes]:
+    """Excel del cliente/año generado al vuelo desde el almacén, en bloques de bytes (para respuestas en streaming)."""
+    return iter_xlsx_bytes(EXCEL_COLUMNS, _excel_rows_from_store(store, cliente, year, AggregateAccumulator()))
+
+
+def export_records_to_excel(store: RecordStore, cliente: str, year: int, output_path: Path) -> int:
+    """
+    Regenera el Excel de un cliente/año desde el almacén, fila por fila (memoria constante).
+    Escribe a un temporal y lo reemplaza de forma atómica.
+    """
+    state = store.export_state(cliente, year)
+    accumulator = AggregateAccumulator()
+    tmp_path = output_path.with_name(f".{output_path.stem}.tmp.xlsx")
+    rows = write_xlsx_rows(str(tmp_path), EXCEL_COLUMNS, _excel_rows_from_store(store, cliente, year, accumulator))
+    os.replace(tmp_path, output_path)
+    save_aggregates(output_path, accumulator.result())
+    if state:
+        store.mark_exported(cliente, year, state["version"])
+    return rows
+
+
+def ensure_excel_export(store: RecordStore, cliente: str, year: int, output_dir: Path) -> Optional[Path]:
+    """Ruta del Excel del cliente/año, regenerándolo solo si está desactualizado o no existe. None si no hay datos."""
+    state = store.export_state(cliente, year)
+    if state is None:
+        return None
+    output_path = Path(output_dir) / f"bitacora_{state['cliente']}_{year}.xlsx"
+    if state["version"] != state["version_exportada"] or not output_path.exists():
+        rows = export_records_to_excel(store, state["cliente"], year, output_path)
+        print(f"Archivo generado: {output_path} — {rows} registros")
+    return output_path
+
+
+def import_existing_workbooks(store: RecordStore, output_dir: Path, force: bool = False) -> Dict[str, int]:
+    """
+    Importación única de los bitacora_<cliente>_<año>.xlsx existentes al almacén.
+    Retorna los registros agregados por archivo; con force=False no hace nada si ya se importó antes.
+    """
+    if not force and store.get_meta(XLSX_IMPORT_META_KEY):
+        return {}
+    imported: Dict[str, int] = {}
+    for path in sorted(Path(output_dir).glob("bitacora_*.xlsx")):
+        parsed_name = parse_workbook_name(path.name)
+        if not parsed_name:
+            continue
+        cliente, year = parsed_name
+        # pandas solo hace falta si hay libros que importar
+        import pandas as pd
+
+        try:
+            df = pd.read_excel(path, engine="openpyxl")
+        except Exception as exc:
+            print(f"No se pudo importar {path.name}: {exc}")
+            continue
+        missing = [col for col in EXCEL_COLUMNS if col not in df.columns]
+        if df.empty or missing:
+            continue
+        records = list(_record_rows(df))
+        added = store.insert_records(cliente, records)
+        imported[path.name] = sum(added.values())
+        # Si el Excel ya contiene todo lo que hay en su partición (y solo eso), no hace falta regenerarlo
+        state = store.export_state(cliente, year)
+        same_year = all(record_year(values[0]) == year for _clave, values in records)
+        if state and same_year and store.count(cliente, year) == len(df):
+            store.mark_exported(cliente, year, state["version"])
+    store.set_meta(XLSX_IMPORT_META_KEY, datetime.utcnow().isoformat())
+    return imported
+
+
 def slugify(value: str) -> str:
     cleaned = re.sub(r"[^A-Za-z0-9_-]+", "_", value or "sin_cliente")
     return cleaned.strip("_") or "sin_cliente"
@@ -348,64 +1052,407 @@ def _parse_period(period: Optional[str]) -> Optional[Tuple[int, int]]:
     return None
 
 
-def procesar_bitacora(cliente: Optional[str], period: Optional[str], source_dir: Path, output_dir: Path) -> Dict:
+def _bytes_summary(file_stats: List[Dict]) -> Dict:
+    return {
+        "bytes_skipped": sum(int(st.get("bytes_skipped") or 0) for st in file_stats),
+        "bytes_parsed": sum(int(st.get("bytes_parsed") or 0) for st in file_stats),
+    }
+
+
+def _checkpoint_store_for(cliente: str, filter_year_month: Optional[Tuple[int, int]], output_dir: Path) -> CheckpointStore:
+    scope = f"{filter_year_month[0]}-{filter_year_month[1]:02d}" if filter_year_month else "todo"
+    return CheckpointStore(output_dir / ".checkpoints" / f"{slugify(cliente).lower()}.json", scope, output_dir)
+
+
+def _same_client(a: Optional[str], b: Optional[str]) -> bool:
+    return a is not None and b is not None and slugify(a).lower() == slugify(b).lower()
+
+
+def _stored_partition_result(
+    cliente: str,
+    filter_year_month: Optional[Tuple[int, int]],
+    output_dir: Path,
+    record_store: Optional[RecordStore],
+    file_stats: List[Dict],
+    lines: int,
+) -> Dict:
+    """
+    Resultado de una corrida sin solicitudes nuevas: lo que ya está guardado en la partición (la del periodo o la
+    última del cliente) y su Excel, regenerado solo si quedó desactualizado. Sin almacén ni partición, todo en cero.
+    """
+    db_path = Path(output_dir) / RECORD_DB_NAME
+    year, output_file, total_rows = None, None, 0
+    if record_store is not None or db_path.exists():
+        store = record_store or RecordStore(db_path)
+        try:
+            year = filter_year_month[0] if filter_year_month else store.latest_year(cliente)
+            if year is not None:
+                output_file = ensure_excel_export(store, cliente, year, output_dir)
+                total_rows = store.count(cliente, year)
+        finally:
+            if record_store is None:
+                store.close()
+    return {
+        "path": output_file, "rows": 0, "new_records_added": 0, "total_rows": total_rows,
+        "year": year if output_file else None, "filename": output_file.name if output_file else None,
+        "lines_read": lines, "lines_valid": lines, "file_stats": file_stats,
+        **_bytes_summary(file_stats),
+    }
+
+
+def _stored_open_requests(
+    cliente: str,
+    filter_year_month: Optional[Tuple[int, int]],
+    output_dir: Path,
+    record_store: Optional[RecordStore],
+    checkpoint_store: CheckpointStore,
+    window: Optional[timedelta],
+) -> List[ChatMessage]:
+    """
+    Solicitudes del cliente que siguen pendientes en el almacén (las del periodo, si hay uno), como mensajes para
+    iter_linked_requests. Con window solo las que un reparse completo todavía tendría abiertas: las que no quedaron
+    fuera de la ventana respecto del último mensaje de las corridas anteriores.
+    """
+    db_path = Path(output_dir) / RECORD_DB_NAME
+    if record_store is None and not db_path.exists():
+        return []
+    desde = hasta = None
+    if filter_year_month:
+        year, month = filter_year_month
+        desde = f"{year:04d}-{month:02d}-01 00:00:00"
+        hasta = f"{year + month // 12:04d}-{month % 12 + 1:02d}-01 00:00:00"
+    latest = checkpoint_store.latest_message()
+    if window is not None and latest is not None:
+        desde = max(desde or "", (latest - window).strftime(TIMESTAMP_FORMAT))
+    store = record_store or RecordStore(db_path)
+    try:
+        rows = store.open_requests(cliente, desde, hasta)
+    finally:
+        if record_store is None:
+            store.close()
+    return [
+        ChatMessage.from_datetime(datetime.fromisoformat(fecha), autor, descripcion)
+        for fecha, autor, descripcion in rows
+    ]
+
+
+def _process_client_messages(
+    cliente: Optional[str],
+    messages: Iterable[ChatMessage],
+    file_stats: List[Dict],
+    filter_year_month: Optional[Tuple[int, int]],
+    output_dir: Path,
+    record_store: Optional[RecordStore],
+    checkpoint_store: Optional[CheckpointStore],
+    report: Callable[[Dict], None],
+    window: Optional[timedelta] = None,
+    recorder: Optional[StageRecorder] = None,
+) -> Dict:
+    """
+    Enlaza en streaming los mensajes de un cliente y guarda las solicitudes en el almacén por lotes a medida que
+    quedan cerradas (ventana de confirmación); después regenera su Excel. messages puede ser un generador:
+    file_stats se completa cuando se agota. recorder recibe las etapas parse (lo que tardó en llegar cada mensaje),
+    link, import_xlsx, store y excel_write.
+    """
+    safe_cliente = slugify(cliente or "cliente")
+    recorder = recorder or StageRecorder(PIPELINE_STAGES)
+    counts: Dict = {"seconds": 0.0, "rows": 0}
+    linking: Dict = {"seconds": 0.0, "rows": 0}
+
+    def record_stream(requests: int) -> None:
+        # El tiempo de cada lote incluye el de traer sus mensajes: link es la diferencia
+        recorder.add("parse", counts["seconds"], rows=counts["rows"])
+        recorder.add("link", linking["seconds"] - counts["seconds"], rows=requests)
+
+    # Incremental: la cola nueva también puede cerrar lo que quedó pendiente en corridas anteriores
+    stored_open = (
+        _stored_open_requests(safe_cliente, filter_year_month, output_dir, record_store, checkpoint_store, window)
+        if checkpoint_store is not None else []
+    )
+    report({"stage": "link"})
+    linked = iter_linked_requests(timed_iter(messages, counts), window, stored_open)
+    batches = timed_iter(iter_record_batches(linked), linking)
+    first_batch = next(batches, None)
+    if first_batch is None:
+        record_stream(0)
+        if checkpoint_store:
+            checkpoint_store.commit()
+        return _stored_partition_result(safe_cliente, filter_year_month, output_dir, record_store, file_stats, counts["rows"])
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    store = record_store or RecordStore(output_dir / RECORD_DB_NAME)
+    rows = 0
+    # Claves distintas de la corrida por partición: un mensaje repetido (misma fecha, autor y texto) se guarda una
+    # sola vez
+    stored_keys: Dict[int, Set[int]] = {}
+    # Registros nuevos por partición (el año de la fecha de cada solicitud, ver record_year)
+    added_by_year: Dict[int, int] = {}
+    exports: List[Dict] = []
+    try:
+        with recorder.stage("import_xlsx") as stage:
+            stage["rows"] = sum(import_existing_workbooks(store, output_dir).values())
+        for batch in itertools.chain((first_batch,), batches):
+            with recorder.stage("store") as stage:
+                for year, added in store.insert_records(safe_cliente, batch).items():
+                    added_by_year[year] = added_by_year.get(year, 0) + added
+                stage["rows"] = len(batch)
+            rows += len(batch)
+            for clave, values in batch:
+                year = record_year(values[0])
+                stored_keys.setdefault(year, set()).add(hash(clave))
+                added_by_year.setdefault(year, 0)
+            report({
+                "stage": "store", "messages": counts["rows"], "requests": rows,
+                "records_added": sum(added_by_year.values()),
+            })
+        new_records_added = sum(added_by_year.values())
+        record_stream(rows)
+        report({"stage": "export", "records_added": new_records_added})
+        with recorder.stage("excel_write") as stage:
+            for year in sorted(added_by_year):
+                output_file = ensure_excel_export(store, safe_cliente, year, output_dir)
+                exports.append({
+                    "year": year, "path": output_file, "filename": output_file.name, "rows": len(stored_keys[year]),
+                    "new_records_added": added_by_year[year], "total_rows": store.count(safe_cliente, year),
+                })
+            stage["rows"] = sum(export["total_rows"] for export in exports)
+            stage["bytes"] = sum(export["path"].stat().st_size for export in exports)
+    finally:
+        if record_store is None:
+            store.close()
+    for export in exports:
+        if export["new_records_added"]:
+            print(
+                f"Bitácora {safe_cliente} {export['year']}: {export['new_records_added']} registros nuevos,"
+                f" {export['total_rows']} total"
+            )
+
+    if checkpoint_store:
+        checkpoint_store.mark_output(RECORD_DB_NAME)
+        checkpoint_store.commit()
+
+    # path/year/filename: la partición del periodo o la más reciente de la corrida; exports, todas las que tocó
+    latest = exports[-1]
+    return {
+        "path": latest["path"],
+        "rows": sum(export["rows"] for export in exports),
+        "new_records_added": new_records_added,
+        "total_rows": sum(export["total_rows"] for export in exports),
+        "year": latest["year"],
+        "filename": latest["filename"],
+        "exports": exports,
+        "lines_read": counts["rows"],
+        "lines_valid": counts["rows"],
+        "file_stats": file_stats,
+        **_bytes_summary(file_stats),
+    }
+
+
+def procesar_bitacora(
+    cliente: Optional[str],
+    period: Optional[str],
+    source_dir: Path,
+    output_dir: Path,
+    incremental: bool = True,
+    record_store: Optional[RecordStore] = None,
+    progress: Optional[Callable[[Dict], None]] = None,
+    routing: Optional[SourceRouting] = None,
+) -> Dict:
     """
     Procesa la bitácora. Si period es YYYY-MM, solo procesa mensajes de ese mes.
     El Excel se guarda por cliente y año (ej: bitacora_cliente_2026.xlsx).
     Enero y febrero se acumulan en el mismo archivo; se omiten duplicados.
+    Con incremental=True solo se parsea lo agregado a cada .txt desde la última corrida del cliente/periodo.
+    Los registros se guardan en el almacén SQLite (record_store o output_dir/bitacora.sqlite3); el Excel
+    se regenera desde ahí solo si hubo registros nuevos o si el archivo no existe.
+    Si hay enrutamiento (routing u output_dir/enrutamiento.json) solo se leen los .txt asignados al cliente.
+    progress (opcional) recibe actualizaciones parciales: etapa, archivos/líneas parseadas, registros agregados.
+    El resultado incluye stages: segundos, filas, bytes y memoria de cada etapa (rss_delta_mb y el pico del proceso,
+    ver instrumentation).
     """
+    report = progress or (lambda values: None)
     filter_year_month = _parse_period(period)
-    messages, file_stats = parse_chat_folder_with_stats(Path(source_dir), filter_year_month)
-    if not messages:
-        return {
-            "path": None, "rows": 0, "new_records_added": 0, "total_rows": 0,
-            "year": None, "filename": None, "lines_read": 0, "lines_valid": 0, "file_stats": file_stats
-        }
-
-    requests = link_requests_and_confirmations(messages)
-    if not requests:
-        return {
-            "path": None, "rows": 0, "new_records_added": 0, "total_rows": 0,
-            "year": None, "filename": None, "lines_read": 0, "lines_valid": 0, "file_stats": file_stats
-        }
+    txt_files = _source_files(Path(source_dir))
+    routing = routing or SourceRouting.load(output_dir / ROUTING_FILE_NAME)
+    recorder = StageRecorder(PIPELINE_STAGES)
+    if routing is not None:
+        txt_files = [path for path in txt_files if _same_client(routing.client_for(path), cliente or "cliente")]
+        if not txt_files:
+            raise FileNotFoundError(f"Ningún archivo .txt de {source_dir} está asignado al cliente {cliente}")
+    checkpoint_store = _checkpoint_store_for(cliente or "cliente", filter_year_month, output_dir) if incremental else None
+
+    report({"stage": "parse"})
+    pooled = PARSE_WORKERS > 1 and len(txt_files) > 1
+    if pooled:
+        # El pool entrega cada archivo completo; desde la mezcla en adelante el pipeline sigue en streaming
+        checkpoints = [checkpoint_store.get(path.name) if checkpoint_store else None for path in txt_files]
+        with recorder.stage("parse"):
+            results = _parse_files(txt_files, filter_year_month, checkpoints, progress=progress)
+        messages, file_stats = _merge_results(txt_files, results, checkpoint_store)
+    else:
+        file_stats = []
+        messages = iter_folder_messages(txt_files, filter_year_month, checkpoint_store, file_stats)
+    result = _process_client_messages(
+        cliente, messages, file_stats, filter_year_month, output_dir, record_store, checkpoint_store, report,
+        window=CONFIRMATION_WINDOW, recorder=recorder,
+    )
+    _record_read(recorder, file_stats, in_parse=not pooled)
+    result["stages"] = recorder.finish()
+    return result
 
-    df = build_dataframe(requests)
-    if df.empty:
-        return {
-            "path": None, "rows": 0, "new_records_added": 0, "total_rows": 0,
-            "year": None, "filename": None, "lines_read": len(messages), "lines_valid": len(messages), "file_stats": file_stats
-        }
 
-    # Año para el nombre del archivo: del periodo o del primer registro
-    if filter_year_month:
-        year = filter_year_month[0]
+def _record_read(recorder: StageRecorder, file_stats: List[Dict], in_parse: bool) -> None:
+    """
+    Etapa read (mmap + hash de los .txt). Si se leyó en este proceso su tiempo quedó dentro de parse y se descuenta;
+    con el pool es la suma de lo que tardó cada worker, en paralelo y dentro del tiempo de reloj de parse.
+    """
+    seconds = sum(float(st.get("read_seconds") or 0.0) for st in file_stats)
+    rows = sum(int(st.get("lines") or 0) for st in file_stats)
+    bytes_read = _bytes_summary(file_stats)["bytes_parsed"]
+    if in_parse:
+        recorder.move("parse", "read", seconds, rows=rows, bytes=bytes_read)
     else:
+        recorder.add("read", seconds, rows=rows, bytes=bytes_read)
+
+
+def procesar_todos(
+    clientes: Sequence[str],
+    period: Optional[str],
+    source_dir: Path,
+    output_dir: Path,
+    incremental: bool = True,
+    record_store: Optional[RecordStore] = None,
+    progress: Optional[Callable[[Dict], None]] = None,
+    routing: Optional[SourceRouting] = None,
+    client_lock: Optional[Callable[[str], ContextManager]] = None,
+    workers: Optional[int] = None,
+) -> Dict:
+    """
+    Procesa todos los clientes con un único parseo de la carpeta fuente.
+    Cada .txt se asigna según el enrutamiento (sin enrutamiento, todos los archivos van a cada cliente);
+    luego el enlace, el almacén y el Excel de cada cliente corren en paralelo, cada uno bajo client_lock(cliente).
+    Un archivo se parsea incremental solo si todos los clientes que lo reciben tienen el mismo checkpoint;
+    si difieren se parsea completo y el almacén descarta lo que ya tenía cada cliente.
+    stages tiene read y parse del parseo único; cada cliente trae las suyas (parse es ahí la mezcla de sus archivos).
+    """
+    report = progress or (lambda values: None)
+    filter_year_month = _parse_period(period)
+    txt_files = _source_files(Path(source_dir))
+    routing = routing or SourceRouting.load(output_dir / ROUTING_FILE_NAME)
+
+    targets: Dict[str, str] = {}
+    for cliente in clientes:
+        targets.setdefault(slugify(cliente).lower(), cliente)
+    if routing is not None:
+        assigned = routing.assign(txt_files)
+        for cliente in assigned.values():
+            if cliente:
+                targets.setdefault(slugify(cliente).lower(), cliente)
+        receivers = {path: [slugify(c).lower()] if c else [] for path, c in assigned.items()}
+    else:
+        receivers = {path: list(targets) for path in txt_files}
+
+    checkpoint_stores = {key: _checkpoint_store_for(cliente, filter_year_month, output_dir) for key, cliente in targets.items()} if incremental else {}
+    parse_files = [path for path in txt_files if receivers[path]]
+    checkpoints = []
+    for path in parse_files:
+        entries = [checkpoint_stores[key].get(path.name) for key in receivers[path]] if incremental else [None]
+        checkpoints.append(entries[0] if all(entry == entries[0] for entry in entries) else None)
+
+    report({"stage": "parse", "clients": len(targets)})
+    recorder = StageRecorder(PIPELINE_STAGES)
+    with recorder.stage("parse"):
+        results = _parse_files(parse_files, filter_year_month, checkpoints, workers, progress)
+    pooled = (PARSE_WORKERS if workers is None else workers) > 1 and len(parse_files) > 1
+    _record_read(recorder, [result[1] for result in results], in_parse=not pooled)
+    by_path = dict(zip(parse_files, results))
+
+    def run_client(key: str) -> Dict:
+        files = [path for path in parse_files if key in receivers[path]]
+        messages, file_stats = _merge_results(files, [by_path[path] for path in files], checkpoint_stores.get(key))
+        cliente = targets[key]
+        lock = client_lock(cliente) if client_lock else contextlib.nullcontext()
+        client_recorder = StageRecorder(PIPELINE_STAGES)
         try:
-            year = int(pd.to_datetime(df["Fecha Solicitud"]).iloc[0].year)
-        except Exception:
-            year = datetime.utcnow().year
-
-    output_dir.mkdir(parents=True, exist_ok=True)
-    safe_cliente = slugify(cliente or "cliente")
-    output_file = output_dir / f"bitacora_{safe_cliente}_{year}.xlsx"
+            with lock:
+                result = _process_client_messages(
+                    cliente, messages, file_stats, filter_year_month, output_dir, record_store,
+                    checkpoint_stores.get(key), lambda values: None, window=CONFIRMATION_WINDOW,
+                    recorder=client_recorder,
+                )
+            result["stages"] = client_recorder.finish()
+            return result
+        except Exception as exc:
+            print(f"No se pudo procesar el cliente {cliente}: {exc}")
+            return {"error": str(exc), "file_stats": file_stats}
 
-    export_result = export_to_excel(df, str(output_file))
+    report({"stage": "clients"})
+    resultados: Dict[str, Dict] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(targets), os.cpu_count() or 1, 8))) as pool:
+        for key, result in zip(targets, pool.map(run_client, list(targets))):
+            resultados[targets[key]] = result
+            report({"clients_done": len(resultados), "records_added": sum(r.get("new_records_added", 0) for r in resultados.values())})
 
     return {
-        "path": output_file,
-        "rows": len(df),
-        "new_records_added": export_result["new_records_added"],
-        "total_rows": export_result["total_rows"],
-        "year": year,
-        "filename": output_file.name,
-        "lines_read": len(messages),
-        "lines_valid": len(messages),
-        "file_stats": file_stats,
+        "clientes": resultados,
+        "routing": {path.name: [targets[key] for key in receivers[path]] for path in txt_files},
+        "file_stats": [result[1] for result in results],
+        **_bytes_summary([result[1] for result in results]),
+        "stages": recorder.finish(),
     }
 
 
+def _print_result(cliente: str, result: Dict) -> None:
+    if result.get("error"):
+        print(f"  {cliente}: ERROR {result['error']}")
+    else:
+        print(f"  {cliente}: {result.get('new_records_added', 0)} nuevos, {result.get('total_rows', 0)} total ({result.get('filename') or 'sin Excel'})")
+
+
 def main() -> None:
+    """
+    Sin argumentos: exporta bitacoras/ al Excel local (flujo original de bitacorasmym).
+    --cliente NOMBRE: procesa un cliente contra el almacén de output/.
+    --todos: procesa con un solo parseo todos los clientes de output/clientes.json (o --clientes A,B).
+    """
     base_dir = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Procesador de bitácoras de mantenimiento")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--cliente", help="Procesar un solo cliente")
+    mode.add_argument("--todos", action="store_true", help="Procesar todos los clientes con un único parseo")
+    parser.add_argument("--clientes", help="Lista de clientes separada por comas (con --todos; por defecto output/clientes.json)")
+    parser.add_argument("--periodo", help="Solo mensajes de este mes (YYYY-MM)")
+    parser.add_argument("--origen", type=Path, default=base_dir / "bitacoras", help="Carpeta con los .txt")
+    parser.add_argument("--salida", type=Path, default=base_dir / "output", help="Carpeta de salida (almacén y Excel)")
+    parser.add_argument("--enrutamiento", type=Path, help=f"Archivo de enrutamiento (por defecto <salida>/{ROUTING_FILE_NAME})")
+    parser.add_argument("--completo", action="store_true", help="Ignorar checkpoints y parsear los archivos completos")
+    args = parser.parse_args()
+
+    if args.cliente or args.todos:
+        clients_file = args.salida / CLIENTS_FILE_NAME
+        registry = ClientRegistry(clients_file) if clients_file.exists() else None
+        routing = SourceRouting.load(args.enrutamiento or args.salida / ROUTING_FILE_NAME)
+        if registry is not None:
+            routing = registry.routing(routing)
+        try:
+            if args.cliente:
+                cliente = (registry.resolve(args.cliente) if registry else None) or args.cliente
+                result = procesar_bitacora(cliente, args.periodo, args.origen, args.salida, incremental=not args.completo, routing=routing)
+                _print_result(cliente, result)
+                return
+            if args.clientes:
+                clientes = [c.strip() for c in args.clientes.split(",") if c.strip()]
+            else:
+                clientes = registry.names() if registry else []
+            summary = procesar_todos(clientes, args.periodo, args.origen, args.salida, incremental=not args.completo, routing=routing)
+        except FileNotFoundError as exc:
+            print(str(exc))
+            sys.exit(1)
+        print(f"{len(summary['file_stats'])} archivo(s) parseados una vez para {len(summary['clientes'])} cliente(s):")
+        for cliente, result in summary["clientes"].items():
+            _print_result(cliente, result)
+        return
+
     source_dir = base_dir / "bitacoras"
     try:
         messages = parse_chat_folder(source_dir)
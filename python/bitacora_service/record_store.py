@@ -0,0 +1,514 @@
+"""
+Almacén local (SQLite en modo WAL) de los registros de bitácora.
+Es la fuente de verdad: procesar_bitacora inserta en bloque los registros nuevos y los .xlsx por cliente/año
+pasan a ser exportaciones derivadas que se regeneran solo cuando se piden o cuando quedaron desactualizadas.
+"""
+import base64
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+RECORD_DB_NAME = "bitacora.sqlite3"
+
+# Orden de columnas de las filas que entran y salen del almacén (mismo orden que el Excel)
+RECORD_FIELDS = (
+    "fecha_solicitud", "reportado_por", "descripcion", "tecnico", "estado", "fecha_cierre",
+)
+
+# Filtros de query_records que comparan sin distinguir mayúsculas (cada uno con su índice)
+QUERY_FILTERS = ("estado", "reportado_por", "tecnico")
+
+# Marca en meta de que las filas ya están en la partición del año de su fecha_solicitud
+REPARTITION_META_KEY = "particion_por_fecha"
+# Año de la fecha_solicitud de la fila r ("YYYY-MM-DD HH:MM"), igual que record_year
+_YEAR_SQL = "CAST(substr(r.fecha_solicitud, 1, 4) AS INTEGER)"
+
+WORKBOOK_NAME_REGEX = re.compile(r"^bitacora_(?P<cliente>.+)_(?P<anio>\d{4})\.xlsx$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS registros (
+    id INTEGER PRIMARY KEY,
+    cliente TEXT NOT NULL COLLATE NOCASE,
+    anio INTEGER NOT NULL,
+    clave TEXT NOT NULL,
+    fecha_solicitud TEXT NOT NULL,
+    reportado_por TEXT NOT NULL DEFAULT '',
+    descripcion TEXT NOT NULL DEFAULT '',
+    tecnico TEXT NOT NULL DEFAULT '',
+    estado TEXT NOT NULL DEFAULT '',
+    fecha_cierre TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_registros_clave ON registros (cliente, anio, clave);
+CREATE INDEX IF NOT EXISTS ix_registros_fecha ON registros (cliente, anio, fecha_solicitud);
+-- Consultas de GET /bitacora/registros (varios años, filtros sin distinguir mayúsculas, orden cronológico)
+CREATE INDEX IF NOT EXISTS ix_registros_cliente_fecha ON registros (cliente, fecha_solicitud);
+CREATE INDEX IF NOT EXISTS ix_registros_estado ON registros (cliente, estado COLLATE NOCASE, fecha_solicitud);
+CREATE INDEX IF NOT EXISTS ix_registros_tecnico ON registros (cliente, tecnico COLLATE NOCASE, fecha_solicitud);
+CREATE INDEX IF NOT EXISTS ix_registros_reportado ON registros (cliente, reportado_por COLLATE NOCASE, fecha_solicitud);
+
+CREATE TABLE IF NOT EXISTS exportaciones (
+    cliente TEXT NOT NULL COLLATE NOCASE,
+    anio INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    version_exportada INTEGER NOT NULL DEFAULT -1,
+    PRIMARY KEY (cliente, anio)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+# Índice de texto (FTS5) sobre descripción, reportado por y técnico; insert_records lo actualiza en la misma
+# transacción. unicode61 con remove_diacritics iguala "baño"/"bano" y "Técnico"/"tecnico" al indexar y al buscar.
+_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS registros_fts USING fts5(
+    descripcion, reportado_por, tecnico,
+    content='registros', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+SEARCH_COLUMNS = ("descripcion", "reportado_por", "tecnico")
+# Peso de cada columna en el ranking (bm25): lo que dice la descripción pesa más que los nombres
+SEARCH_WEIGHTS = (1.0, 0.5, 0.5)
+SEARCH_TERM_REGEX = re.compile(r'"([^"]*)"|(\w+)(\*?)')
+
+
+class RecordStore:
+    """Conexión al almacén. Es seguro compartir una instancia entre los hilos del servidor."""
+
+    def __init__(self, db_path: Path):
+        self.path = Path(db_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.search_enabled = self._init_search()
+        self._repartition()
+
+    def _init_search(self) -> bool:
+        """Crea el índice de texto; en una base que ya tenía registros lo llena una vez. False si SQLite no trae FTS5."""
+        with self._lock:
+            try:
+                exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'registros_fts'").fetchone()
+                self._conn.executescript(_SEARCH_SCHEMA)
+                if not exists:
+                    self._conn.execute("INSERT INTO registros_fts (registros_fts) VALUES ('rebuild')")
+            except sqlite3.OperationalError as exc:
+                print(f"Búsqueda de texto no disponible (SQLite sin FTS5): {exc}")
+                return False
+        return True
+
+    def _repartition(self) -> None:
+        """
+        Una vez por base: mueve a la partición del año de su fecha_solicitud las filas que versiones anteriores
+        guardaban en el año del primer registro de la corrida. Si la misma clave ya está en la partición correcta se
+        queda la fila con cierre (o la que ya estaba) y se borra la otra; ambas exportaciones quedan desactualizadas.
+        """
+        if self.get_meta(REPARTITION_META_KEY):
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                misplaced = self._conn.execute(
+                    f"SELECT r.id, r.cliente, r.anio, r.clave, r.fecha_cierre, {_YEAR_SQL}, t.id, t.fecha_cierre"
+                    " FROM registros r"
+                    f" LEFT JOIN registros t ON t.cliente = r.cliente AND t.anio = {_YEAR_SQL} AND t.clave = r.clave"
+                    f" WHERE r.anio != {_YEAR_SQL} ORDER BY r.id"
+                ).fetchall()
+                # Por clave, la fila que queda: con cierre antes que pendiente, la que ya estaba en su año antes que
+                # las movidas, y entre iguales la más antigua
+                keep: Dict[Tuple[str, int, str], Tuple[bool, bool, int]] = {}
+                rows_by_key: Dict[Tuple[str, int, str], set] = {}
+                touched = set()
+                for row_id, cliente, anio, clave, cierre, year, target_id, target_cierre in misplaced:
+                    key = (cliente.lower(), year, clave)
+                    touched.add((cliente, anio))
+                    touched.add((cliente, year))
+                    candidates = [(cierre is None, True, row_id)]
+                    if target_id is not None:
+                        candidates.append((target_cierre is None, False, target_id))
+                    keep[key] = min(candidates + ([keep[key]] if key in keep else []))
+                    rows_by_key.setdefault(key, set()).update(c[2] for c in candidates)
+                dropped = [
+                    row_id for key, ids in rows_by_key.items() for row_id in sorted(ids) if row_id != keep[key][2]
+                ]
+                if dropped and self.search_enabled:
+                    self._conn.executemany(
+                        "INSERT INTO registros_fts (registros_fts, rowid, descripcion, reportado_por, tecnico)"
+                        " SELECT 'delete', id, descripcion, reportado_por, tecnico FROM registros WHERE id = ?",
+                        ((row_id,) for row_id in dropped),
+                    )
+                self._conn.executemany("DELETE FROM registros WHERE id = ?", ((row_id,) for row_id in dropped))
+                self._conn.execute(f"UPDATE registros AS r SET anio = {_YEAR_SQL} WHERE r.anio != {_YEAR_SQL}")
+                self._conn.executemany(
+                    "INSERT INTO exportaciones (cliente, anio, version) VALUES (?, ?, 1)"
+                    " ON CONFLICT (cliente, anio) DO UPDATE SET version = version + 1",
+                    touched,
+                )
+                self._conn.execute(
+                    "INSERT INTO meta (clave, valor) VALUES (?, '1') ON CONFLICT (clave) DO UPDATE SET valor = '1'",
+                    (REPARTITION_META_KEY,),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if misplaced:
+            print(f"Registros movidos a la partición del año de su fecha: {len(misplaced)} ({len(dropped)} duplicados)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "RecordStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def insert_records(self, cliente: str, rows: Iterable[Tuple[str, Sequence]]) -> Dict[int, int]:
+        """
+        Inserta filas (clave, valores en orden RECORD_FIELDS). Cada fila va a la partición del año de su
+        fecha_solicitud (record_year), así la misma solicitud cae siempre en la misma partición sin importar en qué
+        corrida se leyó. Si la clave ya existe sin cierre y la fila nueva trae uno (la confirmación llegó después o en
+        otra fuente), la fila se actualiza; si no, se deja como estaba.
+        Retorna {año: filas nuevas} por cada partición en la que se agregó o cerró algo; esas exportaciones quedan
+        desactualizadas.
+        """
+        params = [(record_year(values[0]), clave, *values) for clave, values in rows]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM registros").fetchone()[0]
+                self._conn.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS lote_anual (orden INTEGER PRIMARY KEY, anio INTEGER, clave TEXT,"
+                    " fecha_solicitud TEXT, reportado_por TEXT, descripcion TEXT, tecnico TEXT, estado TEXT,"
+                    " fecha_cierre TEXT)"
+                )
+                self._conn.execute("DELETE FROM lote_anual")
+                self._conn.executemany(
+                    "INSERT INTO lote_anual (anio, clave, fecha_solicitud, reportado_por, descripcion, tecnico, estado,"
+                    " fecha_cierre) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    params,
+                )
+                # Filas existentes sin cierre que este lote cierra: su entrada FTS se borra con los valores viejos
+                closed = self._conn.execute(
+                    "SELECT id, anio FROM registros WHERE cliente = ? AND fecha_cierre IS NULL"
+                    " AND (anio, clave) IN (SELECT anio, clave FROM lote_anual WHERE fecha_cierre IS NOT NULL)",
+                    (cliente,),
+                ).fetchall()
+                if closed and self.search_enabled:
+                    self._conn.executemany(
+                        "INSERT INTO registros_fts (registros_fts, rowid, descripcion, reportado_por, tecnico)"
+                        " SELECT 'delete', id, descripcion, reportado_por, tecnico FROM registros WHERE id = ?",
+                        ((row_id,) for row_id, _ in closed),
+                    )
+                # En orden de llegada: dentro del lote también una fila con cierre reemplaza a una pendiente anterior
+                self._conn.execute(
+                    "INSERT INTO registros (cliente, anio, clave, fecha_solicitud, reportado_por, descripcion, tecnico,"
+                    " estado, fecha_cierre)"
+                    " SELECT ?, anio, clave, fecha_solicitud, reportado_por, descripcion, tecnico, estado, fecha_cierre"
+                    " FROM lote_anual WHERE true ORDER BY orden"
+                    " ON CONFLICT (cliente, anio, clave) DO UPDATE SET fecha_solicitud = excluded.fecha_solicitud,"
+                    " reportado_por = excluded.reportado_por, descripcion = excluded.descripcion,"
+                    " tecnico = excluded.tecnico, estado = excluded.estado, fecha_cierre = excluded.fecha_cierre"
+                    " WHERE excluded.fecha_cierre IS NOT NULL AND registros.fecha_cierre IS NULL",
+                    (cliente,),
+                )
+                self._conn.execute("DELETE FROM lote_anual")
+                added = dict(self._conn.execute(
+                    "SELECT anio, COUNT(*) FROM registros WHERE id > ? GROUP BY anio", (last_id,)
+                ).fetchall())
+                if (added or closed) and self.search_enabled:
+                    # Un solo INSERT ... SELECT por lote (con un trigger por fila FTS5 escribe un segmento por fila)
+                    self._conn.execute(
+                        "INSERT INTO registros_fts (rowid, descripcion, reportado_por, tecnico)"
+                        " SELECT id, descripcion, reportado_por, tecnico FROM registros WHERE id > ?",
+                        (last_id,),
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO registros_fts (rowid, descripcion, reportado_por, tecnico)"
+                        " SELECT id, descripcion, reportado_por, tecnico FROM registros WHERE id = ?",
+                        ((row_id,) for row_id, _ in closed),
+                    )
+                for anio in {anio for _, anio in closed}:
+                    added.setdefault(anio, 0)
+                self._conn.executemany(
+                    "INSERT INTO exportaciones (cliente, anio, version) VALUES (?, ?, 1)"
+                    " ON CONFLICT (cliente, anio) DO UPDATE SET version = version + 1",
+                    ((cliente, anio) for anio in added),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def count(self, cliente: str, anio: int) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM registros WHERE cliente = ? AND anio = ?", (cliente, anio)
+            ).fetchone()
+        return int(row[0])
+
+    def iter_rows(self, cliente: str, anio: int, batch_size: int = 5000) -> Iterator[Tuple]:
+        """
+        Filas del cliente/año en orden cronológico (valores en orden RECORD_FIELDS).
+        Usa una conexión de solo lectura propia: en WAL ve una foto consistente sin bloquear a los escritores.
+        """
+        conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(RECORD_FIELDS)} FROM registros WHERE cliente = ? AND anio = ?"
+                " ORDER BY fecha_solicitud, id",
+                (cliente, anio),
+            )
+            rows = cursor.fetchmany(batch_size)
+            while rows:
+                yield from rows
+                rows = cursor.fetchmany(batch_size)
+        finally:
+            conn.close()
+
+    def query_records(
+        self,
+        cliente: str,
+        fields: Sequence[str] = RECORD_FIELDS,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        filters: Optional[Dict[str, Sequence[str]]] = None,
+        after: Optional[Tuple[str, int]] = None,
+        limit: int = 100,
+        descending: bool = False,
+    ) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+        """
+        Una página de registros del cliente ordenada por (fecha_solicitud, id).
+        desde es inclusivo y hasta exclusivo ("YYYY-MM-DD HH:MM:SS"); filters = {campo de QUERY_FILTERS: valores}.
+        Paginación por clave: after es la (fecha_solicitud, id) del último registro de la página anterior, así que
+        cada página cuesta lo mismo sin importar cuántas filas hay antes. Retorna (registros, clave siguiente o None).
+        """
+        unknown = [field for field in fields if field not in RECORD_FIELDS]
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+        clauses, params = ["cliente = ?"], [cliente]
+        if desde:
+            clauses.append("fecha_solicitud >= ?")
+            params.append(desde)
+        if hasta:
+            clauses.append("fecha_solicitud < ?")
+            params.append(hasta)
+        for field, values in (filters or {}).items():
+            if field not in QUERY_FILTERS:
+                raise ValueError(f"Filtro desconocido: {field}")
+            if values:
+                clauses.append(f"{field} COLLATE NOCASE IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if after is not None:
+            clauses.append(f"(fecha_solicitud, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        direction = "DESC" if descending else "ASC"
+        columns = ["id", "fecha_solicitud", *(field for field in fields if field != "fecha_solicitud")]
+        sql = (
+            f"SELECT {', '.join(columns)} FROM registros WHERE {' AND '.join(clauses)}"
+            f" ORDER BY fecha_solicitud {direction}, id {direction} LIMIT ?"
+        )
+        conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            # Una fila de más para saber si hay otra página
+            rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+        finally:
+            conn.close()
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1][1], rows[-1][0])
+        records = []
+        for row in rows:
+            values = dict(zip(columns, row))
+            records.append({"id": values["id"], **{field: values[field] for field in fields}})
+        return records, next_key
+
+    def search(
+        self,
+        match: str,
+        cliente: Optional[str] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Registros que cumplen la expresión FTS5 match (ver search_query), del más al menos relevante (bm25), de
+        todos los clientes y fechas salvo que se filtre (desde inclusivo, hasta exclusivo, sobre fecha_solicitud).
+        Retorna (resultados, hay_más).
+        El ranking recorre todas las coincidencias: términos muy frecuentes son más lentos que los específicos.
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Búsqueda de texto no disponible: SQLite sin FTS5")
+        clauses, params = ["registros_fts MATCH ?"], [match]
+        if cliente:
+            clauses.append("r.cliente = ?")
+            params.append(cliente)
+        if desde:
+            clauses.append("r.fecha_solicitud >= ?")
+            params.append(desde)
+        if hasta:
+            clauses.append("r.fecha_solicitud < ?")
+            params.append(hasta)
+        # Primero solo el ranking (lo que cuesta recorrer todas las coincidencias); la fila completa y el fragmento
+        # resaltado se arman después, únicamente para la página
+        join = " JOIN registros r ON r.id = registros_fts.rowid" if len(clauses) > 1 else ""
+        ranking_sql = (
+            f"SELECT registros_fts.rowid, bm25(registros_fts, {', '.join(map(str, SEARCH_WEIGHTS))}) AS score"
+            f" FROM registros_fts{join} WHERE {' AND '.join(clauses)}"
+            " ORDER BY score, registros_fts.rowid LIMIT ? OFFSET ?"
+        )
+        columns = ["id", "cliente", "anio", *RECORD_FIELDS]
+        conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            ranked = conn.execute(ranking_sql, (*params, limit + 1, offset)).fetchall()
+            page = ranked[:limit]
+            rows = {}
+            if page:
+                rows = {
+                    row[0]: row
+                    for row in conn.execute(
+                        f"SELECT {', '.join('r.' + column for column in columns)},"
+                        " snippet(registros_fts, 0, '[', ']', '…', 16)"
+                        " FROM registros_fts JOIN registros r ON r.id = registros_fts.rowid"
+                        f" WHERE registros_fts MATCH ? AND registros_fts.rowid IN ({', '.join('?' * len(page))})",
+                        (match, *(row_id for row_id, _score in page)),
+                    )
+                }
+        finally:
+            conn.close()
+        hits = []
+        for row_id, score in page:
+            row = rows[row_id]
+            hit = dict(zip(columns, row))
+            hit["fragmento"] = row[-1]
+            hit["puntaje"] = round(-score, 4)
+            hits.append(hit)
+        return hits, len(ranked) > limit
+
+    def export_state(self, cliente: str, anio: int) -> Optional[Dict]:
+        """Nombre canónico del cliente y versiones de datos/exportación, o None si no hay registros."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cliente, version, version_exportada FROM exportaciones WHERE cliente = ? AND anio = ?",
+                (cliente, anio),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"cliente": row[0], "anio": anio, "version": row[1], "version_exportada": row[2]}
+
+    def is_dirty(self, cliente: str, anio: int) -> bool:
+        state = self.export_state(cliente, anio)
+        return bool(state) and state["version"] != state["version_exportada"]
+
+    def mark_exported(self, cliente: str, anio: int, version: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE exportaciones SET version_exportada = ? WHERE cliente = ? AND anio = ?",
+                (version, cliente, anio),
+            )
+
+    def partitions(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            return [tuple(r) for r in self._conn.execute("SELECT cliente, anio FROM exportaciones ORDER BY cliente, anio")]
+
+    def open_requests(
+        self, cliente: str, desde: Optional[str] = None, hasta: Optional[str] = None
+    ) -> List[Tuple[str, str, str]]:
+        """
+        (fecha_solicitud, reportado_por, descripcion) de las solicitudes sin cierre del cliente en [desde, hasta), en
+        orden de fecha: una corrida incremental las vuelve a abrir para que la cola nueva pueda cerrarlas.
+        """
+        clauses, params = ["cliente = ?", "fecha_cierre IS NULL"], [cliente]
+        if desde:
+            clauses.append("fecha_solicitud >= ?")
+            params.append(desde)
+        if hasta:
+            clauses.append("fecha_solicitud < ?")
+            params.append(hasta)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT fecha_solicitud, reportado_por, descripcion FROM registros"
+                f" WHERE {' AND '.join(clauses)} ORDER BY fecha_solicitud, id",
+                params,
+            ).fetchall()
+
+    def latest_year(self, cliente: str) -> Optional[int]:
+        """Año de la última partición del cliente, o None si no tiene registros."""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(anio) FROM registros WHERE cliente = ?", (cliente,)).fetchone()
+        return row[0]
+
+    def get_meta(self, clave: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, clave: str, valor: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta (clave, valor) VALUES (?, ?) ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor",
+                (clave, valor),
+            )
+
+
+def record_year(fecha_solicitud) -> int:
+    """Año de la partición de un registro: el de su fecha de solicitud ("YYYY-MM-DD HH:MM" o datetime)."""
+    return int(str(fecha_solicitud)[:4])
+
+
+def search_query(text: str, all_terms: bool = False, column: Optional[str] = None) -> Optional[str]:
+    """
+    Texto del usuario -> expresión FTS5. Palabras sueltas ("bomba fuga" = bomba o fuga; con all_terms, ambas),
+    "frases entre comillas" y prefijos con * ("filtr*"). Cualquier otro símbolo se ignora, así que la entrada
+    nunca produce una expresión inválida. column limita la búsqueda a una de SEARCH_COLUMNS. None si no hay términos.
+    """
+    if column is not None and column not in SEARCH_COLUMNS:
+        raise ValueError(f"Campo de búsqueda desconocido: {column}")
+    terms = []
+    for match in SEARCH_TERM_REGEX.finditer(text or ""):
+        phrase, word, prefix = match.groups()
+        if phrase is not None:
+            words = re.findall(r"\w+", phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+        else:
+            terms.append(f'"{word}"{prefix}')
+    if not terms:
+        return None
+    expression = (" AND " if all_terms else " OR ").join(terms)
+    return f"{{{column}}} : ({expression})" if column else expression
+
+
+def encode_cursor(key: Tuple[str, int]) -> str:
+    """Cursor opaco para la URL a partir de la clave (fecha_solicitud, id) de query_records."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverso de encode_cursor; ValueError si el cursor no es válido."""
+    try:
+        fecha, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(fecha), int(row_id)
+    except Exception as exc:
+        raise ValueError("Cursor inválido") from exc
+
+
+def parse_workbook_name(name: str) -> Optional[Tuple[str, int]]:
+    """'bitacora_UACA_2026.xlsx' -> ('UACA', 2026)."""
+    match = WORKBOOK_NAME_REGEX.match(name)
+    if not match:
+        return None
+    return match.group("cliente"), int(match.group("anio"))
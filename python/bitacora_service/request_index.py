@@ -0,0 +1,134 @@
+"""
+Índice de solicitudes abiertas para enlazar confirmaciones sin recorrer toda la lista de solicitudes.
+Semántica (la misma del recorrido original con reversed(requests)): una confirmación cierra la solicitud
+abierta agregada más recientemente cuya fecha sea <= la fecha de la confirmación.
+Las fechas son segundos epoch (ChatMessage.ts).
+"""
+from bisect import bisect_left
+from typing import List, Optional
+
+# Valor de los slots cerrados en el árbol de mínimos (mayor que cualquier fecha)
+_CLOSED = float("inf")
+# forget_before compacta recién cuando hay al menos esta cantidad de slots terminados al inicio
+_COMPACT_MIN = 1024
+
+
+class OpenRequestIndex:
+    """
+    Pila de slots abiertos con borrado perezoso: si los mensajes vienen en orden cronológico (lo normal en un
+    export de WhatsApp) el tope siempre es la respuesta y cada operación es O(1) amortizado.
+    Si aparece una solicitud con fecha posterior a la confirmación, se arma un árbol de mínimos por slot y desde
+    ese momento la búsqueda de la solicitud abierta más reciente con fecha <= t es O(log n).
+    Los slots son absolutos; forget_before libera los ya terminados al inicio (enlace en streaming).
+    """
+
+    def __init__(self):
+        self._times: List[Optional[int]] = []
+        self._stack: List[int] = []
+        self._tree: Optional[List[float]] = None
+        self._capacity = 0
+        # Slot absoluto de _times[0]
+        self._base = 0
+
+    def __len__(self) -> int:
+        return self._base + len(self._times)
+
+    def push(self, when: int) -> int:
+        """Registra una solicitud abierta y devuelve su slot (posición en orden de llegada)."""
+        index = len(self._times)
+        self._times.append(when)
+        self._stack.append(self._base + index)
+        if self._tree is not None:
+            if index >= self._capacity:
+                self._build_tree()
+            else:
+                self._tree_set(index, when)
+        return self._base + index
+
+    def close_latest_before(self, when: int) -> Optional[int]:
+        """Cierra y devuelve el slot abierto más reciente con fecha <= when, o None si no hay."""
+        times = self._times
+        stack = self._stack
+        base = self._base
+        while stack and times[stack[-1] - base] is None:
+            stack.pop()
+        if not stack:
+            return None
+        if times[stack[-1] - base] <= when:
+            slot = stack.pop()
+            self._close(slot - base)
+            return slot
+        if self._tree is None:
+            self._build_tree()
+        index = self._tree_find(when)
+        if index is None:
+            return None
+        self._close(index)
+        return base + index
+
+    def discard(self, slot: int) -> None:
+        """Cierra un slot sin confirmación (p. ej. una solicitud que quedó fuera de la ventana de confirmación)."""
+        index = slot - self._base
+        if 0 <= index < len(self._times) and self._times[index] is not None:
+            self._close(index)
+
+    def forget_before(self, slot: int) -> None:
+        """
+        Indica que los slots < slot ya están cerrados o descartados y nunca se vuelven a consultar.
+        Se compactan cuando son al menos la mitad de los guardados (costo amortizado O(1) por slot).
+        """
+        drop = slot - self._base
+        if drop < _COMPACT_MIN or 2 * drop < len(self._times):
+            return
+        del self._times[:drop]
+        del self._stack[:bisect_left(self._stack, slot)]
+        self._base = slot
+        # El árbol usa posiciones relativas: se reconstruye si vuelve a hacer falta
+        self._tree = None
+        self._capacity = 0
+
+    def _close(self, index: int) -> None:
+        self._times[index] = None
+        if self._tree is not None:
+            self._tree_set(index, _CLOSED)
+
+    def _build_tree(self) -> None:
+        capacity = 1
+        while capacity < 2 * max(1, len(self._times)):
+            capacity *= 2
+        tree = [_CLOSED] * (2 * capacity)
+        for index, when in enumerate(self._times):
+            if when is not None:
+                tree[capacity + index] = when
+        for node in range(capacity - 1, 0, -1):
+            left = tree[2 * node]
+            right = tree[2 * node + 1]
+            tree[node] = left if left <= right else right
+        self._tree = tree
+        self._capacity = capacity
+
+    def _tree_set(self, index: int, value: float) -> None:
+        tree = self._tree
+        node = self._capacity + index
+        tree[node] = value
+        node //= 2
+        while node:
+            left = tree[2 * node]
+            right = tree[2 * node + 1]
+            best = left if left <= right else right
+            if tree[node] == best:
+                break
+            tree[node] = best
+            node //= 2
+
+    def _tree_find(self, when: int) -> Optional[int]:
+        """Posición (relativa a _base) más a la derecha cuyo valor es <= when."""
+        tree = self._tree
+        if tree[1] > when:
+            return None
+        node = 1
+        capacity = self._capacity
+        while node < capacity:
+            node = 2 * node + 1 if tree[2 * node + 1] <= when else 2 * node
+        index = node - capacity
+        return index if self._times[index] is not None else None
@@ -0,0 +1,81 @@
+"""
+Enrutamiento de archivos fuente (.txt o .zip de WhatsApp) a clientes.
+Cada export es el chat de un grupo; el archivo completo se asigna a un cliente según, en este orden:
+  1. "archivos": patrón del nombre de archivo (glob, p. ej. "uaca_*.txt") -> cliente
+  2. "grupos": texto contenido en el nombre del grupo (sin distinguir mayúsculas) -> cliente
+  3. "por_defecto": cliente para los archivos que no coinciden (null = se ignoran)
+
+Ejemplo de output/enrutamiento.json:
+  {"archivos": {"chat_whatsapp.txt": "UACA"}, "grupos": {"Mantenimiento UACA": "UACA"}, "por_defecto": null}
+
+Sin archivo de enrutamiento, cada cliente recibe todos los .txt de la carpeta (comportamiento original).
+"""
+import json
+import zipfile
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from line_parser import LineParser
+from zip_sources import is_archive, read_head
+
+ROUTING_FILE_NAME = "enrutamiento.json"
+# Bytes iniciales que se leen para encontrar el nombre del grupo (primera línea del export)
+_GROUP_PROBE_BYTES = 4096
+
+_PROBE_PARSER = LineParser()
+
+
+def group_name(path: Path) -> Optional[str]:
+    """Nombre del grupo: autor de la primera línea del export (el aviso de cifrado lo firma el propio grupo)."""
+    try:
+        if is_archive(path):
+            head = read_head(path, _GROUP_PROBE_BYTES).decode("utf-8", "ignore")
+        else:
+            with open(path, "rb") as fh:
+                head = fh.read(_GROUP_PROBE_BYTES).decode("utf-8", "ignore")
+    except (OSError, zipfile.BadZipFile):
+        return None
+    for line in head.splitlines()[:5]:
+        parsed = _PROBE_PARSER.parse_line(line)
+        if parsed:
+            return parsed.author
+    return None
+
+
+class SourceRouting:
+    def __init__(self, archivos: Optional[Dict[str, str]] = None, grupos: Optional[Dict[str, str]] = None, por_defecto: Optional[str] = None):
+        self.archivos = {str(k): str(v).strip() for k, v in (archivos or {}).items() if str(v).strip()}
+        self.grupos = {str(k).lower(): str(v).strip() for k, v in (grupos or {}).items() if str(k).strip() and str(v).strip()}
+        self.por_defecto = (por_defecto or "").strip() or None
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["SourceRouting"]:
+        """Enrutamiento configurado, o None si no existe el archivo (todos los .txt van a cada cliente)."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8") or "{}")
+            if not isinstance(data, dict):
+                raise ValueError("invalid format")
+        except Exception as exc:
+            print(f"Enrutamiento inválido ({path.name}: {exc}); se ignora.")
+            return None
+        return cls(data.get("archivos"), data.get("grupos"), data.get("por_defecto"))
+
+    def client_for(self, path: Path) -> Optional[str]:
+        path = Path(path)
+        for pattern, cliente in self.archivos.items():
+            if fnmatch(path.name.lower(), pattern.lower()):
+                return cliente
+        if self.grupos:
+            grupo = (group_name(path) or "").lower()
+            if grupo:
+                for fragment, cliente in self.grupos.items():
+                    if fragment in grupo:
+                        return cliente
+        return self.por_defecto
+
+    def assign(self, files: List[Path]) -> Dict[Path, Optional[str]]:
+        return {path: self.client_for(path) for path in files}
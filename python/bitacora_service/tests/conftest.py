@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / "benchmarks"))
+
+# main crea el almacén al importarse: las pruebas no tocan output/
+os.environ.setdefault("BITACORA_OUTPUT_DIR", tempfile.mkdtemp(prefix="bitacora-tests-"))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: pruebas de escala (1M de mensajes); se excluyen con -m 'not slow'")
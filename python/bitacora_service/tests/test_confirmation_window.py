@@ -0,0 +1,74 @@
+"""Ventanas del pipeline en streaming: confirmación (iter_linked_requests) y desorden por archivo (REORDER_WINDOW)."""
+from datetime import timedelta
+
+import processor
+from chat_records import ChatMessage
+from test_linking import START, _links, random_chat, reference_link
+
+
+def test_window_matches_reference_on_ordered_chats():
+    window = timedelta(minutes=30)
+    for seed in range(60):
+        messages = random_chat(400, seed, confirmation_ratio=0.3 + (seed % 5) / 10)
+        linked = list(processor.iter_linked_requests(messages, window))
+        assert _links(linked) == _links(reference_link(messages, window)), seed
+
+
+def test_wide_window_changes_nothing():
+    for seed in range(20):
+        messages = random_chat(300, seed, jitter=0.2)
+        linked = list(processor.iter_linked_requests(messages, timedelta(days=3650)))
+        assert _links(linked) == _links(reference_link(messages)), seed
+
+
+def test_window_releases_old_pending_requests_while_streaming():
+    messages = [ChatMessage.from_datetime(START, "a", "la bomba no sirve")]
+    messages += [ChatMessage.from_datetime(START + timedelta(hours=i), "b", "favor revisar el aire") for i in range(1, 100)]
+    consumed = 0
+
+    def source():
+        nonlocal consumed
+        for msg in messages:
+            consumed += 1
+            yield msg
+
+    linked = processor.iter_linked_requests(source(), timedelta(hours=2))
+    first = next(linked)
+    assert first.request is messages[0] and first.confirmation is None
+    assert consumed < 10
+    # Sin ventana, la primera solicitud abierta retiene todo hasta el final
+    consumed = 0
+    next(processor.iter_linked_requests(source()))
+    assert consumed == len(messages)
+
+
+def _late_export(tmp_path):
+    # La solicitud del 31/1 aparece en el archivo después de un mensaje del 3/2: más atrasada que REORDER_WINDOW
+    # (24 h), cuando la del 1/2 ya se entregó
+    path = tmp_path / "chat.txt"
+    path.write_text(
+        "[1/2/26, 8:00:00 a. m.] Ana: la bomba no sirve\n"
+        "[3/2/26, 9:00:00 a. m.] Papi: listo\n"
+        "[31/1/26, 9:00:00 a. m.] Luis: se quebró la ventana de la oficina\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_disorder_beyond_the_reorder_window_is_linked_in_file_order(tmp_path, capsys):
+    file_stats = []
+    messages = list(processor.iter_folder_messages([_late_export(tmp_path)], file_stats=file_stats))
+
+    # El atrasado sale detrás de lo ya entregado: el "listo" cierra la solicitud que llegó última, no la más reciente
+    assert [msg.author for msg in messages] == ["Ana", "Luis", "Papi"]
+    closed = {item.request.author: item.confirmation for item in processor.iter_linked_requests(messages)}
+    assert closed["Luis"] is not None and closed["Ana"] is None
+    assert "1 mensaje(s) con más de 1 day, 0:00:00 de desorden" in capsys.readouterr().out
+
+
+def test_without_reorder_window_the_file_is_fully_sorted(tmp_path, monkeypatch):
+    monkeypatch.setattr(processor, "REORDER_WINDOW", None)
+    messages = list(processor.iter_folder_messages([_late_export(tmp_path)]))
+
+    assert [msg.author for msg in messages] == ["Luis", "Ana", "Papi"]
+    assert _links(processor.iter_linked_requests(messages)) == _links(reference_link(messages))
@@ -0,0 +1,61 @@
+"""period en GET /bitacora/registros y /bitacora/buscar: filtra por fecha_solicitud, no por el año de la partición."""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+CLIENTE = "Prueba Periodo"
+# Solicitudes de varios años (cada una en la partición de su año)
+ROWS = [
+    ("2015-12-30 09:00:00", "Ana", "Fuga en el techo del aula 1", "", "Pendiente", None),
+    ("2024-03-31 23:59:59", "Luis", "Fuga en el baño de marzo", "", "Pendiente", None),
+    ("2024-04-01 00:00:00", "Ana", "Fuga en el comedor", "Papi", "Completado", "2024-04-02 10:00:00"),
+    ("2024-04-30 18:00:00", "Luis", "Cambiar foco pasillo", "", "Pendiente", None),
+    ("2024-05-01 00:00:00", "Ana", "Fuga en la bodega", "", "Pendiente", None),
+    ("2025-01-15 08:00:00", "Ana", "Fuga en el parqueo", "", "Pendiente", None),
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    main.RECORD_STORE.insert_records(main.slugify(CLIENTE), [(f"{r[0]}|{r[1]}|{r[2]}", r) for r in ROWS])
+    with TestClient(main.app) as client:
+        yield client
+
+
+def _fechas(response):
+    assert response.status_code == 200, response.text
+    body = response.json()
+    items = body["registros"] if "registros" in body else body["resultados"]
+    return sorted(item["fecha_solicitud"] for item in items)
+
+
+def test_registros_period_month(client):
+    response = client.get("/bitacora/registros", params={"cliente": CLIENTE, "period": "2024-04"})
+    assert _fechas(response) == ["2024-04-01 00:00:00", "2024-04-30 18:00:00"]
+
+
+def test_registros_period_year(client):
+    response = client.get("/bitacora/registros", params={"cliente": CLIENTE, "period": "2024"})
+    assert len(_fechas(response)) == 4
+    response = client.get("/bitacora/registros", params={"cliente": CLIENTE, "period": "2015"})
+    assert _fechas(response) == ["2015-12-30 09:00:00"]
+
+
+def test_registros_period_intersects_desde_hasta(client):
+    params = {"cliente": CLIENTE, "period": "2024", "desde": "2024-04-15", "hasta": "2025-12-31"}
+    assert _fechas(client.get("/bitacora/registros", params=params)) == ["2024-04-30 18:00:00", "2024-05-01 00:00:00"]
+
+
+def test_registros_invalid_period(client):
+    assert client.get("/bitacora/registros", params={"cliente": CLIENTE, "period": "2024-13"}).status_code == 400
+
+
+@pytest.mark.skipif(not main.RECORD_STORE.search_enabled, reason="SQLite sin FTS5")
+def test_buscar_period(client):
+    params = {"q": "fuga", "cliente": CLIENTE}
+    assert len(_fechas(client.get("/bitacora/buscar", params=params))) == 5
+    assert _fechas(client.get("/bitacora/buscar", params={**params, "period": "2024-04"})) == ["2024-04-01 00:00:00"]
+    assert len(_fechas(client.get("/bitacora/buscar", params={**params, "period": "2024"}))) == 3
+    assert _fechas(client.get("/bitacora/buscar", params={**params, "period": "2025"})) == ["2025-01-15 08:00:00"]
+    assert client.get("/bitacora/buscar", params={**params, "period": "abril"}).status_code == 400
@@ -0,0 +1,44 @@
+"""export_to_excel con el índice de claves (.claves): duplicados y filas sin Fecha Solicitud."""
+import pandas as pd
+
+import processor
+from clave_index import ClaveIndex, verify
+
+
+def _frame(rows):
+    df = pd.DataFrame(rows, columns=processor.EXCEL_COLUMNS)
+    df["Fecha Solicitud"] = pd.to_datetime(df["Fecha Solicitud"])
+    df["Fecha Cierre"] = pd.to_datetime(df["Fecha Cierre"])
+    return df
+
+
+ROWS = [
+    ("2026-02-09 10:05:21", "Ana", "Fuga en el comedor", "Papi", "Completado", "2026-02-10 09:21:32"),
+    ("2026-02-11 08:00:00", "Luis", "Cambiar foco pasillo", "", "Pendiente", None),
+]
+UNDATED = (None, "Ana", "Revisar aire aula 3", "", "Pendiente", None)
+
+
+def test_second_export_adds_only_new_keys(tmp_path):
+    output = tmp_path / "bitacora.xlsx"
+    assert processor.export_to_excel(_frame(ROWS), str(output))["new_records_added"] == 2
+
+    extra = ("2026-02-12 07:30:00", "Luis", "Puerta trabada", "", "Pendiente", None)
+    result = processor.export_to_excel(_frame(ROWS + [extra]), str(output))
+
+    assert result["new_records_added"] == 1
+    assert result["total_rows"] == 3
+    assert verify(output) == []
+
+
+def test_row_without_fecha_solicitud_does_not_break_the_index(tmp_path):
+    output = tmp_path / "bitacora.xlsx"
+    first = processor.export_to_excel(_frame(ROWS + [UNDATED]), str(output))
+    assert first["total_rows"] == 3
+    assert len(ClaveIndex.for_output(output)) == 2
+
+    # Como antes del índice: las filas con fecha se reconocen, la fila sin clave se vuelve a agregar
+    second = processor.export_to_excel(_frame(ROWS + [UNDATED]), str(output))
+    assert second["new_records_added"] == 1
+    assert second["total_rows"] == 4
+    assert verify(output) == []
@@ -0,0 +1,83 @@
+"""procesar_bitacora incremental: lo que guarda una corrida sobre la cola nueva es lo mismo que un reparse completo."""
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+import processor
+from synthetic_chat import ChatSpec, iter_lines
+from record_store import RECORD_DB_NAME, RECORD_FIELDS, RecordStore
+
+CLIENTE = "Prueba Incremental"
+
+
+@pytest.fixture
+def folders(tmp_path):
+    source = tmp_path / "bitacoras"
+    source.mkdir()
+    return source, tmp_path / "output"
+
+
+def _append(path: Path, *lines: str) -> None:
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("".join(f"{line}\n" for line in lines))
+
+
+def _stored(output_dir: Path):
+    with RecordStore(output_dir / RECORD_DB_NAME) as store:
+        rows, _next = store.query_records(processor.slugify(CLIENTE), limit=100000)
+    return [tuple(row[field] for field in RECORD_FIELDS) for row in rows]
+
+
+def test_tail_starting_in_a_new_year_keeps_one_row_per_request(folders):
+    source, output = folders
+    chat = source / "chat.txt"
+    _append(chat, "[30/12/26, 8:00:00 a. m.] Ana: hay una fuga en el techo")
+    processor.procesar_bitacora(CLIENTE, None, source, output)
+    _append(chat, "[2/1/27, 9:00:00 a. m.] Luis: fuga en el baño")
+    result = processor.procesar_bitacora(CLIENTE, None, source, output)
+    assert result["year"] == 2027 and result["new_records_added"] == 1
+
+    # Un reparse completo no duplica lo que la corrida incremental guardó
+    result = processor.procesar_bitacora(CLIENTE, None, source, output, incremental=False)
+
+    assert result["new_records_added"] == 0
+    assert [export["year"] for export in result["exports"]] == [2026, 2027]
+    assert [row[2] for row in _stored(output)] == ["hay una fuga en el techo", "fuga en el baño"]
+
+
+def test_confirmation_in_a_later_run_closes_a_stored_request(folders):
+    source, output = folders
+    chat = source / "chat.txt"
+    _append(chat, "[3/2/26, 8:00:00 a. m.] Ana: la bomba no sirve")
+    processor.procesar_bitacora(CLIENTE, None, source, output)
+    assert [row[4] for row in _stored(output)] == ["Pendiente"]
+
+    _append(chat, "[3/2/26, 3:00:00 p. m.] Papi: listo")
+    result = processor.procesar_bitacora(CLIENTE, None, source, output)
+
+    assert result["new_records_added"] == 0 and result["rows"] == 1
+    assert _stored(output) == [("2026-02-03 08:00:00", "Ana", "la bomba no sirve", "Papi", "Completado", "2026-02-03 15:00:00")]
+
+
+@pytest.mark.parametrize("window", [None, timedelta(days=1)])
+def test_incremental_runs_store_the_same_rows_as_a_full_run(tmp_path, monkeypatch, window):
+    monkeypatch.setattr(processor, "CONFIRMATION_WINDOW", window)
+    # Un solo sufijo de hora: el chat queda en orden cronológico, como un export real que solo crece al final
+    spec = ChatSpec(lines=3000, days=20, ampm=("a. m.",), multiline=0.0, confirmation=0.3, request=0.45, seed=7)
+    lines = list(iter_lines(spec))
+    incremental_source, full_source = tmp_path / "incremental", tmp_path / "completo"
+    incremental_source.mkdir()
+    full_source.mkdir()
+
+    previous = 0
+    for cut in (700, 701, 1500, 2600, len(lines)):
+        _append(incremental_source / "chat.txt", *lines[previous:cut])
+        processor.procesar_bitacora(CLIENTE, None, incremental_source, tmp_path / "salida_incremental")
+        previous = cut
+    _append(full_source / "chat.txt", *lines)
+    processor.procesar_bitacora(CLIENTE, None, full_source, tmp_path / "salida_completa", incremental=False)
+
+    stored = _stored(tmp_path / "salida_incremental")
+    assert stored == _stored(tmp_path / "salida_completa")
+    assert {row[4] for row in stored} == {"Pendiente", "Completado"}
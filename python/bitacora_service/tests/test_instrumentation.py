@@ -0,0 +1,22 @@
+"""StageRecorder: la memoria de cada etapa es lo que creció durante ella, no el pico de toda la vida del proceso."""
+import pytest
+
+from instrumentation import MetricsRegistry, StageRecorder, current_rss_bytes
+
+
+def test_stage_reports_its_own_rss_growth():
+    if current_rss_bytes() is None:
+        pytest.skip("Sin lectura de memoria residente en esta plataforma")
+    recorder = StageRecorder(("grande", "chica"), registry=MetricsRegistry())
+    with recorder.stage("grande"):
+        block = bytearray(64 * 1024 * 1024)
+        block[::4096] = b"\1" * len(range(0, len(block), 4096))
+    with recorder.stage("chica"):
+        small = [0] * 10
+
+    grande, chica = recorder.finish()
+    assert grande["rss_delta_mb"] >= 50
+    assert abs(chica["rss_delta_mb"]) < 10
+    # El pico del proceso no baja: la segunda etapa lo hereda aunque no haya reservado nada
+    assert chica["process_peak_rss_mb"] >= grande["process_peak_rss_mb"] >= grande["rss_delta_mb"]
+    del block, small
@@ -0,0 +1,90 @@
+"""Enlace solicitud/confirmación: mismo resultado que el enlazado original y tiempo acotado."""
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pytest
+
+import processor
+from chat_records import ChatMessage
+
+REQUEST_TEXTS = ["la bomba no sirve", "favor revisar el aire", "hay una fuga en el baño", "Pueden revisar esto por favor"]
+CONFIRMATION_TEXTS = ["listo", "ya quedó", "reparado", "ok"]
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def reference_link(messages: List[ChatMessage], window: Optional[timedelta] = None) -> List[Dict]:
+    """
+    link_requests_and_confirmations del commit base (75521d0), recorrido O(n²) con reversed(requests), sobre
+    ChatMessage. Con window, una confirmación no cierra solicitudes más antiguas que (fecha más reciente vista
+    antes de ella - window): el contrato de iter_linked_requests para chats en orden cronológico.
+    """
+    requests: List[Dict] = []
+    latest = None
+    for msg in messages:
+        if processor.is_request(msg):
+            requests.append({"request": msg, "confirmation": None})
+        elif processor.is_confirmation(msg):
+            oldest = latest - window.total_seconds() if window is not None and latest is not None else None
+            for req in reversed(requests):
+                if req["confirmation"] is None and req["request"].ts <= msg.ts:
+                    if oldest is not None and req["request"].ts < oldest:
+                        break
+                    req["confirmation"] = msg
+                    break
+        latest = msg.ts if latest is None else max(latest, msg.ts)
+    return requests
+
+
+def random_chat(count: int, seed: int, jitter: float = 0.0, confirmation_ratio: float = 0.6) -> List[ChatMessage]:
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        # Varios mensajes por minuto (fechas repetidas) y, con jitter, algunos fuera de orden
+        when = START + timedelta(minutes=i // 3)
+        if rng.random() < jitter:
+            when -= timedelta(minutes=rng.randint(1, 600))
+        texts = CONFIRMATION_TEXTS if rng.random() < confirmation_ratio else REQUEST_TEXTS
+        messages.append(ChatMessage.from_datetime(when, f"autor{rng.randint(0, 6)}", rng.choice(texts)))
+    return messages
+
+
+def _links(linked) -> List:
+    return [
+        (id(item["request"]), id(item["confirmation"])) if isinstance(item, dict) else (id(item.request), id(item.confirmation))
+        for item in linked
+    ]
+
+
+def test_same_links_as_baseline_on_random_chats():
+    for seed in range(120):
+        messages = random_chat(300, seed, jitter=0.2 if seed % 2 else 0.0, confirmation_ratio=0.3 + (seed % 5) / 10)
+        assert _links(processor.link_requests_and_confirmations(messages)) == _links(reference_link(messages)), seed
+
+
+@pytest.mark.slow
+def test_linking_time_is_bounded_at_1m_messages():
+    # Todas las confirmaciones son anteriores a todas las solicitudes: el original recorre la lista completa por
+    # confirmación (~2.5 * 10^11 comparaciones con 1M de mensajes)
+    def adversarial(count: int) -> List[ChatMessage]:
+        requests = [ChatMessage.from_datetime(START + timedelta(minutes=i), "a", "la bomba no sirve") for i in range(count // 2)]
+        confirmations = [ChatMessage.from_datetime(START - timedelta(minutes=1), "b", "listo") for _ in range(count // 2)]
+        return requests + confirmations
+
+    def best_time(messages: List[ChatMessage]) -> float:
+        for msg in messages:
+            processor.classify_message(msg)
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            linked = processor.link_requests_and_confirmations(messages)
+            timings.append(time.perf_counter() - start)
+        assert len(linked) == len(messages) // 2
+        return min(timings)
+
+    small = best_time(adversarial(250_000))
+    large = best_time(adversarial(1_000_000))
+    assert large < 30.0
+    # 4 veces más mensajes: lineal ~4x, cuadrático ~16x
+    assert large < 8 * small + 0.1
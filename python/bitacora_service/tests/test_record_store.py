@@ -0,0 +1,104 @@
+"""RecordStore.insert_records: claves repetidas, cierre posterior de una pendiente, partición por año e índice de búsqueda."""
+import pytest
+
+from record_store import REPARTITION_META_KEY, RecordStore
+
+KEY = "2026-02-09 10:05:21|Ana|Fuga en el comedor"
+PENDING = ("2026-02-09 10:05:21", "Ana", "Fuga en el comedor", "", "Pendiente", None)
+COMPLETED = ("2026-02-09 10:05:21", "Ana", "Fuga en el comedor", "Papi", "Completado", "2026-02-10 09:21:32")
+OTHER = ("2026-02-11 08:00:00", "Luis", "Cambiar foco pasillo", "", "Pendiente", None)
+OTHER_KEY = "2026-02-11 08:00:00|Luis|Cambiar foco pasillo"
+
+
+@pytest.fixture
+def store(tmp_path):
+    with RecordStore(tmp_path / "bitacora.sqlite3") as store:
+        yield store
+
+
+def _rows(store):
+    return list(store.iter_rows("uaca", 2026))
+
+
+def test_confirmed_row_replaces_pending_one_from_an_earlier_batch(store):
+    assert store.insert_records("uaca", [(KEY, PENDING), (OTHER_KEY, OTHER)]) == {2026: 2}
+    store.mark_exported("uaca", 2026, store.export_state("uaca", 2026)["version"])
+
+    assert store.insert_records("uaca", [(KEY, COMPLETED)]) == {2026: 0}
+
+    assert _rows(store) == [COMPLETED, OTHER]
+    assert store.is_dirty("uaca", 2026)
+
+
+def test_confirmed_row_wins_within_a_batch_in_either_order(store):
+    assert store.insert_records("uaca", [(KEY, PENDING), (KEY, COMPLETED)]) == {2026: 1}
+    assert store.insert_records("uacb", [(KEY, COMPLETED), (KEY, PENDING)]) == {2026: 1}
+    assert _rows(store) == [COMPLETED]
+    assert list(store.iter_rows("uacb", 2026)) == [COMPLETED]
+
+
+def test_rows_go_to_the_year_of_their_request(store):
+    late = ("2027-01-02 08:00:00", "Luis", "Fuga en el baño", "", "Pendiente", None)
+    late_key = "2027-01-02 08:00:00|Luis|Fuga en el baño"
+    assert store.insert_records("uaca", [(late_key, late), (KEY, PENDING)]) == {2026: 1, 2027: 1}
+    # La misma solicitud leída después en otra corrida cae en la misma partición
+    assert store.insert_records("uaca", [(KEY, COMPLETED), (late_key, late)]) == {2026: 0}
+    assert _rows(store) == [COMPLETED]
+    assert list(store.iter_rows("uaca", 2027)) == [late]
+
+
+def test_rows_of_older_runs_move_to_the_year_of_their_request(tmp_path):
+    path = tmp_path / "bitacora.sqlite3"
+    with RecordStore(path) as store:
+        store.insert_records("uaca", [(KEY, PENDING), (OTHER_KEY, OTHER)])
+        # Como quedaban antes: la corrida que empezó en 2027 guardó en esa partición la pendiente y su cierre
+        store._conn.execute("UPDATE registros SET anio = 2027 WHERE clave = ?", (OTHER_KEY,))
+        store._conn.execute(
+            "INSERT INTO registros (cliente, anio, clave, fecha_solicitud, reportado_por, descripcion, tecnico, estado,"
+            " fecha_cierre) VALUES ('uaca', 2027, ?, ?, ?, ?, ?, ?, ?)",
+            (KEY, *COMPLETED),
+        )
+        if store.search_enabled:
+            store._conn.execute(
+                "INSERT INTO registros_fts (rowid, descripcion, reportado_por, tecnico)"
+                " SELECT id, descripcion, reportado_por, tecnico FROM registros WHERE anio = 2027 AND clave = ?",
+                (KEY,),
+            )
+        store._conn.execute("INSERT INTO exportaciones (cliente, anio, version) VALUES ('uaca', 2027, 1)")
+        store._conn.execute("DELETE FROM meta WHERE clave = ?", (REPARTITION_META_KEY,))
+        for anio in (2026, 2027):
+            store.mark_exported("uaca", anio, store.export_state("uaca", anio)["version"])
+
+    with RecordStore(path) as store:
+        assert _rows(store) == [COMPLETED, OTHER]
+        assert store.count("uaca", 2027) == 0
+        assert store.is_dirty("uaca", 2026) and store.is_dirty("uaca", 2027)
+        if store.search_enabled:
+            assert len(store.search("fuga")[0]) == 1
+            store._conn.execute("INSERT INTO registros_fts (registros_fts) VALUES ('integrity-check')")
+
+
+def test_pending_row_never_replaces_a_confirmed_one(store):
+    store.insert_records("uaca", [(KEY, COMPLETED)])
+    state = store.export_state("uaca", 2026)
+    store.mark_exported("uaca", 2026, state["version"])
+
+    assert store.insert_records("uaca", [(KEY, PENDING)]) == {}
+
+    assert _rows(store) == [COMPLETED]
+    assert not store.is_dirty("uaca", 2026)
+    assert store.count("uaca", 2026) == 1
+
+
+def test_search_index_follows_the_closed_row(store):
+    if not store.search_enabled:
+        pytest.skip("SQLite sin FTS5")
+    store.insert_records("uaca", [(KEY, PENDING)])
+    assert store.search("papi")[0] == []
+
+    store.insert_records("uaca", [(KEY, COMPLETED)])
+
+    hits, more = store.search("papi")
+    assert [hit["estado"] for hit in hits] == ["Completado"] and not more
+    assert len(store.search("fuga")[0]) == 1
+    store._conn.execute("INSERT INTO registros_fts (registros_fts) VALUES ('integrity-check')")
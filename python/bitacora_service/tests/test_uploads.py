@@ -0,0 +1,73 @@
+"""Incorporación de exports subidos: cola nueva, duplicados y re-exports con líneas cambiadas."""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import uploads
+
+
+def _chat(count: int, start: int = 0, edited=()) -> bytes:
+    lines = []
+    for i in range(start, start + count):
+        text = "mensaje editado" if i in edited else f"revisar la bomba {i}"
+        lines.append(f"[{1 + i // 1000}/1/26, 8:{(i // 60) % 60:02d}:{i % 60:02d} a. m.] Ana: {text}\n")
+    return "".join(lines).encode("utf-8")
+
+
+def _upload(tmp_path, data: bytes):
+    part = uploads.upload_path(tmp_path / "src")
+    part.write_bytes(data)
+    return part
+
+
+@pytest.fixture
+def source(tmp_path):
+    folder = tmp_path / "src"
+    folder.mkdir()
+    (folder / "chat.txt").write_bytes(_chat(100))
+    return folder
+
+
+def test_re_export_appends_only_the_new_tail(tmp_path, source):
+    result = uploads.ingest_upload(_upload(tmp_path, _chat(150)), source)
+    assert result["accion"] == "agregado" and result["archivo"] == "chat.txt"
+    assert (source / "chat.txt").read_bytes() == _chat(150)
+
+    again = uploads.ingest_upload(_upload(tmp_path, _chat(60, start=40)), source)
+    assert again["accion"] == "duplicado"
+
+
+def test_re_export_with_edited_lines_is_rejected(tmp_path, source):
+    part = _upload(tmp_path, _chat(150, edited={50}))
+    with pytest.raises(uploads.ExportConflict):
+        uploads.ingest_upload(part, source)
+    assert part.exists()
+    assert sorted(path.name for path in source.glob("*.txt")) == ["chat.txt"]
+    assert (source / "chat.txt").read_bytes() == _chat(100)
+
+
+def test_re_export_with_edited_lines_replaces_when_asked(tmp_path, source):
+    result = uploads.ingest_upload(_upload(tmp_path, _chat(150, edited={50})), source, replace=True)
+    assert result["accion"] == "reemplazado" and result["retirados"] == ["chat.txt"]
+    assert (source / "chat.txt").read_bytes() == _chat(150, edited={50})
+    assert len(list((source / uploads.RETIRED_DIR_NAME).iterdir())) == 1
+
+
+def test_unrelated_chat_is_a_new_export(tmp_path, source):
+    other = _chat(30).replace(b"revisar la bomba", b"cambiar foco")
+    result = uploads.ingest_upload(_upload(tmp_path, other), source, "Otro grupo.txt")
+    assert result["accion"] == "nuevo" and result["archivo"] == "Otro grupo.txt"
+
+
+def test_subir_endpoint_conflict_and_replace(source, monkeypatch):
+    monkeypatch.setattr(main, "BITACORA_SOURCE_DIR", source)
+    client = TestClient(main.app)
+    edited = _chat(150, edited={50})
+
+    response = client.post("/bitacora/subir", params={"procesar": "false"}, content=edited)
+    assert response.status_code == 409
+    assert list((source / uploads.UPLOAD_DIR_NAME).iterdir()) == []
+
+    response = client.post("/bitacora/subir", params={"procesar": "false", "reemplazar": "true"}, content=edited)
+    assert response.status_code == 200 and response.json()["accion"] == "reemplazado"
+    assert (source / "chat.txt").read_bytes() == edited
@@ -0,0 +1,295 @@
+"""
+Exports de WhatsApp subidos por POST /bitacora/subir.
+Un re-export del mismo grupo repite todo lo ya procesado. Al recibirlo se compara, línea por línea (hash de la
+línea normalizada, sin invisibles ni fin de línea), con los .txt que ya están en la carpeta fuente:
+- si el archivo subido está entero dentro de uno existente, no trae nada nuevo y se descarta;
+- si su comienzo coincide con el final de uno existente (re-export completo o recortado a los últimos mensajes),
+  solo la parte nueva se agrega al final de ese archivo: crece como un export normal y los checkpoints parsean
+  solo esa cola en la próxima corrida;
+- si coincide con uno existente en al menos DIVERGED_MIN_LINES líneas seguidas pero después difiere (mensajes
+  editados o borrados en el teléfono entre un export y otro), se rechaza con ExportConflict: guardarlo aparte haría
+  parsear dos veces el mismo chat. Con reemplazar=True el existente se retira y el subido ocupa su nombre; sus
+  líneas se vuelven a procesar, pero los registros ya guardados de las líneas que cambiaron siguen en el almacén;
+- si no se superpone con ninguno, se guarda como un export nuevo.
+Después, los .txt contenidos enteros en el archivo resultante (exports anteriores del mismo grupo copiados a mano)
+se mueven a .retirados/ para que la carpeta no acumule duplicados.
+Un .zip (export "con multimedia") se guarda tal cual como otra fuente, salvo que ya haya uno con el mismo chat.
+"""
+import mmap
+import os
+import re
+import shutil
+import threading
+import uuid
+import zipfile
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from line_parser import normalize_invisible
+from month_index import index_path_for
+from zip_sources import ZIP_SUFFIX, chat_member
+
+UPLOAD_DIR_NAME = ".subidas"
+RETIRED_DIR_NAME = ".retirados"
+# Posiciones del export existente donde se prueba empezar la comparación (líneas repetidas)
+MAX_OVERLAP_CANDIDATES = 32
+# Líneas seguidas en común con un export existente a partir de las cuales una diferencia posterior es un conflicto
+DIVERGED_MIN_LINES = 20
+KEY_BLOCK_SIZE = 1 << 20
+_UNSAFE_NAME_RE = re.compile(r"[^\w .()\-]+")
+# La carpeta fuente es de todos los clientes: una incorporación a la vez
+_INGEST_LOCK = threading.Lock()
+
+
+@contextmanager
+def _mapped(path: Path):
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def _line_keys(buffer, start: int = 0) -> Iterator[Tuple[int, int]]:
+    """(hash de la línea normalizada, offset donde termina) de cada línea no vacía desde start."""
+    size = len(buffer)
+    position = start
+    while position < size:
+        # Bloques cortados en un salto de línea: se decodifican y normalizan de una vez
+        stop = min(size, position + KEY_BLOCK_SIZE)
+        if stop < size:
+            newline = buffer.rfind(b"\n", position, stop)
+            stop = newline + 1 if newline >= 0 else (buffer.find(b"\n", stop) + 1 or size)
+        raw = buffer[position:stop]
+        texts = normalize_invisible(str(raw, "utf-8", "ignore")).split("\n")
+        end = position
+        for chunk, text in zip(raw.split(b"\n"), texts):
+            end += len(chunk) + 1
+            text = text.strip()
+            if text:
+                yield hash(text), min(end, size)
+        position = stop
+
+
+def line_hashes(path: Path) -> array:
+    """Hashes de las líneas no vacías de un export, en orden (8 bytes por línea)."""
+    with _mapped(path) as buffer:
+        return array("q", (line_hash for line_hash, _end in _line_keys(buffer)))
+
+
+class ExportConflict(ValueError):
+    """El export subido repite uno existente pero con líneas distintas en la parte ya procesada."""
+
+
+def compare_exports(base_hashes: array, other: Path) -> Tuple[Optional[int], int]:
+    """
+    (offset como find_overlap, máximo de líneas seguidas de other que coinciden con base antes de una diferencia).
+    """
+    with _mapped(other) as buffer:
+        keys = _line_keys(buffer)
+        first = next(keys, None)
+        if first is None:
+            return len(buffer), 0
+        first_hash, first_end = first
+        candidate = -1
+        common = 0
+        for _ in range(MAX_OVERLAP_CANDIDATES):
+            try:
+                candidate = base_hashes.index(first_hash, candidate + 1)
+            except ValueError:
+                break
+            position, end = candidate + 1, first_end
+            for line_hash, line_end in _line_keys(buffer, first_end):
+                if position == len(base_hashes):
+                    return end, position - candidate
+                if base_hashes[position] != line_hash:
+                    break
+                position += 1
+                end = line_end
+            else:
+                return len(buffer), position - candidate
+            common = max(common, position - candidate)
+    return None, common
+
+
+def find_overlap(base_hashes: array, other: Path) -> Optional[int]:
+    """
+    Offset de `other` donde empieza lo que no está en el export de base_hashes: se busca la primera línea de other
+    en base y desde ahí se comparan ambas hasta que una se termina. Si termina base, lo nuevo empieza después de la
+    última línea en común; si termina other (está contenido en base), es su tamaño. None si no se superponen.
+    """
+    return compare_exports(base_hashes, other)[0]
+
+
+def _is_prefix(base: Path, other: Path) -> bool:
+    """base es byte a byte el comienzo de other y termina en un salto de línea (re-export completo, caso común)."""
+    size = base.stat().st_size
+    if size == 0 or size > other.stat().st_size:
+        return False
+    with open(base, "rb") as left, open(other, "rb") as right:
+        remaining = size
+        chunk = b""
+        while remaining:
+            chunk = left.read(min(KEY_BLOCK_SIZE, remaining))
+            if not chunk or chunk != right.read(len(chunk)):
+                return False
+            remaining -= len(chunk)
+        return chunk.endswith(b"\n")
+
+
+def upload_path(source_dir: Path) -> Path:
+    """Archivo temporal para recibir una subida (fuera del glob *.txt de la carpeta fuente)."""
+    folder = Path(source_dir) / UPLOAD_DIR_NAME
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / f"{uuid.uuid4().hex}.part"
+
+
+def safe_name(filename: Optional[str], default: str = "chat.txt", suffix: str = ".txt") -> str:
+    """Nombre de archivo para la carpeta fuente: sin rutas ni caracteres raros y con la extensión `suffix`."""
+    name = _UNSAFE_NAME_RE.sub("_", Path((filename or "").replace("\\", "/")).name).strip(" .")
+    if not name:
+        name = default
+    return name if name.lower().endswith(suffix) else f"{Path(name).stem or Path(default).stem}{suffix}"
+
+
+def _free_path(source_dir: Path, name: str) -> Path:
+    path = Path(source_dir) / name
+    counter = 2
+    while path.exists():
+        path = Path(source_dir) / f"{Path(name).stem} ({counter}){Path(name).suffix}"
+        counter += 1
+    return path
+
+
+def _append(target: Path, upload: Path, offset: int) -> int:
+    """Agrega upload[offset:] al final de target (con un salto de línea antes si faltaba). Retorna los bytes agregados."""
+    with open(target, "r+b") as out, open(upload, "rb") as src:
+        out.seek(0, os.SEEK_END)
+        if out.tell() > 0:
+            out.seek(-1, os.SEEK_END)
+            if out.read(1) != b"\n":
+                out.write(b"\n")
+        start = out.tell()
+        src.seek(offset)
+        shutil.copyfileobj(src, out, 1 << 20)
+        return out.tell() - start
+
+
+def retire(path: Path, source_dir: Path) -> Path:
+    """Mueve un export a .retirados/ (con fecha en el nombre) y borra su índice de meses."""
+    folder = Path(source_dir) / RETIRED_DIR_NAME
+    folder.mkdir(parents=True, exist_ok=True)
+    target = folder / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{path.name}"
+    os.replace(path, target)
+    index_path_for(path).unlink(missing_ok=True)
+    return target
+
+
+def retire_superseded(target: Path, source_dir: Path) -> List[str]:
+    """Retira los .txt de la carpeta fuente cuyo contenido está entero dentro de target. Retorna sus nombres."""
+    target_hashes = None
+    retired: List[str] = []
+    for path in sorted(Path(source_dir).glob("*.txt")):
+        if path == target or not path.is_file():
+            continue
+        if target_hashes is None:
+            target_hashes = line_hashes(target)
+        if find_overlap(target_hashes, path) == path.stat().st_size:
+            retire(path, source_dir)
+            retired.append(path.name)
+    return retired
+
+
+def ingest_upload(upload: Path, source_dir: Path, filename: Optional[str] = None, replace: bool = False) -> Dict:
+    """
+    Incorpora a la carpeta fuente un export (.txt o .zip) recibido en `upload` (que deja de existir si se incorpora).
+    Retorna {accion: duplicado|agregado|nuevo|reemplazado, archivo, bytes_subidos, bytes_nuevos, retirados};
+    ValueError si es un .zip sin chat y ExportConflict si difiere de un export existente en la parte ya procesada
+    (salvo con replace=True, que reemplaza ese export).
+    """
+    with _INGEST_LOCK:
+        return _ingest(upload, Path(source_dir), filename, replace)
+
+
+def _ingest_archive(upload: Path, source_dir: Path, filename: Optional[str]) -> Dict:
+    """Un .zip se guarda como fuente propia; si otro .zip de la carpeta tiene el mismo chat (CRC y tamaño) se descarta."""
+    size = upload.stat().st_size
+    with zipfile.ZipFile(upload) as archive:
+        member = chat_member(archive)
+    if member is None:
+        raise ValueError("El .zip no tiene un chat de WhatsApp (_chat.txt)")
+    for path in sorted(source_dir.glob(f"*{ZIP_SUFFIX}")):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                existing = chat_member(archive)
+        except (OSError, zipfile.BadZipFile):
+            continue
+        if existing is not None and (existing.CRC, existing.file_size) == (member.CRC, member.file_size):
+            upload.unlink()
+            return {"accion": "duplicado", "archivo": path.name, "bytes_subidos": size, "bytes_nuevos": 0, "retirados": []}
+    target = _free_path(source_dir, safe_name(filename, "chat.zip", ZIP_SUFFIX))
+    os.replace(upload, target)
+    return {"accion": "nuevo", "archivo": target.name, "bytes_subidos": size, "bytes_nuevos": size, "retirados": []}
+
+
+def _ingest(upload: Path, source_dir: Path, filename: Optional[str], replace: bool = False) -> Dict:
+    size = upload.stat().st_size
+    if zipfile.is_zipfile(upload):
+        return _ingest_archive(upload, source_dir, filename)
+    existing = sorted(
+        (path for path in source_dir.glob("*.txt") if path.is_file()),
+        key=lambda path: path.stat().st_mtime_ns,
+        reverse=True,
+    )
+    diverged: Optional[Path] = None
+    for path in existing:
+        if _is_prefix(path, upload):
+            offset, common = path.stat().st_size, 0
+        else:
+            offset, common = compare_exports(line_hashes(path), upload)
+        if offset is None:
+            if diverged is None and common >= DIVERGED_MIN_LINES:
+                diverged = path
+            continue
+        if offset >= size:
+            upload.unlink()
+            return {"accion": "duplicado", "archivo": path.name, "bytes_subidos": size, "bytes_nuevos": 0, "retirados": []}
+        added = _append(path, upload, offset)
+        upload.unlink()
+        return {
+            "accion": "agregado",
+            "archivo": path.name,
+            "bytes_subidos": size,
+            "bytes_nuevos": added,
+            "retirados": retire_superseded(path, source_dir),
+        }
+
+    if diverged is not None:
+        if not replace:
+            raise ExportConflict(
+                f"El export coincide con {diverged.name} pero tiene líneas distintas en la parte ya procesada "
+                "(mensajes editados o borrados); súbalo con reemplazar=true para reemplazar ese export"
+            )
+        retire(diverged, source_dir)
+        os.replace(upload, diverged)
+        return {
+            "accion": "reemplazado",
+            "archivo": diverged.name,
+            "bytes_subidos": size,
+            "bytes_nuevos": size,
+            "retirados": [diverged.name, *retire_superseded(diverged, source_dir)],
+        }
+
+    target = _free_path(source_dir, safe_name(filename))
+    os.replace(upload, target)
+    return {
+        "accion": "nuevo",
+        "archivo": target.name,
+        "bytes_subidos": size,
+        "bytes_nuevos": size,
+        "retirados": retire_superseded(target, source_dir),
+    }
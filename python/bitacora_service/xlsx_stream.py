@@ -0,0 +1,53 @@
+"""
+Escritura de Excel en memoria constante.
+Usa el modo write-only de openpyxl: cada fila se serializa al agregarla en vez de mantener el grafo
+completo de celdas, así que la memoria no depende de la cantidad de filas.
+"""
+import tempfile
+from typing import IO, Iterable, Iterator, Sequence, Union
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+SHEET_TITLE = "Sheet1"
+STREAM_CHUNK_SIZE = 1 << 16
+# Exportaciones de hasta este tamaño se arman en memoria antes de enviarse; las más grandes pasan a un temporal
+SPOOL_MAX_SIZE = 8 << 20
+
+
+def write_xlsx_rows(target: Union[str, IO[bytes]], columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+    """Escribe encabezado + filas (valores planos: str, números, datetime o None). Retorna la cantidad de filas."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=SHEET_TITLE)
+
+    # Mismo estilo de encabezado que pandas.to_excel
+    thin = Side(style="thin")
+    header = []
+    for name in columns:
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.font = Font(bold=True)
+        cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        header.append(cell)
+    sheet.append(header)
+
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(target)
+    return count
+
+
+def iter_xlsx_bytes(columns: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """Genera el Excel y lo entrega en bloques, sin dejar un archivo en la carpeta de salida."""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as buffer:
+        write_xlsx_rows(buffer, columns, rows)
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
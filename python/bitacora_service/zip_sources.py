@@ -0,0 +1,211 @@
+"""
+Exports de WhatsApp "con multimedia" (.zip) como fuentes directas de la carpeta de bitácoras.
+El chat (_chat.txt, o el .txt más grande del archivo) se lee descomprimiéndolo por bloques desde el .zip: no se
+extrae nada a disco y los miembros multimedia no se leen. Cada .zip es una fuente con sus propias estadísticas y su
+checkpoint (CRC del chat, más offset y hash del prefijo ya procesado del chat descomprimido).
+Las líneas de adjuntos (<attached: archivo>, "archivo (archivo adjunto)") forman un índice que se guarda junto al
+.zip (chat.zip.adjuntos), para pedir después cada foto sin descomprimir el resto (GET /bitacora/adjuntos).
+
+Uso (desde python/bitacora_service):
+  python zip_sources.py ver bitacoras/WhatsApp_Chat.zip
+"""
+import argparse
+import json
+import os
+import re
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+from chat_records import ChatMessage
+from line_parser import BLOCK_SIZE, LineParser
+
+ZIP_SUFFIX = ".zip"
+CHAT_MEMBER_NAME = "_chat.txt"
+MEDIA_INDEX_SUFFIX = ".adjuntos"
+MEDIA_INDEX_VERSION = 1
+# iOS: "<attached: 00000012-PHOTO-2026-02-09-09-47-04.jpg>" / "<adjunto: …>"; Android: "IMG-….jpg (archivo adjunto)"
+ATTACHMENT_RE = re.compile(
+    r"<(?:attached|adjunto):\s*([^<>]+?)\s*>|(\S+\.\w{2,5})\s+\((?:file attached|archivo adjunto)\)",
+    re.IGNORECASE,
+)
+
+_PARSER = LineParser()
+
+
+def is_archive(path) -> bool:
+    return Path(path).suffix.lower() == ZIP_SUFFIX
+
+
+def chat_member(archive: zipfile.ZipFile) -> Optional[zipfile.ZipInfo]:
+    """_chat.txt (iOS) o, si no está, el .txt más grande (Android: "WhatsApp Chat with ….txt"); None si no hay."""
+    candidates = [
+        info for info in archive.infolist()
+        if not info.is_dir() and info.filename.lower().endswith(".txt") and not info.filename.startswith("__MACOSX/")
+    ]
+    for info in candidates:
+        if PurePosixPath(info.filename).name == CHAT_MEMBER_NAME:
+            return info
+    return max(candidates, key=lambda info: info.file_size, default=None)
+
+
+def has_chat(path) -> bool:
+    """El .zip se puede leer y tiene un chat (los demás .zip de la carpeta se ignoran)."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return chat_member(archive) is not None
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def read_head(path, size: int) -> bytes:
+    """Primeros `size` bytes del chat (p. ej. para el nombre del grupo en el enrutamiento)."""
+    with zipfile.ZipFile(path) as archive:
+        member = chat_member(archive)
+        if member is None:
+            return b""
+        with archive.open(member) as stream:
+            return stream.read(size)
+
+
+def iter_chat_blocks(stream: IO[bytes], block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Bloques de ~block_size bytes cortados después de un salto de línea; el último puede no terminar en uno."""
+    carry = b""
+    while True:
+        chunk = stream.read(block_size)
+        if not chunk:
+            break
+        data = carry + chunk if carry else chunk
+        cut = data.rfind(b"\n") + 1
+        if cut == 0:
+            carry = data
+            continue
+        yield data[:cut]
+        carry = data[cut:]
+    if carry:
+        yield carry
+
+
+def attachments(text: str) -> List[str]:
+    """Nombres de archivo adjuntos mencionados en el texto de un mensaje."""
+    return [ios or android for ios, android in ATTACHMENT_RE.findall(text)]
+
+
+def media_index_path_for(source_path) -> Path:
+    source_path = Path(source_path)
+    return source_path.with_name(source_path.name + MEDIA_INDEX_SUFFIX)
+
+
+class MediaIndex:
+    """Adjuntos mencionados en el chat de un .zip, en orden: {archivo, fecha, autor}. Vale para un CRC del chat."""
+
+    def __init__(self, path: Path, crc: Optional[int] = None, size: Optional[int] = None, entries: Optional[List[Dict]] = None):
+        self.path = Path(path)
+        self.crc = crc
+        self.size = size
+        self.entries: List[Dict] = entries or []
+
+    @classmethod
+    def load(cls, path: Path) -> "MediaIndex":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") != MEDIA_INDEX_VERSION or not isinstance(data.get("adjuntos"), list):
+                raise ValueError("invalid format")
+            return cls(path, int(data["crc"]), int(data["size"]), data["adjuntos"])
+        except Exception as exc:
+            print(f"Índice de adjuntos inválido ({path.name}: {exc}); se reconstruirá.")
+            return cls(path)
+
+    @classmethod
+    def for_source(cls, source_path) -> "MediaIndex":
+        return cls.load(media_index_path_for(source_path))
+
+    def valid_for(self, member: zipfile.ZipInfo) -> bool:
+        return self.crc == member.CRC and self.size == member.file_size
+
+    def add(self, messages: Iterable[ChatMessage]) -> None:
+        for msg in messages:
+            if "<" in msg.message or "(" in msg.message:
+                for name in attachments(msg.message):
+                    self.entries.append({"archivo": name, "fecha": msg.datetime.isoformat(), "autor": msg.author})
+
+    def save(self, member: zipfile.ZipInfo) -> None:
+        """Escribe el índice del chat completo (temporal + reemplazo); si la carpeta no admite escritura solo se avisa."""
+        self.crc, self.size = member.CRC, member.file_size
+        payload = {"version": MEDIA_INDEX_VERSION, "crc": self.crc, "size": self.size, "adjuntos": self.entries}
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            print(f"No se pudo guardar el índice de adjuntos {self.path.name}: {exc}")
+            tmp_path.unlink(missing_ok=True)
+
+
+def media_index(path) -> Dict:
+    """
+    Índice de adjuntos de un .zip: el guardado si sigue valiendo para su chat o uno nuevo (lee solo el chat).
+    Cada adjunto indica si está dentro del .zip (en_zip) y su tamaño sin comprimir.
+    """
+    path = Path(path)
+    with zipfile.ZipFile(path) as archive:
+        member = chat_member(archive)
+        if member is None:
+            raise FileNotFoundError(f"{path.name} no tiene un chat de WhatsApp")
+        index = MediaIndex.for_source(path)
+        if not index.valid_for(member):
+            index = MediaIndex(index.path)
+            with archive.open(member) as stream:
+                for block in iter_chat_blocks(stream):
+                    index.add(_PARSER.scan_text(str(block, "utf-8", "ignore"))[0])
+            index.save(member)
+        members = {PurePosixPath(info.filename).name: info for info in archive.infolist() if not info.is_dir()}
+    adjuntos = []
+    for entry in index.entries:
+        info = members.get(entry["archivo"])
+        adjuntos.append({**entry, "en_zip": info is not None, "bytes": info.file_size if info else None})
+    return {"fuente": path.name, "chat": member.filename, "adjuntos": adjuntos}
+
+
+def _media_member(archive: zipfile.ZipFile, name: str) -> zipfile.ZipInfo:
+    chat = chat_member(archive)
+    for info in archive.infolist():
+        if not info.is_dir() and info is not chat and PurePosixPath(info.filename).name == name:
+            return info
+    raise KeyError(name)
+
+
+def media_info(path, name: str) -> zipfile.ZipInfo:
+    """Miembro de un adjunto por su nombre de archivo; KeyError si no está en el .zip."""
+    with zipfile.ZipFile(path) as archive:
+        return _media_member(archive, name)
+
+
+def iter_media(path, name: str, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    """Contenido de un adjunto, descomprimido por bloques directo del .zip."""
+    with zipfile.ZipFile(path) as archive, archive.open(_media_member(archive, name)) as stream:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("accion", choices=["ver"])
+    parser.add_argument("fuente", type=Path)
+    args = parser.parse_args()
+
+    index = media_index(args.fuente)
+    present = sum(1 for entry in index["adjuntos"] if entry["en_zip"])
+    print(f"{index['fuente']}: chat {index['chat']}, {len(index['adjuntos'])} adjunto(s) mencionados, {present} dentro del .zip")
+    for entry in index["adjuntos"][:20]:
+        print(f"  {entry['fecha']}  {entry['autor']}: {entry['archivo']}{'' if entry['en_zip'] else ' (no está)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,24 +3,45 @@
 Generate dashboard charts from the Node API (/api/tasks).
 
 Usage:
-  python scripts/generate_charts.py --api http://localhost:3000/api/tasks
+  python scripts/generate_charts.py --api http://localhost:3000/api/tasks [--workers 4] [--force]
 
 Produces PNG files under ./charts/:
   - status_bar.png
   - status_pie.png
   - by_assignee.png
+  - state_done.png, state_in_progress.png, state_not_started.png
+
+The task aggregates are computed once; each chart is rendered from its own aggregates with the
+object-oriented Figure API on the Agg backend, in a process pool. A chart whose aggregates hash
+matches the one recorded in charts/.manifest.json (and whose PNG still exists) is not redrawn;
+--force redraws everything. Per-chart render times are printed at the end.
 
 Requires: pandas, matplotlib, seaborn, requests
 """
 import os
 import sys
+import json
+import time
+import hashlib
 import argparse
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
 
 import requests
 import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.figure import Figure
+
+
+STATUS_KEYS = ['done', 'in_progress', 'not_started']
+STATUS_LABELS = ['Completadas', 'En progreso', 'No iniciadas']
+STATUS_COLORS = ['#4CAF50', '#FFC107', '#F44336']
+MANIFEST_NAME = '.manifest.json'
+# Bump when the drawing code changes so every chart is redrawn once
+CHART_VERSION = 2
 
 
 def fetch_tasks(api_url):
@@ -33,80 +54,143 @@ def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
 
-def plot_status_counts(df, out_path):
-    counts = df['status'].value_counts().reindex(['done', 'in_progress', 'not_started']).fillna(0)
-    labels = ['Completadas', 'En progreso', 'No iniciadas']
-    colors = ['#4CAF50', '#FFC107', '#F44336']
+def new_figure(figsize):
+    """Figure outside pyplot's global state; call it inside render_chart's whitegrid style."""
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    return fig, ax
+
 
-    sns.set_style('whitegrid')
-    plt.figure(figsize=(6,4))
-    sns.barplot(x=labels, y=counts.values, palette=colors)
-    plt.title('Tareas por estado')
-    plt.ylabel('Cantidad')
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
-    plt.close()
+def plot_status_counts(data, out_path):
+    fig, ax = new_figure((6, 4))
+    sns.barplot(x=STATUS_LABELS, y=data['counts'], palette=STATUS_COLORS, ax=ax)
+    ax.set_title('Tareas por estado')
+    ax.set_ylabel('Cantidad')
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=150)
 
 
-def plot_status_pie(df, out_path):
-    counts = df['status'].value_counts().reindex(['done', 'in_progress', 'not_started']).fillna(0)
-    labels = ['Completadas', 'En progreso', 'No iniciadas']
-    colors = ['#4CAF50', '#FFC107', '#F44336']
-    plt.figure(figsize=(5,5))
-    plt.pie(counts.values, labels=labels, colors=colors, autopct='%1.0f%%', startangle=140)
-    plt.title('Distribución de estados')
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
-    plt.close()
+def plot_status_pie(data, out_path):
+    fig, ax = new_figure((5, 5))
+    ax.pie(data['counts'], labels=STATUS_LABELS, colors=STATUS_COLORS, autopct='%1.0f%%', startangle=140)
+    ax.set_title('Distribución de estados')
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=150)
 
 
-def plot_by_assignee(df, out_path):
-    if 'assignedTo' not in df.columns or df['assignedTo'].dropna().shape[0] == 0:
+def plot_by_assignee(data, out_path):
+    if not data['assignees']:
         # nothing to plot
-        plt.figure(figsize=(6,3))
-        plt.text(0.5,0.5,'No hay tareas asignadas', ha='center', va='center')
-        plt.axis('off')
-        plt.savefig(out_path, dpi=150)
-        plt.close()
+        fig, ax = new_figure((6, 3))
+        ax.text(0.5, 0.5, 'No hay tareas asignadas', ha='center', va='center')
+        ax.axis('off')
+        fig.savefig(out_path, dpi=150)
         return
 
-    counts = df.groupby(['assignedTo','status']).size().unstack(fill_value=0)
-    # reorder columns
-    counts = counts.reindex(columns=['done','in_progress','not_started'], fill_value=0)
-    counts.plot(kind='bar', stacked=True, color=['#4CAF50', '#FFC107', '#F44336'], figsize=(8,4))
-    plt.title('Tareas por asignado y estado')
-    plt.ylabel('Cantidad')
-    plt.legend(['Completadas','En progreso','No iniciadas'])
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
-    plt.close()
+    counts = pd.DataFrame(data['counts'], index=data['assignees'], columns=STATUS_KEYS)
+    fig, ax = new_figure((8, 4))
+    counts.plot(kind='bar', stacked=True, color=STATUS_COLORS, ax=ax)
+    ax.set_title('Tareas por asignado y estado')
+    ax.set_ylabel('Cantidad')
+    ax.legend(STATUS_LABELS)
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=150)
 
 
-def plot_single_state(state_label, count, color, out_path, max_count=1):
+def plot_single_state(data, out_path):
     """Create a single horizontal bar whose width/figure size is proportional to count.
     """
+    count, max_count = data['count'], data['max_count']
     # Determine figure width proportional to count (clamped)
     # base width 3 inches, add 0.6 inches per item, cap at 14
     width = max(3, min(14, 3 + 0.6 * count))
     height = 2.2
 
-    sns.set_style('whitegrid')
-    plt.figure(figsize=(width, height))
-    plt.barh([0], [count], color=color)
-    plt.xlim(0, max(max_count, count) * 1.1)
-    plt.yticks([])
-    plt.title(f"{state_label}: {count}")
-    for i, v in enumerate([count]):
-        plt.text(v + max(1, max_count*0.02), i, str(v), va='center')
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
-    plt.close()
+    fig, ax = new_figure((width, height))
+    ax.barh([0], [count], color=data['color'])
+    ax.set_xlim(0, max(max_count, count) * 1.1)
+    ax.set_yticks([])
+    ax.set_title(f"{data['label']}: {count}")
+    ax.text(count + max(1, max_count * 0.02), 0, str(count), va='center')
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=150)
+
+
+RENDERERS = {
+    'status_bar': plot_status_counts,
+    'status_pie': plot_status_pie,
+    'by_assignee': plot_by_assignee,
+    'state': plot_single_state,
+}
+
+
+def build_charts(df):
+    """(file name, renderer, aggregates) of every chart; the aggregates are all a chart depends on."""
+    status = df['status']
+    # value_counts/groupby leave out tasks without status; the per-state images count them as not started
+    counts = Counter(status.dropna())
+    state_counts = counts + Counter({'not_started': int(status.isna().sum())})
+    status_counts = [int(counts.get(key, 0)) for key in STATUS_KEYS]
+
+    if 'assignedTo' in df.columns and df['assignedTo'].dropna().shape[0] > 0:
+        by_assignee = df.groupby(['assignedTo', 'status']).size().unstack(fill_value=0)
+        by_assignee = by_assignee.reindex(columns=STATUS_KEYS, fill_value=0)
+        assignee_data = {
+            'assignees': [str(name) for name in by_assignee.index],
+            'counts': by_assignee.astype(int).values.tolist(),
+        }
+    else:
+        assignee_data = {'assignees': [], 'counts': []}
+
+    charts = [
+        ('status_bar.png', 'status_bar', {'counts': status_counts}),
+        ('status_pie.png', 'status_pie', {'counts': status_counts}),
+        ('by_assignee.png', 'by_assignee', assignee_data),
+    ]
+    # one image per state sized proportionally to the count
+    max_count = max(state_counts.values()) if state_counts else 1
+    for label, key, color in zip(STATUS_LABELS, STATUS_KEYS, STATUS_COLORS):
+        data = {'label': label, 'count': int(state_counts.get(key, 0)), 'color': color, 'max_count': int(max_count)}
+        charts.append((f'state_{key}.png', 'state', data))
+    return charts, {key: int(state_counts.get(key, 0)) for key in STATUS_KEYS}
+
+
+def chart_hash(renderer, data):
+    payload = json.dumps({'renderer': renderer, 'version': CHART_VERSION, 'data': data}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def render_chart(renderer, data, out_path):
+    """Runs in a pool worker: draw one chart and return how long it took."""
+    start = time.perf_counter()
+    # the style stays active while drawing: pandas reads the grid setting at plot time
+    with sns.axes_style('whitegrid'):
+        RENDERERS[renderer](data, out_path)
+    return time.perf_counter() - start
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--api', default='http://localhost:3000/api/tasks', help='Tasks API URL')
     parser.add_argument('--out', default='charts', help='Output folder for generated charts')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes used to render charts')
+    parser.add_argument('--force', action='store_true', help='Redraw every chart even if its data did not change')
     args = parser.parse_args()
 
     try:
@@ -122,23 +206,41 @@ def main():
         df['status'] = 'not_started'
 
     ensure_dir(args.out)
-    plot_status_counts(df, os.path.join(args.out, 'status_bar.png'))
-    plot_status_pie(df, os.path.join(args.out, 'status_pie.png'))
-    plot_by_assignee(df, os.path.join(args.out, 'by_assignee.png'))
-
-    # generate one image per state sized proportionally to the count
-    c = Counter(df['status'].fillna('not_started'))
-    max_count = max(c.values()) if c else 1
-    state_map = [('Completadas','done','#4CAF50'), ('En progreso','in_progress','#FFC107'), ('No iniciadas','not_started','#F44336')]
-    for label, key, color in state_map:
-        count = c.get(key, 0)
-        out_file = os.path.join(args.out, f'state_{key}.png')
-        plot_single_state(label, count, color, out_file, max_count=max_count)
+    manifest_path = os.path.join(args.out, MANIFEST_NAME)
+    manifest = {} if args.force else load_manifest(manifest_path)
+    charts, summary = build_charts(df)
+
+    pending = []
+    timings = {}
+    for name, renderer, data in charts:
+        digest = chart_hash(renderer, data)
+        out_file = os.path.join(args.out, name)
+        if manifest.get(name) == digest and os.path.exists(out_file):
+            timings[name] = None
+        else:
+            pending.append((name, renderer, data, out_file, digest))
+
+    start = time.perf_counter()
+    workers = max(1, min(args.workers, len(pending)))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(item, pool.submit(render_chart, item[1], item[2], item[3])) for item in pending]
+            results = [(item, future.result()) for item, future in futures]
+    else:
+        results = [(item, render_chart(item[1], item[2], item[3])) for item in pending]
+    for (name, _renderer, _data, _out_file, digest), seconds in results:
+        timings[name] = seconds
+        manifest[name] = digest
+    if pending:
+        save_manifest(manifest_path, manifest)
+    elapsed = time.perf_counter() - start
 
     # Print concise summary
-    c = Counter(df['status'].fillna('not_started'))
-    summary = { 'done': c.get('done',0), 'in_progress': c.get('in_progress',0), 'not_started': c.get('not_started',0) }
     print('Charts generated in', args.out)
+    for name, _renderer, _data in charts:
+        seconds = timings[name]
+        print(f'  {name:<24} ' + ('unchanged, skipped' if seconds is None else f'{seconds:.3f} s'))
+    print(f'Rendered {len(pending)} of {len(charts)} chart(s) in {elapsed:.3f} s with {workers if pending else 0} worker(s)')
     print('Summary:', summary)
 
 